@@ -0,0 +1,286 @@
+# backend/analytics.py
+"""
+Cohort analytics over structured deductions.
+
+    python -m backend.analytics cohort.jsonl --top 20
+
+A cohort's summaries (from `batch`/`merge`/`watch` JSON Lines, or from
+the database) are flattened once into NumPy columns: final scores, a
+submissions × routers score matrix, one row per deduction record with
+interned router/rule/target codes, and a submissions × master links
+"missing" matrix. Every statistic after that is a vectorized pass over
+those columns (bincount, unique, nanmean), so a 10k-submission archive
+is dominated by reading it, not by the analysis.
+
+Targets are addresses on each student's own normalization prefix; they
+are compared on their last two octets ("x.x.3.0/24").
+"""
+
+import re
+import json
+import numpy as np
+
+TOP_MISSES = 20
+SCORE_BINS = 10
+
+_PREFIXED = re.compile(r'^\d+\.\d+\.(\d+\.\d+(?:/\d+)?)$')
+
+
+def _canon(target):
+    if target is None:
+        return ""
+    m = _PREFIXED.match(target)
+    return "x.x." + m.group(1) if m else target
+
+
+def _distinct(keys):
+    """Sorted distinct values. The keys arrive nearly sorted (by submission),
+    which a stable sort exploits and np.unique's default quicksort does not."""
+    s = np.sort(keys, kind="stable")
+    return s[np.concatenate(([True], s[1:] != s[:-1]))] if len(s) else s
+
+
+class _Interner(dict):
+    def code(self, key) -> int:
+        c = self.get(key)
+        if c is None:
+            c = self[key] = len(self)
+        return c
+
+    def names(self) -> list:
+        return sorted(self, key=self.get)
+
+
+# ─── COLUMNS ──────────────────────────────────────────────────────────────
+def columns(summaries) -> dict:
+    """Flatten grade_all summaries into the columnar arrays the stats work on."""
+    routers, rules, targets, links = _Interner(), _Interner(), _Interner(), _Interner()
+    final, r_sub, r_rtr, r_score = [], [], [], []
+    d_sub, d_rtr, d_rule, d_tgt, d_pts = [], [], [], [], []
+    m_sub, m_link, l_sub, l_link = [], [], [], []
+    raw_target = {}     # target as recorded → code, skipping _canon for repeats
+
+    def target_code(t):
+        c = raw_target.get(t)
+        if c is None:
+            c = raw_target[t] = targets.code(_canon(t))
+        return c
+
+    n = 0
+    for summary in summaries:
+        final.append(summary["final_score"])
+        for rname, data in summary["per_router"].items():
+            rc = routers.code(rname)
+            r_sub.append(n)
+            r_rtr.append(rc)
+            r_score.append(data["score"])
+            dd = data.get("deductions", ())
+            d_sub.extend([n] * len(dd))
+            d_rtr.extend([rc] * len(dd))
+            d_rule.extend([rules.code(d["rule"]) for d in dd])
+            d_tgt.extend([target_code(d["target"]) for d in dd])
+            d_pts.extend([d["points"] for d in dd])
+        for d in summary.get("topology_deductions", ()):
+            d_sub.append(n)
+            d_rtr.append(routers.code("(topology)"))
+            d_rule.append(rules.code(d["rule"]))
+            d_tgt.append(target_code(None))
+            d_pts.append(d["points"])
+
+        student = summary["student_edges"]
+        for link in summary["master_edges"]:
+            lc = links.code(link)
+            l_sub.append(n)
+            l_link.append(lc)
+            if link not in student:
+                m_sub.append(n)
+                m_link.append(lc)
+        n += 1
+
+    scores = np.full((n, len(routers)), np.nan)
+    scores[np.asarray(r_sub, dtype=np.intp), np.asarray(r_rtr, dtype=np.intp)] = r_score
+    expected = np.zeros((n, len(links)), dtype=bool)
+    expected[np.asarray(l_sub, dtype=np.intp), np.asarray(l_link, dtype=np.intp)] = True
+    missing = np.zeros((n, len(links)), dtype=bool)
+    missing[np.asarray(m_sub, dtype=np.intp), np.asarray(m_link, dtype=np.intp)] = True
+
+    return {
+        "n":        n,
+        "final":    np.asarray(final, dtype=np.float64),
+        "scores":   scores,
+        "routers":  routers.names(),
+        "rules":    rules.names(),
+        "targets":  targets.names(),
+        "links":    links.names(),
+        "d_sub":    np.asarray(d_sub, dtype=np.int64),
+        "d_router": np.asarray(d_rtr, dtype=np.int64),
+        "d_rule":   np.asarray(d_rule, dtype=np.int64),
+        "d_target": np.asarray(d_tgt, dtype=np.int64),
+        "d_points": np.asarray(d_pts, dtype=np.float64),
+        "expected": expected,
+        "missing":  missing,
+    }
+
+
+# ─── STATISTICS ───────────────────────────────────────────────────────────
+def score_distribution(cols: dict, bins: int = SCORE_BINS) -> dict:
+    final = cols["final"]
+    if not len(final):
+        return {"count": 0}
+    counts, edges = np.histogram(final, bins=bins, range=(0, 100))
+    p = np.percentile(final, [10, 25, 50, 75, 90])
+    return {
+        "count":       int(len(final)),
+        "mean":        round(float(final.mean()), 2),
+        "std":         round(float(final.std()), 2),
+        "percentiles": {q: round(float(v), 1) for q, v in zip(("p10", "p25", "p50", "p75", "p90"), p)},
+        "histogram":   {f"{edges[i]:g}-{edges[i + 1]:g}": int(c) for i, c in enumerate(counts)},
+    }
+
+
+def router_stats(cols: dict) -> dict:
+    """Per router: mean score and the share of students who lost points on it."""
+    scores = cols["scores"]
+    graded = ~np.isnan(scores)
+    count  = graded.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean  = np.nansum(scores, axis=0) / count
+        fails = (graded & (scores < 100)).sum(axis=0) / count
+    return {
+        r: {"graded": int(count[i]), "mean_score": round(float(mean[i]), 2),
+            "miss_rate": round(float(fails[i]), 3)}
+        for i, r in enumerate(cols["routers"]) if count[i]
+    }
+
+
+def rule_stats(cols: dict) -> dict:
+    """Per rule: share of students hit at least once, and mean points lost when hit."""
+    n, k = cols["n"], len(cols["rules"])
+    if not n or not k:
+        return {}
+    hit    = _distinct(cols["d_sub"] * k + cols["d_rule"]) % k
+    counts = np.bincount(hit, minlength=k)
+    points = np.bincount(cols["d_rule"], weights=cols["d_points"], minlength=k)
+    return {
+        rule: {"students": int(counts[i]), "rate": round(float(counts[i] / n), 3),
+               "mean_points": round(float(points[i] / counts[i]), 2) if counts[i] else 0.0}
+        for i, rule in enumerate(cols["rules"])
+    }
+
+
+def top_misses(cols: dict, top: int = TOP_MISSES, rule: str = None) -> list:
+    """
+    The (router, rule, target) findings most students share, e.g. "40% of
+    students miss x.x.3.0/24 on R2". `rule` keeps only one rule.
+    """
+    n = cols["n"]
+    sel = np.ones(len(cols["d_sub"]), dtype=bool)
+    if rule is not None:
+        if rule not in cols["rules"]:
+            return []
+        sel = cols["d_rule"] == cols["rules"].index(rule)
+
+    nr, nt = len(cols["rules"]), len(cols["targets"])
+    combo  = (cols["d_router"][sel] * nr + cols["d_rule"][sel]) * nt + cols["d_target"][sel]
+    ncombo = len(cols["routers"]) * nr * nt
+    # One count per student per finding, however often it repeats
+    pairs  = _distinct(cols["d_sub"][sel] * ncombo + combo) % ncombo
+    counts = np.bincount(pairs, minlength=ncombo)
+    found  = np.flatnonzero(counts)
+    order  = found[np.argsort(-counts[found], kind="stable")[:top]]
+
+    out = []
+    for c in order.tolist():
+        out.append({
+            "router":   cols["routers"][c // (nr * nt)],
+            "rule":     cols["rules"][(c // nt) % nr],
+            "target":   cols["targets"][c % nt] or None,
+            "students": int(counts[c]),
+            "rate":     round(float(counts[c] / n), 3),
+        })
+    return out
+
+
+def link_heatmap(cols: dict) -> dict:
+    """Share of students missing each master link, per link and as a router × router matrix."""
+    expected, missing = cols["expected"], cols["missing"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = missing.sum(axis=0) / expected.sum(axis=0)
+
+    ends    = [link.split("-", 1) for link in cols["links"]]
+    names   = sorted({r for pair in ends for r in pair})
+    index   = {r: i for i, r in enumerate(names)}
+    matrix  = np.full((len(names), len(names)), np.nan)
+    if ends:
+        a = np.array([index[x] for x, _ in ends])
+        b = np.array([index[y] for _, y in ends])
+        matrix[a, b] = rate
+        matrix[b, a] = rate
+    return {
+        "links":   {link: round(float(rate[i]), 3) for i, link in enumerate(cols["links"])},
+        "routers": names,
+        "matrix":  [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in matrix],
+    }
+
+
+def cohort_analytics(summaries, top: int = TOP_MISSES) -> dict:
+    """Every statistic above for one cohort's summaries."""
+    cols = columns(summaries)
+    return {
+        "submissions": cols["n"],
+        "scores":      score_distribution(cols),
+        "routers":     router_stats(cols),
+        "rules":       rule_stats(cols),
+        "top_misses":  top_misses(cols, top),
+        "links":       link_heatmap(cols),
+    }
+
+
+# ─── SOURCES ──────────────────────────────────────────────────────────────
+def summaries_from_jsonl(*paths):
+    """Successful summaries from grader JSON Lines files (header lines are skipped)."""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                rec = json.loads(line) if line.strip() else {}
+                if rec.get("success") and "result" in rec:
+                    yield rec["result"]
+
+
+def summaries_from_db(cohort: str):
+    """
+    Summaries of every submission against master ZIP `cohort`, scored
+    from stored facts under each submission's rubric (each distinct
+    input and rubric scored once). Call inside an app context.
+    """
+    from backend.config import db, Submission, GradingResult
+    from backend.grader.rubric import score_facts
+    from backend.persistence import rubric_for
+
+    rows = (db.session.query(Submission.rubric_version, GradingResult.facts, GradingResult.summary,
+                             GradingResult.cache_key)
+            .join(GradingResult, Submission.result_key == GradingResult.cache_key)
+            .filter(Submission.master_zip == cohort))
+    memo, rubrics = {}, {}
+    for version, facts, summary, key in rows:
+        if (key, version) not in memo:
+            if version not in rubrics:
+                rubrics[version] = rubric_for(version)
+            rubric = rubrics[version]
+            memo[key, version] = (score_facts(json.loads(facts), rubric) if facts and rubric
+                                  else json.loads(summary))
+        yield memo[key, version]
+
+
+def main(argv=None):
+    import argparse
+
+    p = argparse.ArgumentParser(description="Cohort analytics over grader JSON Lines output")
+    p.add_argument("files", nargs="+", help="`batch`, `merge` or `watch` JSON Lines")
+    p.add_argument("--top", type=int, default=TOP_MISSES)
+    args = p.parse_args(argv)
+    print(json.dumps(cohort_analytics(summaries_from_jsonl(*args.files), args.top), indent=1))
+
+
+if __name__ == "__main__":
+    main()
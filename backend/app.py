@@ -1,6 +1,7 @@
 from flask import Flask
 from backend.config import Config, db
 from backend.routes import init_routes
+from backend.metrics import init_metrics
 
 def create_app():
     app = Flask(__name__)
@@ -14,6 +15,9 @@ def create_app():
     import os
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # Metrics first: the grading workers started by init_routes inherit it
+    init_metrics(app)
+
     # Register our routes
     init_routes(app)
 
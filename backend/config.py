@@ -13,11 +13,34 @@ class Config:
 
     # Folder for storing uploads
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    # Keep a content-addressed copy of every upload (written before it is queued)
+    PERSIST_UPLOADS = os.environ.get('PERSIST_UPLOADS', '1') not in ('0', 'false', 'no')
+
+    # Background grading queue
+    GRADING_QUEUE_DB  = os.environ.get('GRADING_QUEUE_DB', 'grading_queue.db')
+    GRADING_QUEUE_MAX = int(os.environ.get('GRADING_QUEUE_MAX', 200))
+    GRADING_WORKERS   = int(os.environ.get('GRADING_WORKERS', 2))
+
+    # Per-job grading budgets; a job over budget is aborted and its worker
+    # replaced (0 = no limit). The wall-clock budget defaults to 2 x CPU + 10 s.
+    GRADING_CPU_SECONDS  = float(os.environ.get('GRADING_CPU_SECONDS', 60))
+    GRADING_MEMORY_MB    = int(os.environ.get('GRADING_MEMORY_MB', 1024))
+    GRADING_WALL_SECONDS = float(os.environ['GRADING_WALL_SECONDS']) if os.environ.get('GRADING_WALL_SECONDS') else None
+
+    # Per-process metric snapshots, summed by /metrics. Shared by every web
+    # and grading process; clear it on deploy, as counters are cumulative.
+    METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
 
 
 # ─── MODELS ────────────────────────────────────────────────────────────────
 class Submission(db.Model):
     __tablename__ = 'submissions'
+    __table_args__ = (
+        db.Index('ix_submissions_student_created', 'student_name', 'created_at'),
+        # Keyset pagination (GET /submissions) within a cohort or a student
+        db.Index('ix_submissions_cohort_id', 'master_zip', 'id'),
+        db.Index('ix_submissions_student_id', 'student_name', 'id'),
+    )
 
     id              = db.Column(db.Integer, primary_key=True)
     student_name    = db.Column(db.String(128), nullable=False)
@@ -25,6 +48,8 @@ class Submission(db.Model):
     master_zip      = db.Column(db.String(256), nullable=False)
     student_zip     = db.Column(db.String(256), nullable=False)
     final_score     = db.Column(db.Float, nullable=False)
+    result_key      = db.Column(db.String(64), db.ForeignKey('grading_results.cache_key'), nullable=True, index=True)
+    rubric_version  = db.Column(db.Integer, nullable=True)
     created_at      = db.Column(db.DateTime, server_default=db.func.now())
 
 
@@ -32,8 +57,73 @@ class RouterResult(db.Model):
     __tablename__ = 'router_results'
 
     id             = db.Column(db.Integer, primary_key=True)
-    submission_id  = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    submission_id  = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False, index=True)
     router_name    = db.Column(db.String(128), nullable=False)
     score          = db.Column(db.Float, nullable=False)
     feedback       = db.Column(db.Text, nullable=False)
     diff           = db.Column(db.Text, nullable=True)
+
+
+class GradingResult(db.Model):
+    """Memoized extract_facts output (and its first summary), keyed by storage.result_key()."""
+    __tablename__ = 'grading_results'
+
+    cache_key      = db.Column(db.String(64), primary_key=True)
+    rubric_version = db.Column(db.Integer, nullable=False)
+    facts          = db.Column(db.Text, nullable=True)
+    summary        = db.Column(db.Text, nullable=False)
+    created_at     = db.Column(db.DateTime, server_default=db.func.now())
+
+
+class Rubric(db.Model):
+    """A saved set of deduction constants (see backend.grader.rubric); the highest version is active."""
+    __tablename__ = 'rubrics'
+
+    version        = db.Column(db.Integer, primary_key=True)
+    constants      = db.Column(db.Text, nullable=False)
+    created_at     = db.Column(db.DateTime, server_default=db.func.now())
+
+
+class SubmissionSignature(db.Model):
+    """MinHash signature of a submission's normalized configs (see backend.similarity)."""
+    __tablename__ = 'submission_signatures'
+
+    submission_id  = db.Column(db.Integer, db.ForeignKey('submissions.id'), primary_key=True)
+    cohort         = db.Column(db.String(256), nullable=False, index=True)
+    signature      = db.Column(db.LargeBinary, nullable=False)
+
+
+class LshBucket(db.Model):
+    """One LSH band of a signature; submissions sharing a bucket are candidates."""
+    __tablename__ = 'lsh_buckets'
+    __table_args__ = (
+        db.Index('ix_lsh_buckets_cohort_bucket', 'cohort', 'bucket'),
+    )
+
+    id             = db.Column(db.Integer, primary_key=True)
+    submission_id  = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False, index=True)
+    cohort         = db.Column(db.String(256), nullable=False)
+    bucket         = db.Column(db.String(64), nullable=False)
+
+
+class AssignmentStats(db.Model):
+    """Running score statistics per master ZIP, maintained by backend.stats."""
+    __tablename__ = 'assignment_stats'
+
+    cohort         = db.Column(db.String(256), primary_key=True)
+    count          = db.Column(db.Integer, nullable=False, default=0)
+    score_sum      = db.Column(db.Float, nullable=False, default=0.0)
+    min_score      = db.Column(db.Float, nullable=True)
+    max_score      = db.Column(db.Float, nullable=True)
+    histogram      = db.Column(db.Text, nullable=False)     # JSON list of per-10-point bucket counts
+    updated_at     = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+
+class LatestSubmission(db.Model):
+    """Each student's most recent submission per master ZIP, maintained by backend.stats."""
+    __tablename__ = 'latest_submissions'
+
+    cohort         = db.Column(db.String(256), primary_key=True)
+    student_name   = db.Column(db.String(128), primary_key=True)
+    submission_id  = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    final_score    = db.Column(db.Float, nullable=False)
@@ -0,0 +1,126 @@
+# backend/diff.py
+"""
+Per-router unified diffs between master and student configs.
+
+Diffs are only built when a report asks for them, never while grading.
+The master side of an assignment is prepared once per process: its
+normalized lines are interned to ints and loaded into a SequenceMatcher
+as the second sequence, whose match index (b2j) difflib keeps across
+set_seq1() calls, so each further student only pays for their own side.
+Both sides are normalized onto DIFF_PREFIX rather than the student's own
+prefix, so one prepared master serves every student; output lines are
+moved back onto the student's prefix. Output is capped at MAX_DIFF_LINES per router.
+"""
+
+import threading
+from difflib import SequenceMatcher
+
+from backend.extractor.extractor import load_configs_from_zip
+from backend.grader.cache import ArtifactCache, source_sha256
+from backend.normalizer.normalizer import clean_config, is_birthday_prefix, normalize_ips
+
+MAX_DIFF_LINES  = 200
+MAX_INPUT_LINES = 5000
+CONTEXT_LINES   = 3
+
+# Any 2MM.DD prefix diffs the same up to the prefix itself, as with
+# similarity.py's COMMON_PREFIX; other prefixes are diffed on their own.
+DIFF_PREFIX     = "200.20"
+
+# Prepared master sides, keyed by master ZIP hash + diff prefix
+MASTER_DIFFS = ArtifactCache(maxsize=8)
+
+# Student lines that never occur in the master can never match; one id does
+_UNSEEN = -1
+
+
+def _lines(txt: str, norm_prefix: str) -> list:
+    return clean_config(txt, norm_prefix).splitlines()
+
+
+def _diff_prefix(norm_prefix: str) -> str:
+    return DIFF_PREFIX if is_birthday_prefix(norm_prefix) else norm_prefix
+
+
+def _prepare_router(lines: list) -> dict:
+    vocab = {}
+    ids   = [vocab.setdefault(line, len(vocab)) for line in lines]
+    matcher = SequenceMatcher(None, autojunk=False)
+    matcher.set_seq2(ids)
+    return {"lines": lines, "vocab": vocab, "matcher": matcher, "lock": threading.Lock()}
+
+
+def prepare_master(master_zip, norm_prefix: str) -> dict:
+    """{router: prepared master side}, cached across students."""
+    key = f"{source_sha256(master_zip)}:{norm_prefix}"
+    return MASTER_DIFFS.get_or_build(key, lambda: {
+        r: _prepare_router(_lines(txt, norm_prefix))
+        for r, txt in load_configs_from_zip(master_zip).items()
+    })
+
+
+def _range(start: int, length: int) -> str:
+    """Unified-diff hunk range, as difflib formats it."""
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def unified(master: dict, student_lines: list, router: str, max_lines: int = MAX_DIFF_LINES) -> list:
+    """
+    Unified diff (master → student) as a list of lines; empty when they
+    match. '-' lines are expected but missing, '+' lines are extra.
+    """
+    m_lines = master["lines"]
+    if len(m_lines) > MAX_INPUT_LINES or len(student_lines) > MAX_INPUT_LINES:
+        return [f"(diff skipped: more than {MAX_INPUT_LINES} lines)"]
+
+    vocab = master["vocab"]
+    ids   = [vocab.get(line, _UNSEEN) for line in student_lines]
+    with master["lock"]:
+        matcher = master["matcher"]
+        matcher.set_seq1(ids)
+        groups = list(matcher.get_grouped_opcodes(CONTEXT_LINES))
+
+    # Opcodes map student (a, i) onto master (b, j); print master first
+    out = []
+    for group in groups:
+        if not out:
+            out += [f"--- master/{router}", f"+++ student/{router}"]
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        out.append(f"@@ -{_range(j1, j2 - j1)} +{_range(i1, i2 - i1)} @@")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == "equal":
+                out += [" " + line for line in m_lines[b1:b2]]
+                continue
+            out += ["-" + line for line in m_lines[b1:b2]]
+            out += ["+" + line for line in student_lines[a1:a2]]
+
+    if len(out) > max_lines:
+        out = out[:max_lines] + [f"... diff truncated ({len(out) - max_lines} more lines)"]
+    return out
+
+
+def router_diffs(master_zip, student_zip, norm_prefix: str, routers=None,
+                 max_lines: int = MAX_DIFF_LINES) -> dict:
+    """
+    {router: diff lines} for every master router (or just `routers`). A
+    router missing from the student diffs against an empty config.
+    """
+    prefix  = _diff_prefix(norm_prefix)
+    master  = prepare_master(master_zip, prefix)
+    student = load_configs_from_zip(student_zip)
+    diffs   = {}
+    for r in (routers if routers is not None else master):
+        if r not in master:
+            continue
+        s_lines = _lines(student[r], prefix) if r in student else []
+        out     = unified(master[r], s_lines, r, max_lines)
+        if prefix != norm_prefix:
+            # The two '---'/'+++' header lines hold router names; leave them be
+            out = out[:2] + [normalize_ips(line, norm_prefix) for line in out[2:]]
+        diffs[r] = out
+    return diffs
@@ -1,18 +1,112 @@
-import zipfile, os
+import io, zipfile, os
+from collections.abc import Mapping
 
-def load_configs_from_zip(zip_path):
-    cfgs = {}
+# --- EXTRACTION LIMITS ---
+MAX_ENTRIES        = 512               # entries of any kind in one ZIP
+MAX_ENTRY_BYTES    = 4 * 1024 * 1024   # uncompressed bytes per .txt entry
+MAX_TOTAL_BYTES    = 32 * 1024 * 1024  # uncompressed bytes across all .txt entries
+MAX_RATIO          = 100               # uncompressed / compressed size ...
+RATIO_MIN_BYTES    = 64 * 1024         # ... checked only for entries at least this big
+READ_CHUNK         = 64 * 1024
+
+class ZipLimitError(ValueError):
+    """The ZIP exceeds one of the extraction limits and was rejected."""
+
+class LazyConfigs(Mapping):
+    """
+    Router name → config text. Entries are kept as raw bytes and decoded
+    the first time they are looked up, so unused routers are never decoded.
+    """
+
+    def __init__(self, raw: dict):
+        self._raw  = raw
+        self._text = {}
+
+    def __getitem__(self, name):
+        text = self._text.get(name)
+        if text is None:
+            text = self._text[name] = self._raw[name].decode('utf-8', errors='ignore')
+        return text
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+def open_zip_source(source):
+    """
+    Accept a path, a file-like object, or raw bytes and return something
+    zipfile.ZipFile can open. Bytes are wrapped without writing to disk.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+def _read_bounded(z: zipfile.ZipFile, info: zipfile.ZipInfo, entry_cap: int, total_left: int) -> bytes:
+    # Header sizes can lie, so count what actually comes out of the stream
+    cap = min(entry_cap, total_left)
+    buf = bytearray()
+    with z.open(info) as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            buf += chunk
+            if len(buf) > cap:
+                if len(buf) > entry_cap:
+                    raise ZipLimitError(
+                        f"ZIP rejected: {info.filename} is larger than {entry_cap} bytes uncompressed."
+                    )
+                raise ZipLimitError("ZIP rejected: configs are larger than the total size limit.")
+    return bytes(buf)
+
+def load_configs_from_zip(
+    zip_path,
+    max_entries: int = None,
+    max_entry_bytes: int = None,
+    max_total_bytes: int = None,
+    max_ratio: float = None
+):
+    max_entries     = MAX_ENTRIES     if max_entries     is None else max_entries
+    max_entry_bytes = MAX_ENTRY_BYTES if max_entry_bytes is None else max_entry_bytes
+    max_total_bytes = MAX_TOTAL_BYTES if max_total_bytes is None else max_total_bytes
+    max_ratio       = MAX_RATIO       if max_ratio       is None else max_ratio
+
+    raw = {}
     has_txt_file = False
 
-    with zipfile.ZipFile(zip_path, 'r') as z:
-        for entry in z.namelist():
-            name = os.path.basename(entry)
-            if name.lower().endswith('.txt'):
-                has_txt_file = True
-                text = z.read(entry).decode('utf-8', errors='ignore')
-                cfgs[name] = text
+    with zipfile.ZipFile(open_zip_source(zip_path), 'r') as z:
+        infos = z.infolist()
+        if len(infos) > max_entries:
+            raise ZipLimitError(f"ZIP rejected: {len(infos)} entries (limit {max_entries}).")
+
+        txt_infos = [i for i in infos if os.path.basename(i.filename).lower().endswith('.txt')]
+
+        # Cheap checks on the declared sizes before decompressing anything
+        declared = 0
+        for info in txt_infos:
+            if info.file_size > max_entry_bytes:
+                raise ZipLimitError(
+                    f"ZIP rejected: {info.filename} is larger than {max_entry_bytes} bytes uncompressed."
+                )
+            if (info.file_size >= RATIO_MIN_BYTES
+                    and info.file_size > max_ratio * max(info.compress_size, 1)):
+                raise ZipLimitError(
+                    f"ZIP rejected: {info.filename} has a suspicious compression ratio."
+                )
+            declared += info.file_size
+        if declared > max_total_bytes:
+            raise ZipLimitError("ZIP rejected: configs are larger than the total size limit.")
+
+        total = 0
+        for info in txt_infos:
+            has_txt_file = True
+            data = _read_bounded(z, info, max_entry_bytes, max_total_bytes - total)
+            total += len(data)
+            raw[os.path.basename(info.filename)] = data
 
     if not has_txt_file:
         raise ValueError("No .txt files found in submitted ZIP. Please upload a valid configuration ZIP.")
 
-    return cfgs
+    return LazyConfigs(raw)
@@ -0,0 +1,245 @@
+# backend/forwarding.py
+"""
+Static-route forwarding simulation.
+
+Each router gets a forwarding table — connected subnets from its
+interfaces plus its `ip route` lines — in a binary longest-prefix-match
+trie. For every destination subnet we then follow next hops from every
+router, memoizing each router's outcome so a destination costs one
+lookup per router however many sources share the path. Outcomes:
+
+    ok          packet reaches a router directly connected to the subnet
+    black_hole  no matching route, or a next hop no neighbor owns
+    loop        the forwarding path revisits a router
+"""
+
+from backend.ipv4 import ip_to_int, mask_to_prefix, net_to_str, contains, network
+
+OK         = "ok"
+BLACK_HOLE = "black_hole"
+LOOP       = "loop"
+
+# Route kinds stored in the trie; connected routes go in first and win ties
+CONNECTED = "connected"
+VIA       = "via"
+EXIT      = "exit"
+
+# Cap on failing (source, destination) pairs listed in the report
+MAX_REPORTED = 50
+
+
+def _node() -> list:
+    return [[None] * 256, [None] * 256]
+
+
+class LpmTrie:
+    """
+    Longest-prefix-match trie over 32-bit prefixes with an 8-bit stride:
+    each node is [children, routes] indexed by one address byte, and a
+    prefix that ends mid-byte is expanded into every slot it covers, so a
+    lookup is at most four steps. routes[i] is (prefix_len, value).
+    """
+
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root = _node()
+
+    def insert(self, net: int, prefix: int, value) -> None:
+        """Add a route; longer prefixes win, and the first value for a prefix is kept."""
+        node, shift, depth = self.root, 24, 0
+        while prefix > depth + 8:
+            idx   = (net >> shift) & 0xFF
+            child = node[0][idx]
+            if child is None:
+                child = node[0][idx] = _node()
+            node, shift, depth = child, shift - 8, depth + 8
+        span   = 8 - (prefix - depth)
+        base   = ((net >> shift) & 0xFF) >> span << span
+        routes = node[1]
+        for i in range(base, base + (1 << span)):
+            cur = routes[i]
+            if cur is None or cur[0] < prefix:
+                routes[i] = (prefix, value)
+
+    def lookup(self, ip: int):
+        """Value of the longest prefix containing `ip`, or None."""
+        node, shift, best = self.root, 24, None
+        while node is not None:
+            idx = (ip >> shift) & 0xFF
+            hit = node[1][idx]
+            if hit is not None:
+                best = hit
+            node  = node[0][idx]
+            shift -= 8
+        return best[1] if best is not None else None
+
+
+def build_tables(parsed: dict) -> dict:
+    """
+    From {router: RouterConfig} build the forwarding model: one LPM trie per
+    router, plus the address → router, interface-name → subnet and
+    subnet → routers maps used to resolve next hops.
+    """
+    owner   = {}
+    ifaces  = {}
+    subnets = {}
+    for r, cfg in parsed.items():
+        ifaces[r] = {}
+        for iface in cfg.interfaces:
+            if iface.net is not None:
+                owner.setdefault(iface.ip_int, r)
+                ifaces[r][iface.name.lower()] = iface.net
+                subnets.setdefault(iface.net, set()).add(r)
+
+    model  = {"owner": owner, "ifaces": ifaces, "subnets": subnets}
+    tables = {}
+    for r, cfg in parsed.items():
+        trie = LpmTrie()
+        for net in ifaces[r].values():
+            trie.insert(net[0], net[1], (CONNECTED, net))
+        for rt in cfg.static_routes:
+            dest   = ip_to_int(rt.dest)
+            mask   = ip_to_int(rt.mask)
+            prefix = mask_to_prefix(mask) if mask is not None else None
+            if dest is None or prefix is None:
+                continue
+            # Next hops are resolved to routers here, once, not per packet
+            nh = ip_to_int(rt.next_hop)
+            if nh is not None:
+                trie.insert(*network(dest, prefix), (VIA, _resolve_via(model, r, nh)))
+            else:
+                net = ifaces[r].get(rt.next_hop.lower())
+                trie.insert(*network(dest, prefix), (EXIT, (net, _resolve_exit(model, r, net))))
+        tables[r] = trie
+
+    model["tables"] = tables
+    return model
+
+
+def _resolve_via(model: dict, r: str, nh: int):
+    """Router owning next hop `nh`, if it is on one of r's connected subnets."""
+    if not any(contains(net, nh) for net in model["ifaces"][r].values()):
+        return None
+    nxt = model["owner"].get(nh)
+    return nxt if nxt != r else None
+
+
+def _resolve_exit(model: dict, r: str, net):
+    """The single other router on exit subnet `net`, or None."""
+    if net is None:
+        return None
+    peers = model["subnets"][net] - {r}
+    return next(iter(peers)) if len(peers) == 1 else None
+
+
+def _next_router(model: dict, r: str, dst: int):
+    """One forwarding step: True when delivered, a router name, or None."""
+    route = model["tables"][r].lookup(dst)
+    if route is None:
+        return None
+    kind, arg = route
+    if kind == CONNECTED:
+        return True
+    if kind == VIA:
+        return arg
+    # Exit-interface route: delivered if dst is on that subnet, else the peer
+    net, peer = arg
+    if net is not None and contains(net, dst):
+        return True
+    return peer
+
+
+def trace_destination(model: dict, dst: int, sources) -> dict:
+    """
+    {router: (outcome, hops)} for packets to `dst` from each source router,
+    resolving every router on the way at most once.
+    """
+    memo = {}
+    for src in sources:
+        if src not in model["tables"]:
+            memo.setdefault(src, (BLACK_HOLE, 0))
+            continue
+        path, on_path = [], {}
+        r = src
+        while r not in memo:
+            if r in on_path:
+                # Every router on this path ends up circling the cycle
+                for x in path:
+                    memo[x] = (LOOP, 0)
+                break
+            on_path[r] = len(path)
+            path.append(r)
+            nxt = _next_router(model, r, dst)
+            if nxt is True:
+                memo[r] = (OK, 0)
+            elif nxt is None or nxt not in model["tables"]:
+                memo[r] = (BLACK_HOLE, 0)
+            else:
+                r = nxt
+                continue
+            break
+        # Unwind: each router inherits its successor's outcome, one hop further
+        outcome, hops = memo[r]
+        for x in reversed(path):
+            if x in memo:
+                outcome, hops = memo[x]
+                continue
+            if outcome == OK:
+                hops += 1
+            memo[x] = (outcome, hops)
+    return {src: memo[src] for src in sources}
+
+
+def destinations(parsed: dict) -> dict:
+    """
+    {subnet: probe address} for every interface subnet, probing at the
+    lowest router address on the subnet.
+    """
+    dests = {}
+    for cfg in parsed.values():
+        for iface in cfg.interfaces:
+            if iface.net is not None:
+                cur = dests.get(iface.net)
+                if cur is None or iface.ip_int < cur:
+                    dests[iface.net] = iface.ip_int
+    return dict(sorted(dests.items()))
+
+
+def trace_all(model: dict, dests: dict, sources) -> dict:
+    """{(source, subnet): (outcome, hops)} for every source and destination."""
+    sources = list(sources)
+    out = {}
+    for net, probe in dests.items():
+        for src, res in trace_destination(model, probe, sources).items():
+            out[(src, net)] = res
+    return out
+
+
+def reachability_report(traces: dict, master_traces: dict = None) -> dict:
+    """
+    Summarize trace_all() output. With `master_traces`, also list the pairs
+    the master reaches but these tables do not ("regressions").
+    """
+    counts  = {OK: 0, BLACK_HOLE: 0, LOOP: 0}
+    failing = []
+    for (src, net), (outcome, _) in traces.items():
+        counts[outcome] += 1
+        if outcome != OK:
+            failing.append(f"{src} → {net_to_str(net)}: {outcome.replace('_', ' ')}")
+
+    report = {
+        "pairs":       len(traces),
+        "reachable":   counts[OK],
+        "black_holes": counts[BLACK_HOLE],
+        "loops":       counts[LOOP],
+        "failures":    failing[:MAX_REPORTED],
+    }
+    if master_traces is not None:
+        expected    = [k for k, (outcome, _) in master_traces.items() if outcome == OK]
+        regressions = [k for k in expected if traces.get(k, (BLACK_HOLE, 0))[0] != OK]
+        report["expected_reachable"] = len(expected)
+        report["regressions"]        = len(regressions)
+        # Reaches everything the master does, however the routes are written
+        report["equivalent_to_master"] = not regressions
+    return report
@@ -0,0 +1,124 @@
+# backend/grader/cache.py
+
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE  = 1 << 20
+DIGEST_MEMO = 4096
+
+# (path, mtime_ns, size) → digest, so a master ZIP graded against many
+# students is only hashed once per process.
+_DIGESTS = {}
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's contents, read in 1 MiB chunks."""
+    st  = os.stat(path)
+    sig = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _DIGESTS.get(sig)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(chunk)
+        if len(_DIGESTS) >= DIGEST_MEMO:
+            _DIGESTS.clear()
+        digest = _DIGESTS[sig] = h.hexdigest()
+    return digest
+
+
+def source_sha256(source) -> str:
+    """Hex SHA-256 of a ZIP given as a path, bytes-like object or file object."""
+    if isinstance(source, (str, os.PathLike)):
+        return file_sha256(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    h   = hashlib.sha256()
+    pos = source.tell()
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        h.update(chunk)
+    source.seek(pos)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Thread-safe LRU cache of derived grading artifacts, keyed by content hash.
+
+    If `cache_dir` is given, built artifacts are also pickled there so a
+    restarted process (or another worker) can skip the rebuild.
+    """
+
+    def __init__(self, maxsize: int = 32, cache_dir: str = None):
+        self.maxsize   = maxsize
+        self.cache_dir = cache_dir
+        self._items    = OrderedDict()
+        self._lock     = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + '.pkl')
+
+    def _load_disk(self, key: str):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save_disk(self, key: str, value) -> None:
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        return None
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get_or_build(self, key: str, build):
+        """Return the cached artifact for `key`, calling `build()` on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = self._load_disk(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = build()
+            self._save_disk(key, value)
+        else:
+            with self._lock:
+                self.hits += 1
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,93 @@
+// backend/grader/client.js
+
+const { spawn }   = require('child_process');
+const path        = require('path');
+const readline    = require('readline');
+
+// Project root, so `python -m backend.grader.server` can import `backend.*`
+const PROJECT_ROOT = path.resolve(__dirname, '..', '..');
+const PYTHON       = process.env.PYTHON_BIN || 'python3';
+// Per-request limit, above the server's own per-job wall budget so a budget
+// abort reaches the caller first; past it the server is assumed stuck.
+const TIMEOUT_MS   = Number(process.env.GRADER_TIMEOUT_MS) || 300000;
+
+let server  = null;
+let nextId  = 1;
+const pending = new Map();
+
+function failAll(message) {
+  for (const { reject, timer } of pending.values()) {
+    clearTimeout(timer);
+    reject(new Error(message));
+  }
+  pending.clear();
+}
+
+// Start (or reuse) the long-lived grading server.
+function getServer() {
+  if (server) return server;
+
+  const args = ['-m', 'backend.grader.server'];
+  if (process.env.GRADER_WORKERS) {
+    args.push('--workers', process.env.GRADER_WORKERS);
+  }
+  const py = spawn(PYTHON, args, { cwd: PROJECT_ROOT });
+
+  let stderr = '';
+  py.stderr.on('data', chunk => {
+    stderr = (stderr + chunk.toString()).slice(-4096);
+  });
+
+  readline.createInterface({ input: py.stdout }).on('line', line => {
+    let msg;
+    try {
+      msg = JSON.parse(line);
+    } catch (err) {
+      console.error('Failed to parse JSON from grader server:', line);
+      return;
+    }
+    const entry = pending.get(msg.id);
+    if (!entry) return;
+    pending.delete(msg.id);
+    clearTimeout(entry.timer);
+    entry.resolve(msg);
+  });
+
+  const onGone = reason => {
+    if (server !== py) return;
+    server = null;
+    console.error('Python grader server stopped:', reason, stderr);
+    failAll(stderr.trim() || `grader server ${reason}`);
+  };
+  py.on('exit', code => onGone(`exited with code ${code}`));
+  py.on('error', err => onGone(err.message));
+  py.stop = reason => {
+    onGone(reason);
+    py.kill('SIGKILL');
+  };
+
+  server = py;
+  return server;
+}
+
+/**
+ * Send one grading request to the shared server.
+ * Resolves with the raw response: { id, success, result } or { id, success, error }.
+ * Rejects after TIMEOUT_MS and restarts the server; requests still in
+ * flight on it are rejected too, and later ones start a fresh server.
+ */
+function request(gradeArgs) {
+  return new Promise((resolve, reject) => {
+    const py = getServer();
+    const id = nextId++;
+    const timer = setTimeout(() => {
+      if (!pending.delete(id)) return;
+      reject(new Error(`grader request timed out after ${TIMEOUT_MS} ms`));
+      py.stop(`timed out on request ${id}`);
+    }, TIMEOUT_MS);
+    pending.set(id, { resolve, reject, timer });
+    py.stdin.write(JSON.stringify({ id, args: gradeArgs }) + '\n');
+  });
+}
+
+module.exports = { request };
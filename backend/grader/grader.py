@@ -3,7 +3,6 @@
 import re
 import os
 import sys
-import ipaddress
 from collections import Counter, deque
 
 # ─── PATCH: add project root so `import backend.xxx` works ──────────────
@@ -15,57 +14,62 @@ if PROJECT_ROOT not in sys.path:
 # ─────────────────────────────────────────────────────────────────────────
 
 from backend.extractor.extractor import load_configs_from_zip
-from backend.normalizer.normalizer import normalize_ips
-from backend.topology import parse_router_subnets, build_edges
-
-# --- DEDUCTION CONSTANTS ---
-HOSTNAME_DEDUCTION              = 5
-STATIC_MISSING_DEDUCTION_CAP    = 50
-STATIC_NEXT_HOP_CREDIT          = 0.75
-STATIC_MASK_CREDIT              = 0.50
-MASK_DEDUCTION_PER_IFACE        = 5
-STATIC_DUPLICATE_DEDUCTION      = 2
-OSPF_MISSING_DEDUCTION_PER_NET  = 20
-OSPF_EXTRA_DEDUCTION_PER_NET    = 2
-OSPF_MISSING_DEDUCTION_CAP      = 80
-OSPF_EXTRA_DEDUCTION_CAP        = 10
+from backend.normalizer.normalizer import clean_config
+from backend.ipv4 import MASK_STR_TO_PREFIX, ip_to_int, net_to_str
+from backend.parser.parser import RouterConfig, parse_config
+from backend.topology import parse_router_subnets, index_subnets, build_edges
+from backend.forwarding import build_tables, destinations, trace_all, reachability_report
+from backend import ospf
+from backend.grader.cache import ArtifactCache, source_sha256
+from backend.grader.instrument import StageTimer, run_profiled
+from backend.grader.rubric import DEFAULT_RUBRIC, make_rubric, score_facts
+from backend.grader.shared_prefix import model_prefix, portable, move_facts
+
+# --- FACTS VERSION ---
+# Bump FACTS_VERSION whenever extract_facts() or the layout of its output
+# changes, so facts and summaries from older code are not reused. Deduction
+# values live in backend.grader.rubric and never need re-extraction.
+FACTS_VERSION = 5
+
+# Bump MASTER_MODEL_VERSION whenever build_master_model() adds, removes or
+# reshapes a key, so models pickled into GRADER_CACHE_DIR by older code
+# are rebuilt instead of loaded.
+MASTER_MODEL_VERSION = 2
+
+# --- MASTER ARTIFACT CACHE ---
+# Birthday-prefix submissions share one model per master where they can
+# (see backend.grader.shared_prefix), not one per student's prefix.
+MASTER_CACHE = ArtifactCache(
+    maxsize   = int(os.environ.get('GRADER_MASTER_CACHE_SIZE', 32)),
+    cache_dir = os.environ.get('GRADER_CACHE_DIR') or None
+)
+
+EMPTY_CONFIG = RouterConfig()
 
 # --- REGEX PATTERNS ---
-FORMAT_PAT       = re.compile(r'\b2\d{2}\.\d{2}\.\d+\.\d+\b')
-STATIC_ROUTE_PAT = re.compile(r'^\s*ip\s+route\s+.*$', re.IGNORECASE|re.MULTILINE)
-OSPF_PATTERN     = re.compile(r'^\s*router\s+ospf\b', re.IGNORECASE|re.MULTILINE)
-
-def sanitize_config(cfg: str) -> str:
-    out = []
-    for line in cfg.splitlines():
-        s = line.strip()
-        if not s or s.startswith('!') or s.startswith('#'):
-            continue
-        if '!' in line:
-            line = line.split('!')[0]
-        out.append(line)
-    return '\n'.join(out)
+FORMAT_PAT = re.compile(r'\b2\d{2}\.\d{2}\.\d+\.\d+\b')
+# A normalization prefix whose rewritten IPs still pass FORMAT_PAT
+BIRTHDAY_PREFIX_PAT = re.compile(r'2\d{2}\.\d{2}')
+PREFIXED_IP_PAT     = re.compile(r'\b(2\d{2}\.\d{2})\.\d+\.\d+\b')
 
 def mask_to_cidr(mask: str) -> int:
+    cidr = MASK_STR_TO_PREFIX.get(mask)
+    if cidr is not None:
+        return cidr
+    # Non-contiguous or odd masks: count the set bits, as before
+    mask_i = ip_to_int(mask)
+    if mask_i is not None:
+        return mask_i.bit_count()
     return sum(bin(int(o)).count('1') for o in mask.split('.'))
 
-def get_hostname(cfg: str) -> str | None:
-    m = re.search(r'^\s*hostname\s+(\S+)', cfg, re.MULTILINE|re.IGNORECASE)
-    return m.group(1) if m else None
-
-def parse_ospf_networks(cfg: str) -> set[str]:
-    nets = set()
-    for m in re.finditer(
-        r'^\s*network\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)\s+area\s+\d+',
-        cfg, re.MULTILINE|re.IGNORECASE
-    ):
-        ip_str, wc_str = m.group(1), m.group(2)
-        ip_i = int(ipaddress.IPv4Address(ip_str))
-        wc_i = int(ipaddress.IPv4Address(wc_str))
-        net_i = ip_i & (~wc_i & 0xFFFFFFFF)
-        prefix = 32 - bin(wc_i).count('1')
-        nets.add(str(ipaddress.IPv4Network((net_i, prefix))))
-    return nets
+def _parsed(cfg) -> RouterConfig:
+    return cfg if isinstance(cfg, RouterConfig) else parse_config(cfg)
+
+def get_hostname(cfg) -> str | None:
+    return _parsed(cfg).hostname
+
+def parse_ospf_networks(cfg) -> set[str]:
+    return {net_to_str((n.net, n.prefix)) for n in _parsed(cfg).ospf_networks}
 
 def parse_ospf_neighbors(output: str) -> set[str]:
     neighs = set()
@@ -95,32 +99,191 @@ def all_reachable(edges: dict) -> bool:
                 q.append(v)
     return len(seen) == len(adj)
 
-def grade_all(
-    master_zip: str,
-    student_zip: str,
-    master_neigh_zip: str,
-    student_neigh_zip: str,
-    birthday_prefix: str,
-    master_prefix: str = None
-) -> dict:
-    norm_prefix = master_prefix or birthday_prefix
+def _static_routes(cfg: RouterConfig) -> list:
+    return [(rt.dest, mask_to_cidr(rt.mask), rt.next_hop) for rt in cfg.static_routes]
 
-    # 1) LOAD
+def build_master_model(master_zip, master_neigh_zip, norm_prefix: str) -> dict:
+    """
+    Load and derive everything grade_all needs from the master side.
+    The result only depends on the ZIP contents and `norm_prefix`.
+    """
     m_raw  = load_configs_from_zip(master_zip)
-    s_raw  = load_configs_from_zip(student_zip)
     mn_raw = load_configs_from_zip(master_neigh_zip)
-    sn_raw = load_configs_from_zip(student_neigh_zip)
 
-    # 2) SANITIZE & NORMALIZE
-    mcfgs   = {r: normalize_ips(sanitize_config(txt), norm_prefix) for r, txt in m_raw.items()}
-    scfgs   = {r: normalize_ips(sanitize_config(txt), norm_prefix) for r, txt in s_raw.items()}
-    m_neigh = {r: normalize_ips(sanitize_config(txt), norm_prefix) for r, txt in mn_raw.items()}
-    s_neigh = {r: normalize_ips(sanitize_config(txt), norm_prefix) for r, txt in sn_raw.items()}
+    mcfgs   = {r: clean_config(txt, norm_prefix) for r, txt in m_raw.items()}
+    m_neigh = {r: clean_config(txt, norm_prefix) for r, txt in mn_raw.items()}
+
+    mparsed = {r: parse_config(txt) for r, txt in mcfgs.items()}
+
+    # Master subnets map
+    master_nets_by_router = {r: parse_router_subnets(cfg) for r, cfg in mparsed.items()}
+
+    # Router→(net→IP) map
+    router_iface_map = {}
+    for r, cfg in mparsed.items():
+        router_iface_map[r] = {}
+        for iface in cfg.interfaces:
+            if iface.net is not None:
+                router_iface_map[r][iface.net] = iface.ip
+
+    # Master edges & expected neighbors, both off one subnet→routers index
+    subnet_index = index_subnets(master_nets_by_router)
+    m_edges      = build_edges(master_nets_by_router, subnet_index)
+    expected_neighbors = {r: set() for r in mcfgs}
+    for net, routers in subnet_index.items():
+        if len(routers) < 2:
+            continue
+        ips = [(r, router_iface_map[r].get(net)) for r in routers]
+        for r1, ip1 in ips:
+            for r2, ip2 in ips:
+                if r1 != r2 and ip1 and ip2:
+                    expected_neighbors[r1].add(ip2)
+
+    # Forwarding simulation and SPF over the master's own configs, for comparison
+    m_dests = destinations(mparsed)
+    m_graph = ospf.build_graph(mparsed)
+
+    m_neighbors = {r: parse_ospf_neighbors(txt) for r, txt in m_neigh.items()}
+    return {
+        "prefix":             norm_prefix,
+        # Whether submissions on other prefixes may be graded against this one
+        "portable":           (model_prefix(norm_prefix) == norm_prefix and
+                               portable(mparsed, mcfgs, set().union(*m_neighbors.values()), norm_prefix)),
+        "configs":            mcfgs,
+        "parsed":             mparsed,
+        "static_global":      any(cfg.has_static_routes for cfg in mparsed.values()),
+        "ospf_global":        any(cfg.has_ospf          for cfg in mparsed.values()),
+        "static_routes":      {r: _static_routes(cfg)      for r, cfg in mparsed.items()},
+        "ospf_networks":      {r: parse_ospf_networks(cfg) for r, cfg in mparsed.items()},
+        "ospf_neighbors":     m_neighbors,
+        "subnet_index":       subnet_index,
+        "edges":              m_edges,
+        "expected_neighbors": expected_neighbors,
+        "destinations":       m_dests,
+        "reachability":       trace_all(build_tables(mparsed), m_dests, mparsed),
+        "ospf_tables":        ospf.routing_tables(m_graph),
+        "ospf_links":         m_graph["links"],
+    }
+
+def _cached_model(master_zip, master_neigh_zip, prefix: str) -> dict:
+    """
+    Cached build_master_model(), keyed by the model version, the SHA-256
+    of both master ZIPs and the prefix it is built on.
+    """
+    key = ":".join((f"v{MASTER_MODEL_VERSION}", source_sha256(master_zip), source_sha256(master_neigh_zip),
+                    str(prefix)))
+    return MASTER_CACHE.get_or_build(
+        key, lambda: build_master_model(master_zip, master_neigh_zip, prefix)
+    )
+
+def load_master_model(master_zip, master_neigh_zip, norm_prefix: str) -> dict:
+    """
+    The master model `norm_prefix` submissions are graded against: the
+    shared model_prefix() one when the master is portable, else its own.
+    """
+    shared = model_prefix(norm_prefix)
+    if shared != norm_prefix:
+        model = _cached_model(master_zip, master_neigh_zip, shared)
+        if model["portable"]:
+            return model
+    return _cached_model(master_zip, master_neigh_zip, norm_prefix)
+
+def _source_name(source) -> str:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    return os.path.basename(getattr(source, 'name', '') or '')
+
+def _router_facts(scfg: RouterConfig, assignment_type: str, master: dict, rname: str,
+                  s_neigh: dict, ospf_unreachable: dict) -> dict:
+    """Everything score_router() needs to know about one student router."""
+    expected = master["expected_neighbors"][rname]
+
+    ips_to_check = {iface.ip for iface in scfg.interfaces}
+    ips_to_check.update(rt.last for rt in scfg.static_routes)
+
+    hn = scfg.hostname
+    facts = {
+        "bad_masks":     [iface.ip for iface in scfg.interfaces if mask_to_cidr(iface.mask) != 24],
+        "format_errors": sum(1 for ip in ips_to_check if not FORMAT_PAT.fullmatch(ip)),
+        "hostname":      "missing" if not hn else "default" if hn.lower() == "router" else None,
+        "static":        None,
+        "ospf":          None,
+    }
+
+    if assignment_type == 'static':
+        master_routes = master["static_routes"][rname]
+        student_raw   = _static_routes(scfg)
+        student_dict  = {}
+        for d, cm, nh_ in student_raw:
+            student_dict.setdefault((d, cm), []).append(nh_)
+
+        results = []
+        for dest, mlen, nh in master_routes:
+            key = (dest, mlen)
+            if key in student_dict:
+                kind = "ok" if nh in student_dict[key] else "next_hop"
+            elif any(d == dest for d, _, _ in student_raw):
+                kind = "mask"
+            else:
+                kind = "missing"
+            results.append([kind, dest, mlen])
+
+        facts["static"] = {
+            "routes":     len(master_routes),
+            "multi_hop":  [nh for _, _, nh in student_raw if nh not in expected],
+            "results":    results,
+            "duplicates": sum(c - 1 for c in Counter((d, m) for d, m, _ in student_raw).values() if c > 1),
+        }
+    else:
+        m_nets = master["ospf_networks"][rname]
+        s_nets = parse_ospf_networks(scfg)
+        snb    = parse_ospf_neighbors(s_neigh.get(rname, ""))
+        facts["ospf"] = {
+            "missing":           sorted(m_nets - s_nets),
+            "extra":             sorted(s_nets - m_nets),
+            "missing_neighbors": sorted(expected - snb),
+            "extra_neighbors":   sorted(snb - expected),
+            "unreachable":       ospf_unreachable.get(rname, []),
+            "static_routes":     scfg.has_static_routes,
+        }
+    return facts
+
+def _student_side(s_raw: dict, sn_raw: dict, mcfgs: dict, prefix: str) -> tuple:
+    """(configs, neighbor outputs, parsed configs) of a submission, normalized onto `prefix`."""
+    scfgs   = {r: clean_config(txt, prefix) for r, txt in s_raw.items()}
+    # Neighbor outputs are only read for routers the master grades
+    s_neigh = {r: clean_config(sn_raw[r], prefix) for r in mcfgs if r in sn_raw}
+    return scfgs, s_neigh, {r: parse_config(txt) for r, txt in scfgs.items()}
+
+def _neighbor_ips(s_neigh: dict) -> set:
+    return set().union(*(parse_ospf_neighbors(txt) for txt in s_neigh.values()))
+
+def _extract(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+             birthday_prefix, master_prefix, master_name, timer) -> dict:
+    norm_prefix = master_prefix or birthday_prefix
+
+    # 1) LOAD (master side comes fully derived from the cache)
+    master = load_master_model(master_zip, master_neigh_zip, norm_prefix)
+    timer.lap("master")
+    s_raw  = load_configs_from_zip(student_zip)
+    sn_raw = load_configs_from_zip(student_neigh_zip)
+    timer.lap("load")
+
+    # 2) SANITIZE & NORMALIZE, onto the prefix the master model was built on
+    prefix = master["prefix"]
+    scfgs, s_neigh, sparsed = _student_side(s_raw, sn_raw, master["configs"], prefix)
+    if prefix != norm_prefix and not portable(sparsed, scfgs, _neighbor_ips(s_neigh), prefix):
+        # Something in this submission tells the prefixes apart: grade it on its own
+        master = _cached_model(master_zip, master_neigh_zip, norm_prefix)
+        prefix = norm_prefix
+        scfgs, s_neigh, sparsed = _student_side(s_raw, sn_raw, master["configs"], prefix)
+    mcfgs = master["configs"]
+    timer.lap("normalize")
 
     # 3) DETECT ASSIGNMENT TYPE
-    base = os.path.basename(master_zip).lower()
-    static_global = any(STATIC_ROUTE_PAT.search(txt) for txt in mcfgs.values())
-    ospf_global   = any(OSPF_PATTERN.search(txt)    for txt in mcfgs.values())
+    base = (master_name or _source_name(master_zip)).lower()
+    static_global = master["static_global"]
+    ospf_global   = master["ospf_global"]
 
     if 'static' in base or static_global:
         assignment_type = 'static'
@@ -128,221 +291,102 @@ def grade_all(
         assignment_type = 'ospf'
     else:
         assignment_type = 'static'
+    timer.lap("detect_type")
 
-    # 4) MASTER SUBNETS MAP
-    master_nets_by_router = {r: parse_router_subnets(txt) for r, txt in mcfgs.items()}
+    # 4–6) MASTER SUBNETS, IFACE MAP, EDGES & EXPECTED NEIGHBORS (cached)
+    m_edges = master["edges"]
 
-    # 5) ROUTER→(NET→IP) MAP
-    router_iface_map = {}
-    for r, txt in mcfgs.items():
-        router_iface_map[r] = {}
-        for m in re.finditer(r'interface\s+\S+(.*?)(?=^interface|\Z)', txt, re.MULTILINE|re.DOTALL):
-            block = m.group(1)
-            mm = re.search(r'ip\s+address\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)', block, re.IGNORECASE)
-            if not mm:
-                continue
-            ip, mask = mm.groups()
-            net = ipaddress.IPv4Network(f"{ip}/{mask}", strict=False)
-            router_iface_map[r][net] = ip
-
-    # 6) MASTER EDGES & EXPECTED NEIGHBORS
-    m_edges = build_edges(master_nets_by_router)
-    expected_neighbors = {r: set() for r in mcfgs}
-    for (r1, r2), net_str in m_edges.items():
-        net = ipaddress.IPv4Network(net_str)
-        ip1 = router_iface_map[r1].get(net)
-        ip2 = router_iface_map[r2].get(net)
-        if ip1 and ip2:
-            expected_neighbors[r1].add(ip2)
-            expected_neighbors[r2].add(ip1)
-
-    per_router    = {}
-    router_scores = []
-
-    # 7) PER-ROUTER GRADING
-    for rname, mtxt in mcfgs.items():
-        stxt = scfgs.get(rname, '')
-        score = 100.0
-
-        static_fb, ospf_fb = [], []
-        mask_fb, fmt_fb, hostname_fb = [], [], []
-
-        # Mask & format checks
-        iface_addrs = []
-        for m in re.finditer(r'interface\s+\S+(.*?)(?=^interface|\Z)', stxt, re.MULTILINE|re.DOTALL):
-            block = m.group(1)
-            mm = re.search(r'ip\s+address\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)', block, re.IGNORECASE)
-            if not mm:
-                continue
-            ip, mask = mm.groups()
-            iface_addrs.append((ip, mask))
-            if mask_to_cidr(mask) != 24:
-                mask_fb.append(f"❌ Incorrect mask for {ip}: −{MASK_DEDUCTION_PER_IFACE} pts")
-                score -= MASK_DEDUCTION_PER_IFACE
-
-        ips_to_check = {ip for ip, _ in iface_addrs}
-        for line in STATIC_ROUTE_PAT.findall(stxt):
-            parts = line.split()
-            if len(parts) >= 5:
-                ips_to_check.add(parts[-1])
-        errs = [ip for ip in ips_to_check if not FORMAT_PAT.fullmatch(ip)]
-        if errs:
-            p = len(errs) * 5
-            fmt_fb.append(f"⚠️ {len(errs)} invalid IP format(s): −{p} pts")
-            score -= p
-
-        if assignment_type == 'static':
-            # (static routing logic unchanged…)
-            master_routes = []
-            for line in STATIC_ROUTE_PAT.findall(mtxt):
-                p = line.split()
-                if len(p) < 5:
-                    continue
-                master_routes.append((p[2], mask_to_cidr(p[3]), p[4]))
-
-            student_raw  = []
-            student_dict = {}
-            for line in STATIC_ROUTE_PAT.findall(stxt):
-                p = line.split()
-                if len(p) < 5:
-                    continue
-                d, m_, nh_ = p[2], p[3], p[4]
-                cm = mask_to_cidr(m_)
-                student_raw.append((d, cm, nh_))
-                student_dict.setdefault((d, cm), []).append(nh_)
-
-            N        = max(len(master_routes), 1)
-            share    = 100.0 / N
-            miss_pen = 0.0
-
-            direct_nh = expected_neighbors[rname]
-            for _, _, nh in student_raw:
-                if nh not in direct_nh:
-                    miss_pen += share
-                    static_fb.append(
-                        f"❌ Multi-hop next-hop {nh} not directly connected: −{round(share,1)} pts"
-                    )
-
-            for dest, mlen, nh in master_routes:
-                key = (dest, mlen)
-                if key in student_dict:
-                    nhs = student_dict[key]
-                    if nh in nhs:
-                        continue
-                    else:
-                        pen = share * (1 - STATIC_NEXT_HOP_CREDIT)
-                        static_fb.append(f"❌ {dest}/{mlen} wrong next-hop: −{round(pen,1)} pts")
-                else:
-                    if any(d == dest for d, _, _ in student_raw):
-                        pen = share * (1 - STATIC_MASK_CREDIT)
-                        static_fb.append(f"❌ {dest} wrong mask: −{round(pen,1)} pts")
-                    else:
-                        pen = share
-                        static_fb.append(f"❌ Missing {dest}/{mlen}: −{round(pen,1)} pts")
-                miss_pen += pen
-
-            miss_pen = min(miss_pen, STATIC_MISSING_DEDUCTION_CAP)
-            score -= miss_pen
-
-            dup_count = sum(c - 1 for c in Counter((d, m) for d, m, _ in student_raw).values() if c > 1)
-            if dup_count:
-                dup_pen = min(dup_count * STATIC_DUPLICATE_DEDUCTION, 10)
-                static_fb.append(f"❌ Duplicate static destinations: −{dup_pen} pts")
-                score -= dup_pen
-
-            if not static_fb:
-                static_fb.append("✅ All required static routes configured!")
-        else:
-            # (OSPF logic unchanged…)
-            m_nets = parse_ospf_networks(mtxt)
-            s_nets = parse_ospf_networks(stxt)
-
-            missing = m_nets - s_nets
-            if missing:
-                mp = min(len(missing) * OSPF_MISSING_DEDUCTION_PER_NET, OSPF_MISSING_DEDUCTION_CAP)
-                ospf_fb.append(f"❌ Missing OSPF net(s): {sorted(missing)} −{mp} pts")
-                score -= mp
-
-            extra = s_nets - m_nets
-            if extra:
-                ep = min(len(extra) * OSPF_EXTRA_DEDUCTION_PER_NET, OSPF_EXTRA_DEDUCTION_CAP)
-                ospf_fb.append(f"⚠️ Extra OSPF net(s): {sorted(extra)} −{ep} pts")
-                score -= ep
-
-            if not missing and not extra:
-                ospf_fb.append("✅ All OSPF networks present!")
-
-            mnb      = parse_ospf_neighbors(m_neigh.get(rname, ""))
-            snb      = parse_ospf_neighbors(s_neigh.get(rname, ""))
-            miss_nb  = expected_neighbors[rname] - snb
-            if miss_nb:
-                ospf_fb.append(f"�⚠ Missing OSPF neighbor(s): {sorted(miss_nb)}")
-            extra_nb = snb - expected_neighbors[rname]
-            if extra_nb:
-                ospf_fb.append(f"⚠️ Unexpected OSPF neighbor(s): {sorted(extra_nb)}")
-
-            if STATIC_ROUTE_PAT.search(stxt):
-                ospf_fb.append(f"❌ Static routes in OSPF assignment: −{HOSTNAME_DEDUCTION} pts")
-                score -= HOSTNAME_DEDUCTION
-
-        hn = get_hostname(stxt)
-        if not hn:
-            hostname_fb.append(f"❌ Missing hostname: −{HOSTNAME_DEDUCTION} pts")
-            score -= HOSTNAME_DEDUCTION
-        elif hn.lower() == "router":
-            hostname_fb.append(f"❌ Default hostname: −{HOSTNAME_DEDUCTION} pts")
-            score -= HOSTNAME_DEDUCTION
-
-        fb = []
-        if static_fb:   fb += ["--- Static Routing ---"] + static_fb
-        if ospf_fb:     fb += ["--- OSPF Routing ---"]  + ospf_fb
-        if mask_fb or fmt_fb:
-            fb += ["--- Mask & Format ---"] + mask_fb + fmt_fb
-        if hostname_fb:
-            fb += ["--- Hostname ---"] + hostname_fb
-
-        per_router[rname] = {"score": round(score,1), "feedback": fb}
-        router_scores.append(score)
-
-    # 8) AGGREGATE & TOPOLOGY CHECK
-    routing_score = round(sum(router_scores)/len(router_scores),1)
-    student_all   = {
-        r: parse_router_subnets(normalize_ips(txt, norm_prefix))
-        for r, txt in scfgs.items()
-    }
-    s_edges = build_edges(student_all)
-
-    if not all_reachable(s_edges):
-        topo_fb, td = ["❌ Network partition detected"], 20
+    # 4b) REACHABILITY: forwarding simulation (static) or SPF (OSPF).
+    #     Reported alongside the scores; neither changes them.
+    reachability, convergence, ospf_unreachable = None, None, {}
+    if assignment_type == 'static':
+        s_traces     = trace_all(build_tables(sparsed), master["destinations"], mcfgs)
+        reachability = reachability_report(s_traces, master["reachability"])
     else:
-        total   = len(m_edges)
-        missing = [e for e in m_edges if e not in s_edges]
-        cnt     = len(missing)
-        if cnt == 0:
-            topo_fb, td = ["✅ Topology matches!"], 0
-        elif cnt >= total/2:
-            topo_fb, td = [f"❌ {cnt} missing links ≥ half: −50 pts"], 50
-        elif cnt >= 2:
-            topo_fb, td = [f"❌ {cnt} missing links: −30 pts"], 30
-        else:
-            topo_fb, td = ["❌ 1 missing link: −10 pts"], 10
-
-    final_score = max(round(routing_score - td,1), 0.0)
-
-    # ─── Convert edge keys to JSON‐serializable strings ─────────────────────────
-    serial_m_edges = {"-".join(edge): net for edge, net in m_edges.items()}
-    serial_s_edges = {"-".join(edge): net for edge, net in s_edges.items()}
-
-    return {
-        "assignment_type":   assignment_type,
-        "num_routers":       len(mcfgs),
-        "per_router":        per_router,
-        "routing_score":     routing_score,
-        "topology_feedback": topo_fb,
-        "master_edges":      serial_m_edges,
-        "student_edges":     serial_s_edges,
-        "final_score":       final_score
+        s_graph     = ospf.build_graph(sparsed)
+        convergence = ospf.convergence_report(
+            ospf.routing_tables(s_graph), s_graph["links"],
+            master["ospf_tables"], master["ospf_links"]
+        )
+        ospf_unreachable = convergence.pop("unreachable")
+    timer.lap("reachability")
+
+    # 7) PER-ROUTER FACTS
+    routers = {
+        rname: _router_facts(sparsed.get(rname) or EMPTY_CONFIG, assignment_type,
+                             master, rname, s_neigh, ospf_unreachable)
+        for rname in mcfgs
+    }
+    timer.lap("per_router")
+
+    # 8) TOPOLOGY FACTS
+    student_all = {r: parse_router_subnets(cfg) for r, cfg in sparsed.items()}
+    s_edges     = build_edges(student_all)
+
+    facts = {
+        "version":         FACTS_VERSION,
+        "assignment_type": assignment_type,
+        "num_routers":     len(mcfgs),
+        "routers":         routers,
+        "topology": {
+            "partitioned":   not all_reachable(s_edges),
+            "missing_links": sum(1 for e in m_edges if e not in s_edges),
+            "master_links":  len(m_edges),
+        },
+        # ─── Edge keys as JSON‐serializable strings ────────────────────────
+        "master_edges":  {"-".join(edge): net for edge, net in m_edges.items()},
+        "student_edges": {"-".join(edge): net for edge, net in s_edges.items()},
     }
+    if reachability is not None:
+        facts["reachability"] = reachability
+    if convergence is not None:
+        facts["ospf_convergence"] = convergence
+    if prefix != norm_prefix:
+        facts = move_facts(facts, prefix, norm_prefix)
+    return facts
+
+def extract_facts(
+    master_zip,
+    student_zip,
+    master_neigh_zip,
+    student_neigh_zip,
+    birthday_prefix: str,
+    master_prefix: str = None,
+    master_name: str = None
+) -> dict:
+    """
+    Read and analyse one submission into JSON-serializable facts, to be
+    scored by rubric.score_facts(). Arguments are as for grade_all().
+    """
+    return _extract(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+                    birthday_prefix, master_prefix, master_name, StageTimer())
+
+def grade_all(
+    master_zip,
+    student_zip,
+    master_neigh_zip,
+    student_neigh_zip,
+    birthday_prefix: str,
+    master_prefix: str = None,
+    master_name: str = None,
+    timings: bool = False,
+    rubric: dict = None
+) -> dict:
+    """
+    Each ZIP may be a path, raw bytes or a file-like object. `master_name`
+    is the master's original filename, used for assignment-type detection
+    when `master_zip` is not a path (or is stored under another name).
+    With `timings`, the summary gets a per-stage "timings" block (seconds).
+    Scores use `rubric` (default: rubric.DEFAULT_RUBRIC).
+    """
+    timer   = StageTimer(timings)
+    facts   = _extract(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+                       birthday_prefix, master_prefix, master_name, timer)
+    summary = score_facts(facts, rubric)
+    timer.lap("aggregate")
+    if timings:
+        summary["timings"] = timer.summary()
+    return summary
 
 def format_summary(summary: dict) -> str:
     lines = []
@@ -360,6 +404,27 @@ def format_summary(summary: dict) -> str:
         for fb in d["feedback"]:
             lines.append(f"{r} : {fb}")
 
+    reach = summary.get("reachability")
+    if reach:
+        lines.append("\nReachability :")
+        lines.append(f"reachable : {reach['reachable']}/{reach['pairs']} "
+                     f"(black holes {reach['black_holes']}, loops {reach['loops']})")
+        if "regressions" in reach:
+            lines.append(f"unreachable vs master : {reach['regressions']}/{reach['expected_reachable']}")
+        for f in reach["failures"]:
+            lines.append(f)
+
+    conv = summary.get("ospf_convergence")
+    if conv:
+        lines.append("\nOSPF Convergence :")
+        lines.append(f"converges : {'yes' if conv['converges'] else 'no'}")
+        lines.append(f"adjacencies : {conv['adjacencies']}/{conv['expected_adjacencies']}")
+        lines.append(f"routes : {conv['reachable']}/{conv['pairs']} (suboptimal {conv['suboptimal']})")
+        for a in conv["missing_adjacencies"]:
+            lines.append(f"missing adjacency : {a}")
+        for f in conv["failures"]:
+            lines.append(f)
+
     lines.append("\nTopology (Master):")
     for link, net in summary["master_edges"].items():
         lines.append(f"{link} : {net}")
@@ -369,9 +434,249 @@ def format_summary(summary: dict) -> str:
 
     return "\n".join(lines)
 
-if __name__ == "__main__":
+# ─── BATCH GRADING ────────────────────────────────────────────────────────
+def _init_batch_worker(master_zip: str, master_neigh_zip: str, norm_prefix: str):
+    # Forked workers inherit the parent's cache; spawned ones build it here once.
+    load_master_model(master_zip, master_neigh_zip, norm_prefix)
+
+def _grade_one(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+               birthday_prefix, master_prefix, timings=False, keep_facts=False) -> dict:
+    try:
+        timer   = StageTimer(timings)
+        facts   = _extract(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+                           birthday_prefix, master_prefix, None, timer)
+        summary = score_facts(facts)
+        timer.lap("aggregate")
+        if timings:
+            summary["timings"] = timer.summary()
+        rec = {"student_zip": student_zip, "success": True, "result": summary}
+        if keep_facts:
+            rec["facts"] = facts
+        return rec
+    except Exception as e:
+        return {"student_zip": student_zip, "success": False, "error": str(e) or type(e).__name__}
+
+def master_birthday_prefix(master_zip) -> str:
+    """The "2MM.DD" prefix most of the master's own addresses use."""
+    counts = Counter()
+    for txt in load_configs_from_zip(master_zip).values():
+        counts.update(PREFIXED_IP_PAT.findall(txt))
+    if not counts:
+        raise ValueError("the master configs have no 2MM.DD addresses; pass --birthday_prefix")
+    return counts.most_common(1)[0][0]
+
+def add_prefix_args(p) -> None:
+    """--birthday_prefix / --master_prefix for the commands grading a directory against one master."""
+    p.add_argument("--birthday_prefix", default=None,
+                   help="2MM.DD prefix addresses are normalized onto (default: the master's own)")
+    p.add_argument("--master_prefix", default=None)
+
+def prefix_from_args(p, args) -> None:
+    """
+    Default args.birthday_prefix to --master_prefix or the master's own
+    prefix, and reject prefixes whose normalized IPs fail FORMAT_PAT.
+    """
+    if args.birthday_prefix is None:
+        try:
+            args.birthday_prefix = args.master_prefix or master_birthday_prefix(args.master_zip)
+        except ValueError as e:
+            p.error(str(e))
+    for name in ("birthday_prefix", "master_prefix"):
+        value = getattr(args, name)
+        if value is not None and not BIRTHDAY_PREFIX_PAT.fullmatch(value):
+            p.error(f"--{name} {value!r} is not a 2MM.DD prefix: every normalized IP would fail the format check")
+
+def find_student_zips(directory: str) -> list:
+    """
+    List (student_zip, student_neigh_zip) pairs in `directory`.
+    `<name>_neigh.zip` is paired with `<name>.zip`; otherwise the config
+    ZIP doubles as its own neighbor ZIP, as in routes.submit.
+    """
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith('.zip'))
+    neigh = {n[:-len('_neigh.zip')].lower(): n for n in names if n.lower().endswith('_neigh.zip')}
+    pairs = []
+    for n in names:
+        if n.lower().endswith('_neigh.zip'):
+            continue
+        path = os.path.join(directory, n)
+        nn   = neigh.get(n[:-len('.zip')].lower())
+        pairs.append((path, os.path.join(directory, nn) if nn else path))
+    return pairs
+
+def grade_batch(
+    master_zip: str,
+    student_zips,
+    birthday_prefix: str,
+    master_neigh_zip: str = None,
+    master_prefix: str = None,
+    workers: int = None,
+    timings: bool = False,
+    keep_facts: bool = False,
+    budget: dict = None
+):
+    """
+    Grade many students against one master, in parallel across cores.
+
+    `student_zips` holds paths or (student_zip, student_neigh_zip) pairs.
+    Yields one {"student_zip", "success", "result" | "error"} dict per
+    student, in completion order; with `keep_facts` successful records
+    also carry the "facts" that `rescore` needs. Each student is graded
+    under `budget` (see supervisor.DEFAULT_BUDGET); one that exceeds it
+    fails with the "budget" it hit.
+    """
+    from concurrent.futures import as_completed
+    from backend.grader.supervisor import SupervisedPool, JobAborted, aborted_record
+
+    master_neigh_zip = master_neigh_zip or master_zip
+    norm_prefix      = master_prefix or birthday_prefix
+
+    # Load the master once up front: fails fast, and forked workers inherit it
+    load_master_model(master_zip, master_neigh_zip, norm_prefix)
+
+    jobs = [(s, s) if isinstance(s, str) else tuple(s) for s in student_zips]
+    with SupervisedPool(
+        max_workers = workers or os.cpu_count(),
+        initializer = _init_batch_worker,
+        initargs    = (master_zip, master_neigh_zip, norm_prefix),
+        budget      = budget
+    ) as pool:
+        futures = {
+            pool.submit(_grade_one, master_zip, s, master_neigh_zip, sn,
+                        birthday_prefix, master_prefix, timings, keep_facts): s
+            for s, sn in jobs
+        }
+        for fut in as_completed(futures):
+            try:
+                rec = fut.result()
+            except JobAborted as e:
+                rec = aborted_record(futures[fut], e)
+            yield rec
+
+def add_budget_args(p) -> None:
+    """--cpu_budget / --memory_budget / --wall_budget for the pool-backed commands."""
+    from backend.grader.supervisor import DEFAULT_BUDGET
+
+    p.add_argument("--cpu_budget", type=float, default=None,
+                   help=f"CPU seconds per submission (default {DEFAULT_BUDGET['cpu_seconds']}, 0 = no limit)")
+    p.add_argument("--memory_budget", type=int, default=None,
+                   help=f"resident MB per grading worker (default {DEFAULT_BUDGET['memory_mb']}, 0 = no limit)")
+    p.add_argument("--wall_budget", type=float, default=None,
+                   help="wall-clock seconds per submission (default 2 x CPU budget + 10)")
+
+def budget_from_args(args) -> dict:
+    return {"cpu_seconds": args.cpu_budget, "memory_mb": args.memory_budget, "wall_seconds": args.wall_budget}
+
+def main(argv=None):
     import argparse, json
 
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if argv[:1] == ["batch"]:
+        p = argparse.ArgumentParser(
+            prog="grader.py batch",
+            description="Grade a directory of student ZIPs against one master, as JSON Lines"
+        )
+        p.add_argument("master_zip")
+        p.add_argument("student_dir")
+        add_prefix_args(p)
+        p.add_argument("--master_neigh_zip", default=None)
+        p.add_argument("--workers", type=int, default=None)
+        p.add_argument("--timings", action="store_true", help="add per-stage timings to each result")
+        p.add_argument("--facts", action="store_true", help="keep extracted facts in each record, for `rescore`")
+        p.add_argument("--shard", default=None, metavar="I/N",
+                       help="grade only shard I of N (0-based) into a shard file for `merge`")
+        p.add_argument("--out", default=None, help="shard file to write (default: shard-I-of-N.jsonl)")
+        add_budget_args(p)
+        args = p.parse_args(argv[1:])
+        prefix_from_args(p, args)
+
+        if args.shard:
+            from backend.grader.shard import parse_shard, grade_shard
+            try:
+                i, n = parse_shard(args.shard)
+            except ValueError as e:
+                p.error(str(e))
+            header = grade_shard(
+                master_zip       = args.master_zip,
+                student_dir      = args.student_dir,
+                shard            = i,
+                shards           = n,
+                out              = args.out or f"shard-{i}-of-{n}.jsonl",
+                birthday_prefix  = args.birthday_prefix,
+                master_neigh_zip = args.master_neigh_zip,
+                master_prefix    = args.master_prefix,
+                workers          = args.workers,
+                budget           = budget_from_args(args)
+            )
+            print(f"shard {i}/{n}: graded {len(header['students'])} submission(s)", file=sys.stderr)
+            return
+
+        aborted = {}
+        for rec in grade_batch(
+            master_zip       = args.master_zip,
+            student_zips     = find_student_zips(args.student_dir),
+            birthday_prefix  = args.birthday_prefix,
+            master_neigh_zip = args.master_neigh_zip,
+            master_prefix    = args.master_prefix,
+            workers          = args.workers,
+            timings          = args.timings,
+            keep_facts       = args.facts,
+            budget           = budget_from_args(args)
+        ):
+            if "budget" in rec:
+                resource = rec["budget"]["resource"]
+                aborted[resource] = aborted.get(resource, 0) + 1
+            print(json.dumps(rec), flush=True)
+        if aborted:
+            print("budget exceeded: " + ", ".join(f"{r} {n}" for r, n in sorted(aborted.items())), file=sys.stderr)
+        return
+
+    if argv[:1] == ["merge"]:
+        from backend.grader.shard import merge_shards
+        p = argparse.ArgumentParser(
+            prog="grader.py merge",
+            description="Combine `batch --shard` files into one cohort result"
+        )
+        p.add_argument("shard_files", nargs="+")
+        p.add_argument("--out", default=None, help="cohort JSON Lines file to write")
+        p.add_argument("--db", action="store_true", help="import the cohort into the submissions table ($DATABASE_URI)")
+        args = p.parse_args(argv[1:])
+        try:
+            header = merge_shards(args.shard_files, out=args.out, db=args.db)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        header.pop("submission_ids", None)
+        print(json.dumps(header))
+        return
+
+    if argv[:1] == ["watch"]:
+        from backend.grader.watch import main as watch_main
+        return watch_main(argv[1:])
+
+    if argv[:1] == ["rescore"]:
+        p = argparse.ArgumentParser(
+            prog="grader.py rescore",
+            description="Re-score `batch --facts` output under new rubric constants, without the ZIPs"
+        )
+        p.add_argument("records", help="JSON Lines from `batch --facts`")
+        p.add_argument("--rubric", default=None, metavar="JSON_FILE",
+                       help="rubric constants to override, e.g. {\"HOSTNAME_DEDUCTION\": 10}")
+        p.add_argument("--version", type=int, default=DEFAULT_RUBRIC["version"] + 1)
+        args = p.parse_args(argv[1:])
+
+        rubric = DEFAULT_RUBRIC
+        if args.rubric:
+            with open(args.rubric) as f:
+                rubric = make_rubric(json.load(f), args.version)
+        with open(args.records) as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec.get("facts"):
+                    rec["result"] = score_facts(rec["facts"], rubric)
+                print(json.dumps(rec), flush=True)
+        return
+
     p = argparse.ArgumentParser(description="Run ZIP-based router grader")
     p.add_argument("master_zip")
     p.add_argument("student_zip")
@@ -379,14 +684,26 @@ if __name__ == "__main__":
     p.add_argument("student_neigh_zip")
     p.add_argument("birthday_prefix")
     p.add_argument("--master_prefix", default=None)
-    args = p.parse_args()
+    p.add_argument("--timings", action="store_true", help="add per-stage timings to the summary")
+    p.add_argument("--profile", nargs="?", const="-", default=None, metavar="STATS_FILE",
+                   help="run under cProfile; dump pstats to STATS_FILE, or print the top functions to stderr")
+    args = p.parse_args(argv)
 
-    summary = grade_all(
+    grade_args = dict(
         master_zip        = args.master_zip,
         student_zip       = args.student_zip,
         master_neigh_zip  = args.master_neigh_zip,
         student_neigh_zip = args.student_neigh_zip,
         birthday_prefix   = args.birthday_prefix,
-        master_prefix     = args.master_prefix
+        master_prefix     = args.master_prefix,
+        timings           = args.timings
     )
+    if args.profile:
+        output  = None if args.profile == "-" else args.profile
+        summary = run_profiled(grade_all, output=output, **grade_args)
+    else:
+        summary = grade_all(**grade_args)
     print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 // backend/grader/index.js
 
-const { spawn } = require('child_process');
-const path       = require('path');
+const { request } = require('./client');
 
 function gradeZip({
   masterZip,
@@ -11,54 +10,21 @@ function gradeZip({
   birthdayPrefix,
   masterPrefix = null
 }) {
-  return new Promise((resolve, reject) => {
-    // Full path to the Python script
-    const script = path.join(__dirname, 'grader.py');
-
-    // Build the five required positional args:
-    // 1) master_zip, 2) student_zip, 3) master_neigh_zip,
-    // 4) student_neigh_zip, 5) birthday_prefix
-    const args = [
-      masterZip,
-      studentZip,
-      masterNeighZip || '',
-      studentNeighZip || '',
-      birthdayPrefix
-    ];
-
-    // If you want to override master prefix, add --master_prefix flag
-    if (masterPrefix) {
-      args.push('--master_prefix', masterPrefix);
+  // Same arguments as grade_all(); the long-lived grader server
+  // falls back to the config ZIPs when neighbor ZIPs are missing.
+  return request({
+    master_zip:        masterZip,
+    student_zip:       studentZip,
+    master_neigh_zip:  masterNeighZip || null,
+    student_neigh_zip: studentNeighZip || null,
+    birthday_prefix:   birthdayPrefix,
+    master_prefix:     masterPrefix
+  }).then(resp => {
+    if (!resp.success) {
+      console.error('Python grader error:', resp.error);
+      throw new Error(resp.error);
     }
-
-    // Spawn the Python process
-    const py = spawn('python', [ script, ...args ]);
-
-    let stdout = '';
-    let stderr = '';
-
-    py.stdout.on('data', chunk => {
-      stdout += chunk.toString();
-    });
-
-    py.stderr.on('data', chunk => {
-      stderr += chunk.toString();
-    });
-
-    py.on('close', code => {
-      if (code !== 0) {
-        console.error('Python grader error:', stderr);
-        return reject(new Error(stderr || `grader.py exited with code ${code}`));
-      }
-      try {
-        // Expecting ONLY JSON on stdout
-        const result = JSON.parse(stdout);
-        resolve(result);
-      } catch (err) {
-        console.error('Failed to parse JSON from grader:', stdout);
-        reject(err);
-      }
-    });
+    return resp.result;
   });
 }
 
@@ -0,0 +1,102 @@
+# backend/grader/ingest.py
+"""
+Offline grading records and their import into the database.
+
+grade_record() is `batch`'s per-student record plus what the database
+needs to store it as a submission (ZIP digests, the similarity
+signature), so records can be graded on one machine and imported on
+another without the ZIPs. DbSink saves such records like web
+submissions.
+"""
+
+import os
+
+from backend.grader.grader import FACTS_VERSION, _grade_one
+from backend.grader.cache import file_sha256
+
+
+def grade_record(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+                 birthday_prefix, master_prefix, signature: bool = True) -> dict:
+    """
+    _grade_one()'s record with facts kept, plus "sha256" / "neigh_sha256"
+    of the student's ZIPs and, with `signature`, the hex similarity
+    signature. Runs in pool workers.
+    """
+    from backend.similarity import config_signature
+
+    rec = _grade_one(master_zip, student_zip, master_neigh_zip, student_neigh_zip,
+                     birthday_prefix, master_prefix, False, True)
+    rec["sha256"]       = file_sha256(student_zip)
+    rec["neigh_sha256"] = rec["sha256"] if student_neigh_zip == student_zip else file_sha256(student_neigh_zip)
+    if signature and rec["success"]:
+        sig = config_signature(student_zip)
+        rec["signature"] = sig.hex() if sig else None
+    return rec
+
+
+# ─── DATABASE ─────────────────────────────────────────────────────────────
+def _db_app():
+    """A bare Flask app for the models, without the web routes or queue workers."""
+    from flask import Flask
+    from backend.config import Config, db
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+class DbSink:
+    """
+    Saves grade_record() records as submissions against one master, one
+    bulk transaction per save(). ZIPs still on disk are copied into
+    UPLOAD_FOLDER (when PERSIST_UPLOADS is on) so reports can diff them.
+    """
+
+    def __init__(self, birthday_prefix: str, master_sha256: str, master_neigh_sha256: str = None,
+                 master_zip: str = None, master_neigh_zip: str = None):
+        self.app = _db_app()
+        self.birthday_prefix = birthday_prefix
+        self.mdig    = master_sha256
+        self.mndig   = master_neigh_sha256 or master_sha256
+        self.folder  = self.app.config["UPLOAD_FOLDER"]
+        self.persist = self.app.config.get("PERSIST_UPLOADS", True)
+        os.makedirs(self.folder, exist_ok=True)
+        for path in (master_zip, master_neigh_zip):
+            self._copy(path)
+
+    def _copy(self, path) -> None:
+        from backend.storage import store_bytes
+
+        if self.persist and path and os.path.exists(path):
+            with open(path, "rb") as f:
+                store_bytes(f.read(), self.folder)
+
+    def save(self, recs) -> list:
+        """Persist the successful records; returns the new Submission ids."""
+        from backend.persistence import save_cohort, active_rubric
+        from backend.grader.rubric import score_facts
+        from backend.storage import result_key
+
+        with self.app.app_context():
+            rubric = active_rubric()
+            items  = []
+            for rec in recs:
+                if not rec["success"]:
+                    continue
+                self._copy(rec["student_zip"])
+                sig = rec.get("signature")
+                payload = {
+                    "student_name":     os.path.splitext(os.path.basename(rec["student_zip"]))[0],
+                    "birthday_prefix":  self.birthday_prefix,
+                    "master_zip_name":  self.mdig + ".zip",
+                    "student_zip_name": rec["sha256"] + ".zip",
+                    "result_key":       result_key(self.mdig, rec["sha256"], self.mndig, rec["neigh_sha256"],
+                                                   self.birthday_prefix, FACTS_VERSION),
+                    "facts":            rec["facts"],
+                    "signature":        bytes.fromhex(sig) if sig else None,
+                }
+                items.append((payload, score_facts(rec["facts"], rubric)))
+            return save_cohort(items)
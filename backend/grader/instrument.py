@@ -0,0 +1,70 @@
+# backend/grader/instrument.py
+"""
+Opt-in timing for grade_all's stages.
+
+Deployments register hooks with add_stage_hook(); each hook is called as
+hook(stage, seconds) after every stage of every grade_all call, e.g. to
+feed per-stage histograms. With no hooks and timings off, StageTimer does
+nothing.
+"""
+
+import time
+
+STAGES = ("master", "load", "normalize", "detect_type", "reachability", "per_router", "aggregate")
+
+STAGE_HOOKS = []
+
+
+def add_stage_hook(hook) -> None:
+    if hook not in STAGE_HOOKS:
+        STAGE_HOOKS.append(hook)
+
+
+def remove_stage_hook(hook) -> None:
+    if hook in STAGE_HOOKS:
+        STAGE_HOOKS.remove(hook)
+
+
+class StageTimer:
+    __slots__ = ("enabled", "stages", "_start", "_last")
+
+    def __init__(self, record: bool = False):
+        self.enabled = record or bool(STAGE_HOOKS)
+        self.stages  = {}
+        self._start  = self._last = time.perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage: str) -> None:
+        """Close `stage`, charging it the time since the previous lap."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        dt  = now - self._last
+        self._last = now
+        self.stages[stage] = dt
+        for hook in STAGE_HOOKS:
+            hook(stage, dt)
+
+    def summary(self) -> dict:
+        out = {stage: round(dt, 6) for stage, dt in self.stages.items()}
+        out["total"] = round(self._last - self._start, 6)
+        return out
+
+
+def run_profiled(fn, *args, output: str = None, limit: int = 30, stream=None, **kwargs):
+    """
+    Run fn(*args, **kwargs) under cProfile. Raw stats go to `output` (for
+    pstats/snakeviz) when given, otherwise the top `limit` functions by
+    cumulative time are printed to `stream` (stderr by default).
+    """
+    import sys
+    import pstats
+    import cProfile
+
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        if output:
+            prof.dump_stats(output)
+        else:
+            pstats.Stats(prof, stream=stream or sys.stderr).sort_stats("cumulative").print_stats(limit)
@@ -0,0 +1,237 @@
+# backend/grader/rubric.py
+"""
+Versioned scoring rubric.
+
+Grading is split in two: grader.extract_facts() reads the ZIPs once and
+records what is wrong (missing routes, bad masks, missing links, ...) as
+plain JSON, and score_facts() turns those facts into scores and feedback
+under a rubric. Changing a deduction only needs score_facts() rerun over
+stored facts, never the ZIPs.
+"""
+
+import math
+
+# Bump "version" whenever a value changes, so summaries scored under the
+# old values are told apart from new ones.
+DEFAULT_RUBRIC = {
+    "version":                          1,
+    "HOSTNAME_DEDUCTION":               5,
+    "FORMAT_DEDUCTION_PER_IP":          5,
+    "MASK_DEDUCTION_PER_IFACE":         5,
+    "STATIC_MISSING_DEDUCTION_CAP":     50,
+    "STATIC_NEXT_HOP_CREDIT":           0.75,
+    "STATIC_MASK_CREDIT":               0.50,
+    "STATIC_DUPLICATE_DEDUCTION":       2,
+    "STATIC_DUPLICATE_DEDUCTION_CAP":   10,
+    "OSPF_MISSING_DEDUCTION_PER_NET":   20,
+    "OSPF_EXTRA_DEDUCTION_PER_NET":     2,
+    "OSPF_MISSING_DEDUCTION_CAP":       80,
+    "OSPF_EXTRA_DEDUCTION_CAP":         10,
+    "OSPF_STATIC_ROUTES_DEDUCTION":     5,
+    "TOPOLOGY_PARTITION_DEDUCTION":     20,
+    "TOPOLOGY_HALF_MISSING_DEDUCTION":  50,
+    "TOPOLOGY_MULTI_MISSING_DEDUCTION": 30,
+    "TOPOLOGY_ONE_MISSING_DEDUCTION":   10,
+}
+
+
+def _constant(name: str, value):
+    """`value` as the type of DEFAULT_RUBRIC[name]; whole-point constants reject fractions."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if isinstance(DEFAULT_RUBRIC[name], float):
+        return float(value)
+    if value != int(value):
+        raise ValueError(f"{name} must be a whole number of points, got {value!r}")
+    return int(value)
+
+
+def make_rubric(overrides: dict, version: int) -> dict:
+    """
+    DEFAULT_RUBRIC with `overrides` applied, under a new version number.
+    Raises ValueError for unknown constants and values of the wrong kind.
+    """
+    unknown = set(overrides) - set(DEFAULT_RUBRIC) - {"version"}
+    if unknown:
+        raise ValueError(f"unknown rubric constant(s): {sorted(unknown)}")
+    rubric = dict(DEFAULT_RUBRIC)
+    for name, value in overrides.items():
+        if name != "version":
+            rubric[name] = _constant(name, value)
+    rubric["version"] = int(version)
+    return rubric
+
+
+# ─── SCORING ──────────────────────────────────────────────────────────────
+# Next to its feedback lines every router gets "deductions": one
+# {"rule", "target", "points"} record per finding, for cohort analytics.
+# A router's points add up to 100 minus its score (a capped total gets a
+# negative "*_cap" record); zero-point records are findings that only
+# warn.
+def _deduction(rule: str, target, points) -> dict:
+    return {"rule": rule, "target": target, "points": round(points, 3)}
+
+
+def _score_static(score: float, st: dict, R: dict, fb: list, dd: list) -> float:
+    share    = 100.0 / max(st["routes"], 1)
+    miss_pen = 0.0
+
+    for nh in st["multi_hop"]:
+        miss_pen += share
+        fb.append(f"❌ Multi-hop next-hop {nh} not directly connected: −{round(share,1)} pts")
+        dd.append(_deduction("static_multi_hop", nh, share))
+
+    for kind, dest, mlen in st["results"]:
+        if kind == "ok":
+            continue
+        if kind == "next_hop":
+            pen = share * (1 - R["STATIC_NEXT_HOP_CREDIT"])
+            fb.append(f"❌ {dest}/{mlen} wrong next-hop: −{round(pen,1)} pts")
+        elif kind == "mask":
+            pen = share * (1 - R["STATIC_MASK_CREDIT"])
+            fb.append(f"❌ {dest} wrong mask: −{round(pen,1)} pts")
+        else:
+            pen = share
+            fb.append(f"❌ Missing {dest}/{mlen}: −{round(pen,1)} pts")
+        dd.append(_deduction("static_" + kind, f"{dest}/{mlen}", pen))
+        miss_pen += pen
+
+    score -= min(miss_pen, R["STATIC_MISSING_DEDUCTION_CAP"])
+    if miss_pen > R["STATIC_MISSING_DEDUCTION_CAP"]:
+        dd.append(_deduction("static_cap", None, R["STATIC_MISSING_DEDUCTION_CAP"] - miss_pen))
+
+    if st["duplicates"]:
+        dup_pen = min(st["duplicates"] * R["STATIC_DUPLICATE_DEDUCTION"], R["STATIC_DUPLICATE_DEDUCTION_CAP"])
+        fb.append(f"❌ Duplicate static destinations: −{dup_pen} pts")
+        dd.append(_deduction("static_duplicates", None, dup_pen))
+        score -= dup_pen
+
+    if not fb:
+        fb.append("✅ All required static routes configured!")
+    return score
+
+
+def _score_ospf(score: float, of: dict, R: dict, fb: list, dd: list) -> float:
+    if of["missing"]:
+        mp = min(len(of["missing"]) * R["OSPF_MISSING_DEDUCTION_PER_NET"], R["OSPF_MISSING_DEDUCTION_CAP"])
+        fb.append(f"❌ Missing OSPF net(s): {of['missing']} −{mp} pts")
+        dd.extend(_deduction("ospf_missing", net, mp / len(of["missing"])) for net in of["missing"])
+        score -= mp
+
+    if of["extra"]:
+        ep = min(len(of["extra"]) * R["OSPF_EXTRA_DEDUCTION_PER_NET"], R["OSPF_EXTRA_DEDUCTION_CAP"])
+        fb.append(f"⚠️ Extra OSPF net(s): {of['extra']} −{ep} pts")
+        dd.extend(_deduction("ospf_extra", net, ep / len(of["extra"])) for net in of["extra"])
+        score -= ep
+
+    if not of["missing"] and not of["extra"]:
+        fb.append("✅ All OSPF networks present!")
+
+    if of["missing_neighbors"]:
+        fb.append(f"�⚠ Missing OSPF neighbor(s): {of['missing_neighbors']}")
+        dd.extend(_deduction("ospf_missing_neighbor", nb, 0) for nb in of["missing_neighbors"])
+    if of["extra_neighbors"]:
+        fb.append(f"⚠️ Unexpected OSPF neighbor(s): {of['extra_neighbors']}")
+        dd.extend(_deduction("ospf_extra_neighbor", nb, 0) for nb in of["extra_neighbors"])
+
+    unreach = of["unreachable"]
+    if unreach:
+        more = " …" if len(unreach) > 10 else ""
+        fb.append(f"⚠️ OSPF would not converge: {len(unreach)} network(s) unreachable: {unreach[:10]}{more}")
+        dd.extend(_deduction("ospf_unreachable", net, 0) for net in unreach)
+
+    if of["static_routes"]:
+        fb.append(f"❌ Static routes in OSPF assignment: −{R['OSPF_STATIC_ROUTES_DEDUCTION']} pts")
+        dd.append(_deduction("ospf_static_routes", None, R["OSPF_STATIC_ROUTES_DEDUCTION"]))
+        score -= R["OSPF_STATIC_ROUTES_DEDUCTION"]
+    return score
+
+
+def score_router(rf: dict, R: dict) -> tuple:
+    """(unrounded score, feedback lines, deduction records) for one router's facts."""
+    score = 100.0
+    static_fb, ospf_fb = [], []
+    mask_fb, fmt_fb, hostname_fb = [], [], []
+    dd = []
+
+    for ip in rf["bad_masks"]:
+        mask_fb.append(f"❌ Incorrect mask for {ip}: −{R['MASK_DEDUCTION_PER_IFACE']} pts")
+        dd.append(_deduction("mask", ip, R["MASK_DEDUCTION_PER_IFACE"]))
+        score -= R["MASK_DEDUCTION_PER_IFACE"]
+
+    if rf["format_errors"]:
+        p = rf["format_errors"] * R["FORMAT_DEDUCTION_PER_IP"]
+        fmt_fb.append(f"⚠️ {rf['format_errors']} invalid IP format(s): −{p} pts")
+        dd.append(_deduction("format", None, p))
+        score -= p
+
+    if rf["static"] is not None:
+        score = _score_static(score, rf["static"], R, static_fb, dd)
+    else:
+        score = _score_ospf(score, rf["ospf"], R, ospf_fb, dd)
+
+    if rf["hostname"] is not None:
+        label = "Missing" if rf["hostname"] == "missing" else "Default"
+        hostname_fb.append(f"❌ {label} hostname: −{R['HOSTNAME_DEDUCTION']} pts")
+        dd.append(_deduction("hostname_" + rf["hostname"], None, R["HOSTNAME_DEDUCTION"]))
+        score -= R["HOSTNAME_DEDUCTION"]
+
+    fb = []
+    if static_fb:   fb += ["--- Static Routing ---"] + static_fb
+    if ospf_fb:     fb += ["--- OSPF Routing ---"]  + ospf_fb
+    if mask_fb or fmt_fb:
+        fb += ["--- Mask & Format ---"] + mask_fb + fmt_fb
+    if hostname_fb:
+        fb += ["--- Hostname ---"] + hostname_fb
+    return score, fb, dd
+
+
+def score_topology(tf: dict, R: dict) -> tuple:
+    """(feedback lines, deduction) for the topology facts."""
+    if tf["partitioned"]:
+        return ["❌ Network partition detected"], R["TOPOLOGY_PARTITION_DEDUCTION"]
+    cnt, total = tf["missing_links"], tf["master_links"]
+    if cnt == 0:
+        return ["✅ Topology matches!"], 0
+    if cnt >= total/2:
+        td = R["TOPOLOGY_HALF_MISSING_DEDUCTION"]
+        return [f"❌ {cnt} missing links ≥ half: −{td} pts"], td
+    if cnt >= 2:
+        td = R["TOPOLOGY_MULTI_MISSING_DEDUCTION"]
+        return [f"❌ {cnt} missing links: −{td} pts"], td
+    td = R["TOPOLOGY_ONE_MISSING_DEDUCTION"]
+    return [f"❌ 1 missing link: −{td} pts"], td
+
+
+def score_facts(facts: dict, rubric: dict = None) -> dict:
+    """Build the grade_all summary from extracted facts under `rubric`."""
+    R = rubric or DEFAULT_RUBRIC
+
+    per_router    = {}
+    router_scores = []
+    for rname, rf in facts["routers"].items():
+        score, fb, dd = score_router(rf, R)
+        per_router[rname] = {"score": round(score,1), "feedback": fb, "deductions": dd}
+        router_scores.append(score)
+
+    routing_score = round(sum(router_scores)/len(router_scores),1)
+    topo_fb, td   = score_topology(facts["topology"], R)
+    final_score   = max(round(routing_score - td,1), 0.0)
+    topo_rule     = "topology_partition" if facts["topology"]["partitioned"] else "topology_missing_links"
+
+    summary = {
+        "assignment_type":   facts["assignment_type"],
+        "num_routers":       facts["num_routers"],
+        "per_router":        per_router,
+        "routing_score":     routing_score,
+        "topology_feedback": topo_fb,
+        "topology_deductions": [_deduction(topo_rule, None, td)] if td else [],
+        "master_edges":      facts["master_edges"],
+        "student_edges":     facts["student_edges"],
+        "final_score":       final_score
+    }
+    for section in ("reachability", "ospf_convergence"):
+        if section in facts:
+            summary[section] = facts[section]
+    summary["rubric_version"] = R["version"]
+    return summary
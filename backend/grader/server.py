@@ -0,0 +1,198 @@
+# backend/grader/server.py
+"""
+Long-lived grading server.
+
+Keeps a warm pool of grader processes and speaks newline-delimited JSON,
+either over stdin/stdout (default) or over a local Unix socket (--socket).
+
+Request line:
+    {"id": 1, "args": {"master_zip": ..., "student_zip": ...,
+                       "master_neigh_zip": ..., "student_neigh_zip": ...,
+                       "birthday_prefix": ..., "master_prefix": null}}
+
+Response line (same JSON summary that `grader.py` prints):
+    {"id": 1, "success": true,  "result": {...}}
+    {"id": 1, "success": false, "error": "..."}
+    {"id": 1, "success": false, "error": "grading aborted: budget exceeded (cpu over 60 s)",
+     "budget": {"resource": "cpu", "limit": 60, "used": 61.0}}
+
+Each request is graded under a CPU, memory and wall-clock budget
+(--cpu_budget etc.); a worker that exceeds it is replaced.
+
+A request with "op": "ping" is answered with {"id": ..., "success": true,
+"result": "pong"} without touching the pool.
+"""
+
+import os
+import sys
+import json
+import threading
+
+# ─── PATCH: add project root so `import backend.xxx` works ──────────────
+PROJECT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..')
+)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+# ─────────────────────────────────────────────────────────────────────────
+
+from backend.grader.grader import grade_all, add_budget_args, budget_from_args
+from backend.grader.supervisor import SupervisedPool, BudgetExceeded
+
+GRADE_ARGS = (
+    "master_zip",
+    "student_zip",
+    "master_neigh_zip",
+    "student_neigh_zip",
+    "birthday_prefix",
+    "master_prefix",
+    "master_name",
+    "timings",
+)
+
+
+def _warm_worker():
+    """Pool initializer: make sure the grading stack is imported up front."""
+    import backend.grader.grader  # noqa: F401
+
+
+def _grade(args: dict) -> dict:
+    return grade_all(**args)
+
+
+def _grade_args(req: dict) -> dict:
+    args = req.get("args")
+    if not isinstance(args, dict):
+        raise ValueError("request is missing an 'args' object")
+    unknown = set(args) - set(GRADE_ARGS)
+    if unknown:
+        raise ValueError(f"unknown grading argument(s): {sorted(unknown)}")
+    args = dict(args)
+    # Neighbor ZIPs fall back to the config ZIPs, as in routes.submit
+    args["master_neigh_zip"]  = args.get("master_neigh_zip") or args.get("master_zip")
+    args["student_neigh_zip"] = args.get("student_neigh_zip") or args.get("student_zip")
+    return args
+
+
+class GradingServer:
+    """Dispatches JSON requests onto a shared, warm process pool."""
+
+    def __init__(self, workers: int = None, budget: dict = None):
+        self.pool = SupervisedPool(
+            max_workers=workers or os.cpu_count(),
+            initializer=_warm_worker,
+            budget=budget,
+        )
+
+    def handle_line(self, line: str, reply) -> None:
+        """
+        Parse one request line and arrange for `reply(dict)` to be called
+        exactly once with the response, possibly from another thread.
+        """
+        line = line.strip()
+        if not line:
+            return
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            reply({"id": None, "success": False, "error": f"invalid JSON: {e}"})
+            return
+        if not isinstance(req, dict):
+            reply({"id": None, "success": False, "error": "request must be a JSON object"})
+            return
+
+        req_id = req.get("id")
+        if req.get("op", "grade") == "ping":
+            reply({"id": req_id, "success": True, "result": "pong"})
+            return
+
+        try:
+            args = _grade_args(req)
+        except ValueError as e:
+            reply({"id": req_id, "success": False, "error": str(e)})
+            return
+
+        def done(fut):
+            try:
+                reply({"id": req_id, "success": True, "result": fut.result()})
+            except BudgetExceeded as e:
+                reply({"id": req_id, "success": False, "error": str(e), "budget": e.as_dict()})
+            except Exception as e:
+                reply({"id": req_id, "success": False, "error": str(e) or type(e).__name__})
+
+        self.pool.submit(_grade, args).add_done_callback(done)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+def _line_writer(stream):
+    lock = threading.Lock()
+
+    def reply(resp: dict) -> None:
+        data = json.dumps(resp) + "\n"
+        with lock:
+            stream.write(data)
+            stream.flush()
+
+    return reply
+
+
+def serve_stdio(server: GradingServer) -> None:
+    reply = _line_writer(sys.stdout)
+    for line in sys.stdin:
+        server.handle_line(line, reply)
+    server.shutdown()
+
+
+def serve_unix(server: GradingServer, path: str) -> None:
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            wfile = self.wfile
+            lock  = threading.Lock()
+
+            def reply(resp: dict) -> None:
+                data = (json.dumps(resp) + "\n").encode("utf-8")
+                with lock:
+                    try:
+                        wfile.write(data)
+                        wfile.flush()
+                    except (OSError, ValueError):
+                        pass  # client went away
+
+            for raw in self.rfile:
+                server.handle_line(raw.decode("utf-8", errors="replace"), reply)
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(path, Handler) as srv:
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Run the router grader as a long-lived server")
+    p.add_argument("--socket", default=None, help="listen on this Unix socket instead of stdin/stdout")
+    p.add_argument("--workers", type=int, default=None, help="size of the grading pool (default: CPU count)")
+    add_budget_args(p)
+    args = p.parse_args()
+
+    server = GradingServer(workers=args.workers, budget=budget_from_args(args))
+    if args.socket:
+        serve_unix(server, args.socket)
+    else:
+        serve_stdio(server)
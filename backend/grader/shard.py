@@ -0,0 +1,204 @@
+# backend/grader/shard.py
+"""
+Sharded batch grading across machines, without a coordinator.
+
+    # on each of N machines, sharing the submissions directory (or a copy)
+    python backend/grader/grader.py batch master.zip subs/ --shard 0/3 --out shard-0.jsonl
+    # anywhere, once every shard file has been collected
+    python backend/grader/grader.py merge shard-*.jsonl --out cohort.jsonl --db
+
+A student's shard is a hash of their ZIP's filename, so every machine
+agrees on the split without talking to the others. Each shard file is
+JSON Lines: a header describing the run (master digest, prefixes, facts
+version, shard i of N and the students it covers) followed by one
+grade_record() per student. It is written under a temporary name and
+renamed when complete. merge checks that all N shards of the same run
+are present and that every student appears exactly once before writing
+anything.
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import Counter
+from concurrent.futures import as_completed
+
+from backend.grader.grader import (
+    FACTS_VERSION, BIRTHDAY_PREFIX_PAT, load_master_model, find_student_zips, _init_batch_worker
+)
+from backend.grader.cache import file_sha256
+from backend.grader.ingest import grade_record, DbSink
+from backend.grader.supervisor import SupervisedPool, JobAborted, aborted_record
+
+SHARD_FORMAT  = "grader-shard/1"
+COHORT_FORMAT = "grader-cohort/1"
+
+# Header fields every shard of one run must agree on
+RUN_FIELDS = ("master_sha256", "master_neigh_sha256", "birthday_prefix", "master_prefix",
+              "facts_version", "shards")
+
+
+def parse_shard(spec: str) -> tuple:
+    """'i/N' → (i, N), with shards numbered 0..N-1."""
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}") from None
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"shard {spec!r} out of range: need 0 <= i < N")
+    return i, n
+
+
+def shard_of(student_zip: str, shards: int) -> int:
+    """The shard a student ZIP belongs to, from a hash of its filename."""
+    h = hashlib.sha256(os.path.basename(student_zip).encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "big") % shards
+
+
+# ─── GRADING ONE SHARD ────────────────────────────────────────────────────
+def grade_shard(master_zip: str, student_dir: str, shard: int, shards: int, out: str,
+                birthday_prefix: str, master_neigh_zip: str = None, master_prefix: str = None,
+                workers: int = None, budget: dict = None) -> dict:
+    """
+    Grade this machine's share of `student_dir` into `out`, each student
+    under `budget`; returns the header.
+    """
+    master_neigh_zip = master_neigh_zip or master_zip
+    norm_prefix      = master_prefix or birthday_prefix
+    if not BIRTHDAY_PREFIX_PAT.fullmatch(norm_prefix):
+        raise ValueError(f"prefix {norm_prefix!r} is not 2MM.DD: every normalized IP would fail the format check")
+    pairs = [(s, sn) for s, sn in find_student_zips(student_dir) if shard_of(s, shards) == shard]
+
+    header = {
+        "format":              SHARD_FORMAT,
+        "shard":               shard,
+        "shards":              shards,
+        "master_sha256":       file_sha256(master_zip),
+        "master_neigh_sha256": file_sha256(master_neigh_zip),
+        "birthday_prefix":     birthday_prefix,
+        "master_prefix":       master_prefix,
+        "facts_version":       FACTS_VERSION,
+        "created_at":          time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "students":            sorted(os.path.basename(s) for s, _ in pairs),
+    }
+
+    load_master_model(master_zip, master_neigh_zip, norm_prefix)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f, SupervisedPool(
+        max_workers = workers or os.cpu_count(),
+        initializer = _init_batch_worker,
+        initargs    = (master_zip, master_neigh_zip, norm_prefix),
+        budget      = budget
+    ) as pool:
+        f.write(json.dumps(header) + "\n")
+        futures = {
+            pool.submit(grade_record, master_zip, s, master_neigh_zip, sn, birthday_prefix, master_prefix): s
+            for s, sn in pairs
+        }
+        for fut in as_completed(futures):
+            try:
+                rec = fut.result()
+            except JobAborted as e:
+                rec = aborted_record(futures[fut], e)
+            f.write(json.dumps(rec) + "\n")
+    os.replace(tmp, out)
+    return header
+
+
+# ─── MERGE ────────────────────────────────────────────────────────────────
+def read_shard(path: str) -> tuple:
+    """(header, records) of one shard file."""
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"{path}: empty shard file")
+    header = json.loads(lines[0])
+    if header.get("format") != SHARD_FORMAT:
+        raise ValueError(f"{path}: not a shard file (format {header.get('format')!r})")
+    return header, [json.loads(line) for line in lines[1:]]
+
+
+def check_shards(shards: dict) -> list:
+    """Every problem that stops {path: (header, records)} merging into one cohort."""
+    problems = []
+    first_path, (first, _) = next(iter(shards.items()))
+    for path, (header, _) in shards.items():
+        for field in RUN_FIELDS:
+            if header.get(field) != first.get(field):
+                problems.append(f"{path}: {field} {header.get(field)!r} differs from "
+                                f"{first.get(field)!r} in {first_path}")
+    if problems:
+        return problems
+
+    norm_prefix = first.get("master_prefix") or first.get("birthday_prefix")
+    if not BIRTHDAY_PREFIX_PAT.fullmatch(norm_prefix or ""):
+        problems.append(f"shards were graded on prefix {norm_prefix!r}, which fails the IP format "
+                        f"check; regrade them with a 2MM.DD --birthday_prefix")
+
+    seen_shards = {}
+    for path, (header, _) in shards.items():
+        if header["shard"] in seen_shards:
+            problems.append(f"shard {header['shard']} given twice: {seen_shards[header['shard']]} and {path}")
+        seen_shards[header["shard"]] = path
+    missing = sorted(set(range(first["shards"])) - set(seen_shards))
+    if missing:
+        problems.append(f"missing shard(s) {missing} of {first['shards']}")
+
+    owner = {}
+    for path, (header, records) in shards.items():
+        expected = set(header["students"])
+        got = [os.path.basename(rec["student_zip"]) for rec in records]
+        for name in sorted(expected - set(got)):
+            problems.append(f"{path}: no result for {name}")
+        for name in sorted(set(got) - expected):
+            problems.append(f"{path}: unexpected result for {name}")
+        for name in sorted(n for n, c in Counter(got).items() if c > 1):
+            problems.append(f"{path}: {name} graded more than once")
+        for name in expected:
+            if name in owner:
+                problems.append(f"{name} is in both {owner[name]} and {path}")
+            owner[name] = path
+    return problems
+
+
+def merge_shards(paths, out: str = None, db: bool = False) -> dict:
+    """
+    Combine shard files into one cohort result. Raises ValueError listing
+    every problem if the shards are incomplete or inconsistent. Writes
+    the cohort to `out` and, with `db`, imports it into the database.
+    Returns the cohort header.
+    """
+    shards = {path: read_shard(path) for path in paths}
+    if not shards:
+        raise ValueError("no shard files given")
+    problems = check_shards(shards)
+    if db and not problems:
+        version = next(iter(shards.values()))[0]["facts_version"]
+        if version != FACTS_VERSION:
+            problems.append(f"shards hold facts version {version}, this grader imports {FACTS_VERSION}")
+    if problems:
+        raise ValueError("cannot merge shards:\n  " + "\n  ".join(problems))
+
+    first   = next(iter(shards.values()))[0]
+    records = sorted((rec for _, recs in shards.values() for rec in recs),
+                     key=lambda rec: os.path.basename(rec["student_zip"]))
+    header  = {"format": COHORT_FORMAT}
+    header.update({field: first[field] for field in RUN_FIELDS})
+    header.update(
+        students  = len(records),
+        succeeded = sum(rec["success"] for rec in records),
+        merged_at = time.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+
+    if out:
+        tmp = f"{out}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+        os.replace(tmp, out)
+    if db:
+        sink = DbSink(first["birthday_prefix"], first["master_sha256"], first["master_neigh_sha256"])
+        header["submission_ids"] = sink.save(records)
+    return header
@@ -0,0 +1,157 @@
+# backend/grader/shared_prefix.py
+"""
+Grading every birthday prefix on one shared master model.
+
+Submissions are normalized onto their own 2MM.DD prefix P, so a master
+model built for one student's P does not fit the next. Grading on a model
+prefix M instead (model_prefix(), same day zero-padding as P) gives the
+same facts with M's /16 in place of P's, as long as nothing the grader
+reads can tell the two /16s apart. portable() checks that, conservatively:
+
+  - every address token (interface, route destination and next hop, OSPF
+    network, OSPF neighbor) is either a rewritten 2MM.DD address or a
+    "low" one: it does not start with '2', nor does its value printed
+    back, so it sorts below every shared /16 as a string and as an int;
+  - no mask, wildcard or area token holds a rewritten address;
+  - every network lies within one /16 (prefix ≥ 16), holds all of
+    200.0.0.0–255.255.255.255 (prefix ≤ 2) or ends below 200.0.0.0.
+
+Swapping the two /16s then preserves every equality, ordering and
+containment the grader computes, and move_facts() only has to rewrite the
+address fields of the facts. A master or submission that fails the check
+is graded on its own prefix instead.
+"""
+
+import re
+from functools import lru_cache
+
+from backend.ipv4 import ALL_ONES, ip_to_int, int_to_ip, mask_to_prefix, network
+from backend.normalizer.normalizer import normalize_ips
+
+# Prefixes that can share a model: valid first octet, below the 255.x masks
+SHARED_PREFIX_PAT = re.compile(r'2(?:[0-4]\d|5[0-4])\.(\d)(\d)')
+
+# Every shared /16 lies at or above this address, and low addresses below it
+SHARED_FLOOR = 200 << 24
+
+
+def model_prefix(norm_prefix: str) -> str:
+    """The model prefix `norm_prefix` submissions share, or norm_prefix itself."""
+    m = SHARED_PREFIX_PAT.fullmatch(norm_prefix or "")
+    if m is None:
+        return norm_prefix
+    # Same zero-padding, so a day printed back from an int keeps its width
+    if m.group(1) != "0":
+        return "200.20"
+    return "200.01" if m.group(2) != "0" else "200.00"
+
+
+@lru_cache(maxsize=8)
+def _rewritten(model: str):
+    """An address normalize_ips() rewrote onto `model`."""
+    return re.compile(r'\b' + re.escape(model) + r'\.\d+\.\d+\b')
+
+
+def _low(token: str) -> bool:
+    if token.startswith('2'):
+        return False
+    value = ip_to_int(token)
+    return value is None or not int_to_ip(value).startswith('2')
+
+
+def _net_ok(net: tuple) -> bool:
+    addr, plen = net
+    if plen <= 2:
+        return True
+    if addr >= SHARED_FLOOR:
+        return plen >= 16
+    return addr | (ALL_ONES >> plen) < SHARED_FLOOR
+
+
+def portable(parsed: dict, configs: dict, neighbors, model: str) -> bool:
+    """
+    True when {router: RouterConfig}, their config text and the OSPF
+    neighbor addresses, all normalized onto `model`, grade the same on
+    every prefix sharing it.
+    """
+    rewritten = _rewritten(model)
+
+    def address(token):
+        return rewritten.match(token) is not None or _low(token)
+
+    def plain(token):
+        return rewritten.search(token) is None
+
+    for r, cfg in parsed.items():
+        for iface in cfg.interfaces:
+            if not (address(iface.ip) and plain(iface.mask)):
+                return False
+            if iface.net is not None and not _net_ok(iface.net):
+                return False
+        for rt in cfg.static_routes:
+            if not (address(rt.dest) and address(rt.next_hop) and plain(rt.mask)):
+                return False
+            dest, mask = ip_to_int(rt.dest), ip_to_int(rt.mask)
+            plen = mask_to_prefix(mask) if mask is not None else None
+            if dest is not None and plen is not None and not _net_ok(network(dest, plen)):
+                return False
+        if not cfg.ospf_networks:
+            continue
+        if not all(_net_ok((n.net, n.prefix)) for n in cfg.ospf_networks):
+            return False
+        # OspfNetwork keeps no tokens; re-read them from the network lines
+        for line in configs[r].splitlines():
+            tokens = line.split()
+            if len(tokens) >= 2 and tokens[0].lower() == 'network':
+                if not (address(tokens[1]) and all(plain(t) for t in tokens[2:])):
+                    return False
+    return all(address(ip) for ip in neighbors)
+
+
+@lru_cache(maxsize=64)
+def _printed(model: str, prefix: str) -> tuple:
+    """(pattern, replacement) moving addresses printed from ints off `model`."""
+    m1, m2 = model.split('.')
+    p1, p2 = prefix.split('.')
+    return re.compile(rf'\b{m1}\.{int(m2)}\.(?=\d+\.\d+\b)'), f"{p1}.{int(p2)}."
+
+
+def move_facts(facts: dict, model: str, prefix: str) -> dict:
+    """
+    Facts graded on `model` as they read on `prefix`. Only address fields
+    change: config tokens as normalize_ips() would have written them, and
+    networks as net_to_str() prints them.
+    """
+    pat, repl = _printed(model, prefix)
+
+    def raw(tokens):
+        return [normalize_ips(t, prefix) for t in tokens]
+
+    def printed(s):
+        return pat.sub(repl, s)
+
+    def failure(s):
+        # "<router> → <network>: <outcome>"; router names stay as they are
+        head, sep, tail = s.rpartition(" → ")
+        return head + sep + printed(tail)
+
+    for rf in facts["routers"].values():
+        rf["bad_masks"] = raw(rf["bad_masks"])
+        static = rf["static"]
+        if static is not None:
+            static["multi_hop"] = raw(static["multi_hop"])
+            static["results"]   = [[kind, normalize_ips(dest, prefix), mlen]
+                                   for kind, dest, mlen in static["results"]]
+        ospf = rf["ospf"]
+        if ospf is not None:
+            for key in ("missing", "extra", "unreachable"):
+                ospf[key] = [printed(net) for net in ospf[key]]
+            for key in ("missing_neighbors", "extra_neighbors"):
+                ospf[key] = raw(ospf[key])
+
+    for key in ("master_edges", "student_edges"):
+        facts[key] = {edge: printed(nets) for edge, nets in facts[key].items()}
+    for key in ("reachability", "ospf_convergence"):
+        if key in facts:
+            facts[key]["failures"] = [failure(s) for s in facts[key]["failures"]]
+    return facts
@@ -0,0 +1,399 @@
+# backend/grader/supervisor.py
+"""
+Process pool with per-job CPU-time, memory and wall-clock budgets.
+
+    with SupervisedPool(workers, _init_batch_worker, initargs,
+                        budget={"cpu_seconds": 30, "memory_mb": 512}) as pool:
+        fut = pool.submit(_grade_one, ...)
+
+A stand-in for ProcessPoolExecutor (submit / shutdown / futures) for
+jobs whose input is untrusted. Each job runs on a worker process that
+a supervisor thread watches:
+
+- cpu: before each job the worker lowers its soft RLIMIT_CPU to the CPU
+  time it has used so far plus the budget; the kernel's SIGXCPU then
+  aborts the job from inside the worker.
+- memory: the supervisor polls each busy worker's resident set size
+  (/proc/<pid>/statm) and kills a worker that goes over.
+- wall: the supervisor kills a worker whose job has run longer than
+  this, which also catches a job stuck where SIGXCPU cannot reach it.
+
+A job over budget fails with BudgetExceeded ("grading aborted: budget
+exceeded ..."), and its worker is replaced, since the job may have left
+it half-updated. Unlike ProcessPoolExecutor, a dead worker costs only
+its own job, not the whole pool. stats() counts the aborts.
+"""
+
+import os
+import math
+import time
+import signal
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:          # not on Windows: the memory and wall budgets still apply
+    resource = None
+
+# 0 turns a limit off; wall_seconds None means 2 × cpu_seconds + 10
+DEFAULT_BUDGET = {
+    "cpu_seconds":  60,
+    "memory_mb":    1024,
+    "wall_seconds": None,
+}
+RESOURCES = {"cpu": "cpu_seconds", "memory": "memory_mb", "wall": "wall_seconds"}
+
+# How often busy workers' memory and run time are checked
+WATCH_INTERVAL = 0.2
+
+
+class JobAborted(Exception):
+    """The pool could not finish a job: its worker died or was killed."""
+
+
+class BudgetExceeded(JobAborted):
+    """A job used more than its budget of `resource` ("cpu", "memory" or "wall")."""
+
+    def __init__(self, resource: str, limit, used=None):
+        unit = "MB" if resource == "memory" else "s"
+        super().__init__(f"grading aborted: budget exceeded ({resource} over {limit:g} {unit})")
+        self.resource = resource
+        self.limit    = limit
+        self.used     = used
+
+    def as_dict(self) -> dict:
+        return {"resource": self.resource, "limit": self.limit, "used": self.used}
+
+
+def make_budget(budget: dict = None) -> dict:
+    """DEFAULT_BUDGET overridden by `budget`'s non-None values."""
+    unknown = set(budget or ()) - set(DEFAULT_BUDGET)
+    if unknown:
+        raise ValueError(f"unknown budget key(s): {sorted(unknown)}")
+    b = dict(DEFAULT_BUDGET)
+    b.update({k: v for k, v in (budget or {}).items() if v is not None})
+    if b["wall_seconds"] is None:
+        b["wall_seconds"] = 2 * b["cpu_seconds"] + 10 if b["cpu_seconds"] else 0
+    return b
+
+
+def aborted_record(student_zip: str, exc: JobAborted) -> dict:
+    """batch's per-student record for a job the pool aborted."""
+    rec = {"student_zip": student_zip, "success": False, "error": str(exc)}
+    if isinstance(exc, BudgetExceeded):
+        rec["budget"] = exc.as_dict()
+    return rec
+
+
+# ─── WORKER PROCESS ───────────────────────────────────────────────────────
+class _OverCpu(BaseException):
+    """Raised by SIGXCPU. Not an Exception, so grading's `except Exception` cannot swallow it."""
+
+
+def _on_sigxcpu(signum, frame):
+    raise _OverCpu()
+
+
+def _cpu_used() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+def _set_cpu_limit(seconds) -> None:
+    """Soft RLIMIT_CPU at `seconds` of total process CPU time, or lifted with None."""
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard
+    if seconds is not None:
+        soft = math.ceil(seconds)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, initializer, initargs, cpu_seconds) -> None:
+    limit_cpu = resource is not None and bool(cpu_seconds)
+    if limit_cpu:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(("ready",))
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        fn, args, kwargs = task
+        start = _cpu_used() if limit_cpu else 0.0
+        try:
+            try:
+                if limit_cpu:
+                    _set_cpu_limit(start + cpu_seconds)
+                result = fn(*args, **kwargs)
+            finally:
+                if limit_cpu:
+                    _set_cpu_limit(None)
+        except _OverCpu:
+            conn.send(("abort", "cpu", round(_cpu_used() - start, 2)))
+            return                  # the supervisor replaces this worker
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:       # the exception does not pickle
+                conn.send(("error", RuntimeError(str(e) or type(e).__name__)))
+            continue
+        try:
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", RuntimeError(f"job result does not pickle: {e}")))
+
+
+def _rss_mb(pid: int):
+    """Resident set size of `pid` in MB, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+
+
+# ─── SUPERVISOR ───────────────────────────────────────────────────────────
+class _Worker:
+    __slots__ = ("process", "conn", "ready", "job", "started")
+
+
+class SupervisedPool:
+    def __init__(self, max_workers: int = None, initializer=None, initargs=(),
+                 budget: dict = None, on_abort=None):
+        """`on_abort(exc)` is called on the supervisor thread for every aborted job."""
+        self.max_workers = max_workers or os.cpu_count()
+        self.initializer = initializer
+        self.initargs    = initargs
+        self.budget      = make_budget(budget)
+        self.on_abort    = on_abort
+
+        self._ctx      = multiprocessing.get_context()
+        self._lock     = threading.Lock()
+        self._pending  = collections.deque()
+        self._wake_r, self._wake_w = self._ctx.Pipe(duplex=False)
+        self._woken    = False
+        self._shutdown = False
+        self._broken   = None
+        self._stats    = {"jobs": 0, "aborted": dict.fromkeys(RESOURCES, 0), "worker_deaths": 0, "restarts": 0}
+
+        self._workers = [self._spawn() for _ in range(self.max_workers)]
+        self._thread  = threading.Thread(target=self._supervise, name="grading-supervisor", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=True)
+        return False
+
+    # ─── CALLER SIDE ───────────────────────────────────────────────────────
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) on a worker; `fn` must be picklable (module-level)."""
+        fut = Future()
+        with self._lock:
+            if self._broken:
+                raise BrokenProcessPool(self._broken)
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._pending.append((fut, fn, args, kwargs))
+            self._wake()
+        return fut
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for fut, *_ in self._pending:
+                    fut.cancel()
+                self._pending.clear()
+            self._wake()
+        if wait:
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """Jobs started, aborts by resource, and workers lost or replaced, since start."""
+        with self._lock:
+            return dict(self._stats, aborted=dict(self._stats["aborted"]), budget=dict(self.budget))
+
+    def _wake(self) -> None:
+        # Called with the lock held; one byte in the pipe is enough to wake the supervisor
+        if not self._woken:
+            self._woken = True
+            self._wake_w.send_bytes(b"")
+
+    # ─── SUPERVISOR THREAD ─────────────────────────────────────────────────
+    def _spawn(self) -> _Worker:
+        parent, child = self._ctx.Pipe()
+        w = _Worker()
+        w.process = self._ctx.Process(
+            target = _worker_main,
+            args   = (child, self.initializer, self.initargs, self.budget["cpu_seconds"]),
+            daemon = True
+        )
+        w.process.start()
+        child.close()
+        w.conn, w.ready, w.job, w.started = parent, False, None, 0.0
+        return w
+
+    def _supervise(self) -> None:
+        try:
+            while self._broken is None:
+                self._dispatch()
+                with self._lock:
+                    if self._shutdown and not self._pending and all(w.job is None for w in self._workers):
+                        break
+                waitables = [self._wake_r]
+                for w in self._workers:
+                    waitables += (w.conn, w.process.sentinel)
+                ready = set(wait(waitables, timeout=WATCH_INTERVAL))
+
+                if self._wake_r in ready:
+                    with self._lock:
+                        while self._wake_r.poll():
+                            self._wake_r.recv_bytes()
+                        self._woken = False
+                for w in list(self._workers):
+                    if w.conn in ready or w.process.sentinel in ready:
+                        self._collect(w)
+                self._watch()
+        finally:
+            self._stop_workers()
+
+    def _dispatch(self) -> None:
+        for w in self._workers:
+            if w.job is not None:
+                continue
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        return
+                    fut, fn, args, kwargs = self._pending.popleft()
+                if fut.set_running_or_notify_cancel():
+                    break
+            try:
+                w.conn.send((fn, args, kwargs))
+            except OSError:                 # the worker just died; _collect replaces it
+                fut.set_exception(JobAborted("grading aborted: worker died"))
+                continue
+            except Exception as e:          # the job does not pickle
+                fut.set_exception(e)
+                continue
+            w.job, w.started = fut, time.monotonic()
+            with self._lock:
+                self._stats["jobs"] += 1
+
+    def _collect(self, w: _Worker) -> None:
+        """Handle one message from `w`, or its death."""
+        msg = None
+        if w.conn.poll():
+            try:
+                msg = w.conn.recv()
+            except (EOFError, OSError):
+                msg = None
+            except Exception as e:          # a result or exception that does not unpickle
+                msg = ("error", RuntimeError(f"unreadable result from grading worker: {e}"))
+        if msg is None:
+            self._lost(w)
+        elif msg[0] == "ready":
+            w.ready = True
+        elif msg[0] == "abort":
+            self._abort(w, msg[1], msg[2])
+        else:
+            fut, w.job = w.job, None
+            if msg[0] == "ok":
+                fut.set_result(msg[1])
+            else:
+                fut.set_exception(msg[1])
+
+    def _watch(self) -> None:
+        wall = self.budget["wall_seconds"]
+        mem  = self.budget["memory_mb"]
+        now  = time.monotonic()
+        for w in list(self._workers):
+            if w.job is None:
+                continue
+            if wall and now - w.started > wall:
+                self._abort(w, "wall", round(now - w.started, 1))
+                continue
+            rss = _rss_mb(w.process.pid) if mem else None
+            if rss is not None and rss > mem:
+                self._abort(w, "memory", round(rss))
+
+    def _abort(self, w: _Worker, resource_name: str, used) -> None:
+        fut = w.job
+        self._replace(w)
+        exc = BudgetExceeded(resource_name, self.budget[RESOURCES[resource_name]], used)
+        with self._lock:
+            self._stats["aborted"][resource_name] += 1
+        fut.set_exception(exc)
+        if self.on_abort is not None:
+            try:
+                self.on_abort(exc)
+            except Exception:
+                pass                        # a failing hook must not stop supervision
+
+    def _lost(self, w: _Worker) -> None:
+        """`w` exited without being asked to: fail its job and replace it."""
+        fut = w.job
+        w.process.join()
+        code = w.process.exitcode
+        if not w.ready:
+            # Died in the initializer: every worker would, so give up like ProcessPoolExecutor
+            self._broken = f"a grading worker failed to start (exit code {code})"
+            self._fail_all(BrokenProcessPool(self._broken))
+            return
+        with self._lock:
+            self._stats["worker_deaths"] += 1
+        self._replace(w)
+        if fut is not None:
+            how = f"signal {-code}" if code is not None and code < 0 else f"exit code {code}"
+            fut.set_exception(JobAborted(f"grading aborted: worker died ({how})"))
+
+    def _replace(self, w: _Worker) -> None:
+        if w.process.is_alive():
+            w.process.kill()
+        w.process.join()
+        w.conn.close()
+        self._workers[self._workers.index(w)] = self._spawn()
+        with self._lock:
+            self._stats["restarts"] += 1
+
+    def _fail_all(self, exc: Exception) -> None:
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        for w in self._workers:
+            if w.job is not None:
+                w.job.set_exception(exc)
+                w.job = None
+        for fut, *_ in pending:
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(exc)
+
+    def _stop_workers(self) -> None:
+        with self._lock:
+            self._woken = True              # no more wake-ups once the pipe is closed
+        for w in self._workers:
+            try:
+                w.conn.send(None)
+            except OSError:
+                pass
+        for w in self._workers:
+            w.process.join(timeout=5)
+            if w.process.is_alive():
+                w.process.kill()
+                w.process.join()
+            w.conn.close()
+        self._wake_r.close()
+        self._wake_w.close()
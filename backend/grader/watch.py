@@ -0,0 +1,258 @@
+# backend/grader/watch.py
+"""
+Watch-folder ingestion.
+
+    python backend/grader/grader.py watch master.zip submissions/ --ledger graded.jsonl --db
+
+Polls a submissions directory (or waits on inotify when the optional
+`inotify_simple` package is installed) and grades every new or changed
+student ZIP against one master, through a process pool that keeps the
+master model warm and holds each grading job to a CPU, memory and
+wall-clock budget. Each result is appended to a JSON Lines ledger and,
+with --db, saved to the `submissions` table like a web submission.
+
+A manifest next to the ledger records every graded file's mtime, size
+and SHA-256, so a restarted watcher only grades what changed: a file
+whose mtime and size are unchanged is skipped without reading it, and a
+touched file whose content is unchanged is not regraded. A file that
+was aborted for exceeding its budget is recorded as failed, so it is
+only retried once it changes.
+"""
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import as_completed
+
+# ─── PATCH: add project root so `import backend.xxx` works ──────────────
+PROJECT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..')
+)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+# ─────────────────────────────────────────────────────────────────────────
+
+from backend.grader.grader import (
+    load_master_model, find_student_zips, _init_batch_worker, add_budget_args, budget_from_args,
+    add_prefix_args, prefix_from_args
+)
+from backend.grader.cache import file_sha256
+from backend.grader.ingest import grade_record, DbSink
+from backend.grader.supervisor import SupervisedPool, JobAborted, aborted_record
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:          # optional: fall back to polling
+    INotify = None
+
+POLL_INTERVAL = 5.0
+# Files modified more recently than this may still be being copied in
+SETTLE_SECONDS = 2.0
+MANIFEST_NAME = ".grader-manifest.json"
+
+
+# ─── MANIFEST ─────────────────────────────────────────────────────────────
+class Manifest:
+    """
+    {student ZIP name: {"mtime", "size", "sha256", "neigh_sha256",
+    "graded_at", "success"}}, saved atomically as JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def save(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def check(self, student_zip: str, neigh_zip: str):
+        """
+        None when this pair was graded as it is now, else the fingerprint
+        {"mtime", "size", "sha256", "neigh_sha256"} to grade it under.
+        """
+        name  = os.path.basename(student_zip)
+        st    = os.stat(student_zip)
+        entry = self.entries.get(name)
+        neigh_mtime = os.stat(neigh_zip).st_mtime if neigh_zip != student_zip else None
+        if (entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size
+                and entry.get("neigh_mtime") == neigh_mtime):
+            return None
+
+        fp = {
+            "mtime":        st.st_mtime,
+            "size":         st.st_size,
+            "neigh_mtime":  neigh_mtime,
+            "sha256":       file_sha256(student_zip),
+            "neigh_sha256": file_sha256(neigh_zip) if neigh_zip != student_zip else None,
+        }
+        if entry and entry["sha256"] == fp["sha256"] and entry.get("neigh_sha256") == fp["neigh_sha256"]:
+            # Touched or copied again with the same content: just remember the new mtime
+            entry.update(fp)
+            return None
+        return fp
+
+    def record(self, student_zip: str, fp: dict, success: bool) -> None:
+        self.entries[os.path.basename(student_zip)] = dict(
+            fp, graded_at=time.strftime("%Y-%m-%dT%H:%M:%S"), success=success
+        )
+
+
+def pending(directory: str, manifest: Manifest, settle: float = SETTLE_SECONDS) -> list:
+    """(student_zip, neigh_zip, fingerprint) for every new or changed, settled ZIP."""
+    now  = time.time()
+    todo = []
+    for s, sn in find_student_zips(directory):
+        try:
+            if now - max(os.stat(s).st_mtime, os.stat(sn).st_mtime) < settle:
+                continue
+            fp = manifest.check(s, sn)
+        except FileNotFoundError:         # removed between listing and stat
+            continue
+        if fp is not None:
+            todo.append((s, sn, fp))
+    return todo
+
+
+# ─── WATCH LOOP ───────────────────────────────────────────────────────────
+class Watcher:
+    def __init__(self, master_zip: str, directory: str, ledger: str, birthday_prefix: str,
+                 master_neigh_zip: str = None, master_prefix: str = None, workers: int = None,
+                 manifest: str = None, db: bool = False, settle: float = SETTLE_SECONDS,
+                 keep_facts: bool = False, budget: dict = None):
+        self.master_zip       = master_zip
+        self.master_neigh_zip = master_neigh_zip or master_zip
+        self.directory        = directory
+        self.ledger           = ledger
+        self.birthday_prefix  = birthday_prefix
+        self.master_prefix    = master_prefix
+        self.settle           = settle
+        self.keep_facts       = keep_facts
+        self.manifest = Manifest(manifest or os.path.join(os.path.dirname(os.path.abspath(ledger)), MANIFEST_NAME))
+        self.sink     = None
+        if db:
+            self.sink = DbSink(birthday_prefix, file_sha256(master_zip), file_sha256(self.master_neigh_zip),
+                               master_zip, self.master_neigh_zip)
+
+        norm_prefix = master_prefix or birthday_prefix
+        # Load the master once up front: fails fast, and forked workers inherit it
+        load_master_model(master_zip, self.master_neigh_zip, norm_prefix)
+        self.pool = SupervisedPool(
+            max_workers = workers or os.cpu_count(),
+            initializer = _init_batch_worker,
+            initargs    = (master_zip, self.master_neigh_zip, norm_prefix),
+            budget      = budget
+        )
+
+    def scan(self) -> int:
+        """Grade everything new or changed; returns how many files were graded."""
+        todo = pending(self.directory, self.manifest, self.settle)
+        if not todo:
+            self.manifest.save()      # keep refreshed mtimes of touched files
+            return 0
+
+        futures = {
+            self.pool.submit(grade_record, self.master_zip, s, self.master_neigh_zip, sn,
+                             self.birthday_prefix, self.master_prefix, self.sink is not None): (s, fp)
+            for s, sn, fp in todo
+        }
+        graded, aborted = [], 0
+        with open(self.ledger, "a") as out:
+            for fut in as_completed(futures):
+                s, fp = futures[fut]
+                try:
+                    rec = fut.result()
+                except JobAborted as e:
+                    rec = aborted_record(s, e)
+                    aborted += 1
+                rec["graded_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                graded.append(rec)
+                line = rec if self.keep_facts else {
+                    k: v for k, v in rec.items() if k not in ("facts", "signature")
+                }
+                out.write(json.dumps(line) + "\n")
+                out.flush()
+                self.manifest.record(rec["student_zip"], fp, rec["success"])
+
+        if self.sink is not None:
+            self.sink.save(graded)
+        # Only after the results are stored: a crash before this regrades them
+        self.manifest.save()
+        if aborted:
+            print(f"{aborted} submission(s) aborted: budget exceeded or worker lost", file=sys.stderr, flush=True)
+        return len(todo)
+
+    def _waiter(self):
+        """Callable blocking until the directory may have changed, or `interval` passes."""
+        if INotify is None:
+            return time.sleep
+        inotify = INotify()
+        inotify.add_watch(self.directory, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+
+        def wait(interval):
+            if inotify.read(timeout=int(interval * 1000)):
+                time.sleep(self.settle)   # let the copy finish before scanning
+        return wait
+
+    def run(self, interval: float = POLL_INTERVAL, once: bool = False) -> None:
+        wait = self._waiter()
+        try:
+            while True:
+                n = self.scan()
+                if n:
+                    print(f"graded {n} submission(s)", file=sys.stderr, flush=True)
+                if once:
+                    return
+                wait(interval)
+        finally:
+            self.pool.shutdown()
+
+
+def main(argv=None):
+    import argparse
+
+    p = argparse.ArgumentParser(
+        prog="grader.py watch",
+        description="Grade new and changed student ZIPs in a directory as they arrive"
+    )
+    p.add_argument("master_zip")
+    p.add_argument("student_dir")
+    p.add_argument("--ledger", default="graded.jsonl", help="JSON Lines file results are appended to")
+    p.add_argument("--manifest", default=None, help=f"default: {MANIFEST_NAME} next to the ledger")
+    add_prefix_args(p)
+    p.add_argument("--master_neigh_zip", default=None)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between scans")
+    p.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                   help="skip files modified less than this many seconds ago")
+    p.add_argument("--db", action="store_true", help="also save results to the submissions table ($DATABASE_URI)")
+    p.add_argument("--facts", action="store_true", help="keep extracted facts in the ledger, for `rescore`")
+    p.add_argument("--once", action="store_true", help="scan once and exit")
+    add_budget_args(p)
+    args = p.parse_args(argv)
+    prefix_from_args(p, args)
+
+    Watcher(
+        master_zip       = args.master_zip,
+        directory        = args.student_dir,
+        ledger           = args.ledger,
+        birthday_prefix  = args.birthday_prefix,
+        master_neigh_zip = args.master_neigh_zip,
+        master_prefix    = args.master_prefix,
+        workers          = args.workers,
+        manifest         = args.manifest,
+        db               = args.db,
+        settle           = args.settle,
+        keep_facts       = args.facts,
+        budget           = budget_from_args(args)
+    ).run(args.interval, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# backend/ipv4.py
+"""
+Integer IPv4 helpers for the grading hot path.
+
+Addresses are packed 32-bit ints and networks are (network_int, prefix_len)
+tuples, so they hash, compare and sort without allocating ipaddress objects.
+Convert back to strings only when building feedback or JSON.
+"""
+
+ALL_ONES = 0xFFFFFFFF
+
+# prefix length → netmask int, and the reverse for contiguous masks only
+PREFIX_TO_MASK = tuple((ALL_ONES << (32 - p)) & ALL_ONES for p in range(33))
+MASK_TO_PREFIX = {mask: p for p, mask in enumerate(PREFIX_TO_MASK)}
+WILDCARD_TO_PREFIX = {mask ^ ALL_ONES: p for mask, p in MASK_TO_PREFIX.items()}
+
+# dotted-quad netmask string → prefix length, for the common contiguous masks
+MASK_STR_TO_PREFIX = {
+    ".".join(str((mask >> s) & 0xFF) for s in (24, 16, 8, 0)): p
+    for mask, p in MASK_TO_PREFIX.items()
+}
+
+
+def ip_to_int(s: str):
+    """Pack a dotted quad into a 32-bit int, or None if it is not valid."""
+    parts = s.split('.')
+    if len(parts) != 4:
+        return None
+    n = 0
+    for o in parts:
+        if not o.isdigit():
+            return None
+        o = int(o)
+        if o > 255:
+            return None
+        n = (n << 8) | o
+    return n
+
+
+def int_to_ip(n: int) -> str:
+    return f"{n >> 24}.{(n >> 16) & 0xFF}.{(n >> 8) & 0xFF}.{n & 0xFF}"
+
+
+def mask_to_prefix(mask: int):
+    """Prefix length of a netmask int, or None if the mask is not contiguous."""
+    return MASK_TO_PREFIX.get(mask)
+
+
+def wildcard_to_prefix(wildcard: int):
+    """Prefix length of a wildcard (inverse) mask, or None if not contiguous."""
+    return WILDCARD_TO_PREFIX.get(wildcard)
+
+
+def network(ip: int, prefix: int) -> tuple:
+    """The (network_int, prefix_len) containing `ip`."""
+    return (ip & PREFIX_TO_MASK[prefix], prefix)
+
+
+def contains(net: tuple, ip: int) -> bool:
+    return (ip & PREFIX_TO_MASK[net[1]]) == net[0]
+
+
+def net_to_str(net: tuple) -> str:
+    return f"{int_to_ip(net[0])}/{net[1]}"
+
+
+def parse_net(s: str):
+    """Parse 'A.B.C.D/p' into (network_int, prefix_len), or None."""
+    ip, _, plen = s.partition('/')
+    ip_i = ip_to_int(ip)
+    if ip_i is None or not plen.isdigit() or int(plen) > 32:
+        return None
+    return network(ip_i, int(plen))
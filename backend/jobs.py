@@ -0,0 +1,336 @@
+# backend/jobs.py
+"""
+Durable grading job queue.
+
+Jobs live in a local SQLite file so they survive restarts and can be
+shared by several web processes; each process runs a WorkerPool that
+claims queued jobs atomically and grades them on a supervised process
+pool that holds every job to a CPU, memory and wall-clock budget. A claim
+is a lease that the claiming queue renews while the job runs; a job whose
+lease ran out (its process died) goes back in line for any queue. Uploaded
+ZIPs can travel with the job as blobs, so grading never has to wait on
+the upload folder.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from backend.grader.supervisor import SupervisedPool, BudgetExceeded
+from backend.metrics import QUEUE_WAIT_SECONDS, BUDGET_EXCEEDED, SUBMISSIONS_GRADED
+
+QUEUED   = "queued"
+RUNNING  = "running"
+DONE     = "done"
+FAILED   = "failed"
+
+# How many recent jobs the wait/service time metrics are averaged over
+METRICS_WINDOW = 100
+
+# A running job's claim lasts LEASE_SECONDS and is renewed every
+# HEARTBEAT_SECONDS while it is graded
+LEASE_SECONDS     = 60
+HEARTBEAT_SECONDS = 15
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.enqueue when the queue is at max_depth."""
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"grading queue is full ({depth} jobs waiting)")
+        self.depth       = depth
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    def __init__(self, path: str, max_depth: int = 200, workers: int = 1):
+        self.path      = path
+        self.max_depth = max_depth
+        self.workers   = max(workers, 1)
+        self.owner     = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup   = threading.Condition()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id          TEXT PRIMARY KEY,
+                    status      TEXT NOT NULL,
+                    payload     TEXT NOT NULL,
+                    result      TEXT,
+                    error       TEXT,
+                    enqueued_at REAL NOT NULL,
+                    started_at  REAL,
+                    finished_at REAL,
+                    owner       TEXT,
+                    lease_until REAL
+                )
+            """)
+            # Queue files from before leases lack the owner columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_enqueued ON jobs (status, enqueued_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_blobs (
+                    job_id TEXT NOT NULL,
+                    name   TEXT NOT NULL,
+                    data   BLOB NOT NULL,
+                    PRIMARY KEY (job_id, name)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ─── PRODUCER SIDE ─────────────────────────────────────────────────────
+    def enqueue(self, payload: dict, blobs: dict = None) -> str:
+        """
+        Queue a JSON-serializable payload. Each `blobs` entry (name → bytes)
+        is handed back to the worker as payload[name].
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if depth >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise QueueFull(depth, self.retry_after(depth))
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, enqueued_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), time.time())
+            )
+            if blobs:
+                conn.executemany(
+                    "INSERT INTO job_blobs (job_id, name, data) VALUES (?, ?, ?)",
+                    [(job_id, name, data) for name, data in blobs.items()]
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = {
+            "id":          row["id"],
+            "status":      row["status"],
+            "enqueued_at": row["enqueued_at"],
+            "started_at":  row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["started_at"] is not None:
+            job["wait_seconds"] = round(row["started_at"] - row["enqueued_at"], 3)
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    # ─── CONSUMER SIDE ─────────────────────────────────────────────────────
+    def claim(self):
+        """
+        Atomically take the oldest queued job, leased to this queue for
+        LEASE_SECONDS: (job_id, payload) or None. Running jobs whose lease
+        ran out are put back in line first.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute(
+                """UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_until = NULL
+                    WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)""",
+                (QUEUED, RUNNING, now)
+            )
+            row = conn.execute(
+                "SELECT id, payload, enqueued_at FROM jobs WHERE status = ? ORDER BY enqueued_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_until = ? WHERE id = ?",
+                (RUNNING, now, self.owner, now + LEASE_SECONDS, row["id"])
+            )
+            payload = json.loads(row["payload"])
+            for blob in conn.execute("SELECT name, data FROM job_blobs WHERE job_id = ?", (row["id"],)):
+                payload[blob["name"]] = blob["data"]
+            conn.execute("COMMIT")
+            QUEUE_WAIT_SECONDS.observe(now - row["enqueued_at"])
+            return row["id"], payload
+        finally:
+            conn.close()
+
+    def renew(self, job_id: str) -> bool:
+        """Extend this queue's lease on a running job; False once it has lost it."""
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time() + LEASE_SECONDS, job_id, RUNNING, self.owner)
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def _close(self, job_id: str, status: str, result=None, error=None) -> bool:
+        """Record the outcome of a job this queue still holds; False if it lost the lease."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            cur = conn.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,
+                                   owner = NULL, lease_until = NULL
+                    WHERE id = ? AND status = ? AND owner = ?""",
+                (status, None if result is None else json.dumps(result), error, time.time(),
+                 job_id, RUNNING, self.owner)
+            )
+            if cur.rowcount == 1:
+                conn.execute("DELETE FROM job_blobs WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, result: dict) -> bool:
+        return self._close(job_id, DONE, result=result)
+
+    def fail(self, job_id: str, error: str, result: dict = None) -> bool:
+        return self._close(job_id, FAILED, result=result, error=error)
+
+    def wait_for_work(self, timeout: float) -> None:
+        with self._wakeup:
+            self._wakeup.wait(timeout)
+
+    # ─── METRICS ───────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(enqueued_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+            recent = conn.execute(
+                """SELECT AVG(started_at - enqueued_at), MAX(started_at - enqueued_at),
+                          AVG(finished_at - started_at)
+                     FROM (SELECT enqueued_at, started_at, finished_at FROM jobs
+                            WHERE finished_at IS NOT NULL
+                            ORDER BY finished_at DESC LIMIT ?)""",
+                (METRICS_WINDOW,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            "depth":               counts.get(QUEUED, 0),
+            "running":             counts.get(RUNNING, 0),
+            "done":                counts.get(DONE, 0),
+            "failed":              counts.get(FAILED, 0),
+            "max_depth":           self.max_depth,
+            "oldest_wait_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "avg_wait_seconds":    round(recent[0] or 0.0, 3),
+            "max_wait_seconds":    round(recent[1] or 0.0, 3),
+            "avg_grade_seconds":   round(recent[2] or 0.0, 3),
+        }
+
+    def retry_after(self, depth: int = None) -> int:
+        """Rough seconds until a slot frees up, for the Retry-After header."""
+        stats = self.stats()
+        depth = stats["depth"] if depth is None else depth
+        per_job = stats["avg_grade_seconds"] or 1.0
+        return max(1, int(per_job * max(depth - self.max_depth + 1, 1) / self.workers + 0.5))
+
+
+class WorkerPool:
+    """
+    Background threads that drain a JobQueue.
+
+    `grade(payload)` runs on a process pool (so it must be a picklable,
+    module-level function) under `budget` (see supervisor.DEFAULT_BUDGET);
+    `persist(payload, graded)` runs on the worker thread and returns the
+    job result stored in the queue. A job over budget fails with the
+    "budget" it hit as its result.
+    """
+
+    def __init__(self, queue: JobQueue, grade, persist, workers: int = 2,
+                 poll_interval: float = 1.0, budget: dict = None):
+        self.queue         = queue
+        self.grade         = grade
+        self.persist       = persist
+        self.workers       = workers
+        self.poll_interval = poll_interval
+        self.budget        = budget
+        self.executor      = None
+        self._threads      = []
+        self._stop         = threading.Event()
+
+    def start(self) -> None:
+        self.executor = SupervisedPool(max_workers=self.workers, budget=self.budget, on_abort=self._count_abort)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"grading-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self.queue._wakeup:
+            self.queue._wakeup.notify_all()
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """This process's supervisor counters: jobs, aborts by resource, worker restarts."""
+        return self.executor.stats() if self.executor else {}
+
+    @staticmethod
+    def _count_abort(exc: BudgetExceeded) -> None:
+        BUDGET_EXCEEDED.inc(resource=exc.resource)
+        SUBMISSIONS_GRADED.inc(assignment_type="unknown", status="aborted")
+
+    def _wait(self, job_id: str, fut):
+        """fut.result(), renewing the job's lease every HEARTBEAT_SECONDS meanwhile."""
+        while True:
+            try:
+                return fut.result(timeout=HEARTBEAT_SECONDS)
+            except FutureTimeout:
+                if fut.done():
+                    raise                       # grade() itself timed out
+                self.queue.renew(job_id)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wait_for_work(self.poll_interval)
+                continue
+            job_id, payload = job
+            try:
+                graded = self._wait(job_id, self.executor.submit(self.grade, payload))
+                if not self.queue.renew(job_id):
+                    continue                    # requeued and claimed elsewhere; theirs to persist
+                self.queue.finish(job_id, self.persist(payload, graded))
+            except BudgetExceeded as e:
+                self.queue.fail(job_id, str(e), result={"budget": e.as_dict()})
+            except Exception as e:
+                self.queue.fail(job_id, str(e) or type(e).__name__)
@@ -0,0 +1,279 @@
+# backend/metrics.py
+"""
+Low-overhead Prometheus-style metrics.
+
+Counters and histograms are plain in-process dicts guarded by a lock.
+When a metrics directory is configured (METRICS_DIR), every process —
+web workers and their forked grading processes alike — periodically
+snapshots its values to <dir>/metrics-<pid>.json, and /metrics sums all
+snapshots, so the numbers cover the whole deployment.
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+
+FLUSH_INTERVAL = 1.0
+
+TIME_BUCKETS  = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(n, "")) for n in labelnames)
+
+
+def _fmt_labels(labelnames, key, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry, name: str, help: str, labelnames=()):
+        self.registry   = registry
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self.values     = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+
+    def snapshot(self) -> dict:
+        return {"|".join(k): v for k, v in self.values.items()}
+
+    @staticmethod
+    def merge(into: dict, snap: dict) -> None:
+        for k, v in snap.items():
+            into[k] = into.get(k, 0) + v
+
+    def render(self, merged: dict) -> list:
+        lines = []
+        for k, v in sorted(merged.items()):
+            key = tuple(k.split("|")) if self.labelnames else ()
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}")
+        return lines
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, help: str, labelnames=(), buckets=TIME_BUCKETS):
+        self.registry   = registry
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self.buckets    = tuple(buckets)
+        self.values     = {}    # key → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+            self.registry.dirty = True
+
+    def snapshot(self) -> dict:
+        return {"|".join(k): list(v) for k, v in self.values.items()}
+
+    @staticmethod
+    def merge(into: dict, snap: dict) -> None:
+        for k, row in snap.items():
+            cur = into.get(k)
+            into[k] = list(row) if cur is None else [a + b for a, b in zip(cur, row)]
+
+    def render(self, merged: dict) -> list:
+        lines = []
+        for k, row in sorted(merged.items()):
+            key = tuple(k.split("|")) if self.labelnames else ()
+            cum = 0
+            for bound, n in zip(self.buckets, row):
+                cum += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cum}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {row[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.dirty      = False
+        self.metrics    = {}
+        self.collectors = []
+        self.directory  = None
+        self._flusher   = None
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.flush)
+        # Spawned (not forked) grading processes find the directory here
+        if os.environ.get("METRICS_DIR"):
+            self.configure(os.environ["METRICS_DIR"])
+
+    # ─── DEFINITION ────────────────────────────────────────────────────────
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self.metrics.setdefault(name, Counter(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=TIME_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(self, name, help, labelnames, buckets))
+
+    def add_collector(self, fn) -> None:
+        """`fn()` returns [(name, help, value), ...] gauges computed at scrape time."""
+        self.collectors.append(fn)
+
+    # ─── MULTI-PROCESS ─────────────────────────────────────────────────────
+    def configure(self, directory: str) -> None:
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            os.environ["METRICS_DIR"] = directory
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                if self.dirty:
+                    self.flush()
+
+        self._flusher = threading.Thread(target=loop, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _after_fork(self) -> None:
+        # A forked child starts from zero; the parent still reports its own values
+        self.lock = threading.Lock()
+        for m in self.metrics.values():
+            m.values.clear()
+        self.dirty    = False
+        self._flusher = None
+        if self.directory:
+            self._start_flusher()
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def _snapshot(self) -> dict:
+        with self.lock:
+            self.dirty = False
+            return {name: m.snapshot() for name, m in self.metrics.items()}
+
+    def flush(self) -> None:
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        tmp  = path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._snapshot(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    # ─── EXPOSITION ────────────────────────────────────────────────────────
+    def collect(self) -> dict:
+        """{metric name: merged samples} across every process that reported."""
+        merged = {name: {} for name in self.metrics}
+        if self.directory:
+            self.flush()
+            for fn in os.listdir(self.directory):
+                if not (fn.startswith("metrics-") and fn.endswith(".json")):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, fn)) as f:
+                        snap = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                for name, samples in snap.items():
+                    if name in self.metrics:
+                        self.metrics[name].merge(merged[name], samples)
+        else:
+            for name, samples in self._snapshot().items():
+                self.metrics[name].merge(merged[name], samples)
+        return merged
+
+    def render(self) -> str:
+        lines  = []
+        merged = self.collect()
+        for name, m in self.metrics.items():
+            lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {m.kind}")
+            lines.extend(m.render(merged[name]))
+        for fn in self.collectors:
+            for name, help, value in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ─── GRADING METRICS ──────────────────────────────────────────────────────
+SUBMISSIONS_GRADED = REGISTRY.counter(
+    "grader_submissions_graded_total", "Submissions graded, by assignment type and outcome",
+    ("assignment_type", "status"))
+GRADING_SECONDS = REGISTRY.histogram(
+    "grader_grading_duration_seconds", "grade_all wall time, by assignment type and router count",
+    ("assignment_type", "routers"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "grader_stage_duration_seconds", "grade_all per-stage wall time", ("stage",))
+ZIP_BYTES = REGISTRY.histogram(
+    "grader_upload_zip_bytes", "Size of uploaded ZIPs", ("kind",), buckets=BYTES_BUCKETS)
+EXTRACTION_FAILURES = REGISTRY.counter(
+    "grader_extraction_failures_total", "Uploads that could not be extracted", ("reason",))
+DB_WRITE_SECONDS = REGISTRY.histogram(
+    "grader_db_write_duration_seconds", "Time to persist one graded submission")
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "grader_queue_wait_seconds", "Time jobs spent queued before a worker picked them up")
+BUDGET_EXCEEDED = REGISTRY.counter(
+    "grader_budget_exceeded_total", "Grading jobs aborted for exceeding their budget, by resource",
+    ("resource",))
+
+
+def router_bucket(n: int) -> str:
+    """Coarse router-count label, to keep label cardinality bounded."""
+    for hi in (5, 10, 20, 40):
+        if n <= hi:
+            return f"<={hi}"
+    return ">40"
+
+
+def init_metrics(app) -> None:
+    """
+    Register GET /metrics and wire grade_all's stage hooks into it. Call
+    before init_routes so the grading processes inherit both.
+    """
+    from flask import Response
+    from backend.grader.instrument import add_stage_hook
+
+    REGISTRY.configure(app.config.get("METRICS_DIR"))
+    add_stage_hook(lambda stage, seconds: STAGE_SECONDS.observe(seconds, stage=stage))
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
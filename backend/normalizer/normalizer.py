@@ -1,10 +1,89 @@
 # backend/normalizer/normalizer.py
+"""
+Config cleanup before parsing: comment/blank-line removal and birthday
+prefix normalization.
+
+Both work on whole buffers with module-level compiled patterns. Every
+pattern starts with a literal character, which lets the regex engine
+skip ahead to candidate positions instead of trying each one. Text whose
+addresses all carry the target prefix is returned as-is, not rewritten.
+"""
 
 import re
+from functools import lru_cache
+
+# A birthday-prefixed address 2MM.DD.LL.ZZZ; group 1 is LL.ZZZ. Same as
+# \b2\d{2}\.\d{2}\.(\d+\.\d+)\b, with the leading \b moved behind the '2'.
+IP_PAT = re.compile(r'2(?<=\b2)\d{2}\.\d{2}\.(\d+\.\d+)\b')
+
+# Prefixes that IP_PAT would match themselves, so their own addresses can be skipped
+_BIRTHDAY_PREFIX = re.compile(r'2\d{2}\.\d{2}')
+
+# ─── SANITIZE ─────────────────────────────────────────────────────────────
+# Line breaks other than \n and \r; str.splitlines() honours these too, so
+# text containing them takes the line-by-line path.
+_ODD_BREAKS    = re.compile('[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+_INLINE_BANG   = re.compile(r'!.*')
+# A blank or '#' line, matched from the line break before it
+_DROPPED_LINE  = re.compile(r'\n[^\S\n]*(?:#.*)?(?=\n|\Z)')
+
+
+def _sanitize_lines(cfg: str) -> str:
+    out = []
+    for line in cfg.splitlines():
+        s = line.strip()
+        if not s or s.startswith('!') or s.startswith('#'):
+            continue
+        if '!' in line:
+            line = line.split('!')[0]
+        out.append(line)
+    return '\n'.join(out)
+
+
+def sanitize_config(cfg: str) -> str:
+    """
+    Drop blank lines and lines starting with '!' or '#', and cut inline
+    '!' comments. Lines are rejoined with '\\n', without a trailing one.
+    """
+    if _ODD_BREAKS.search(cfg):
+        return _sanitize_lines(cfg)
+    if '\r' in cfg:
+        cfg = cfg.replace('\r\n', '\n').replace('\r', '\n')
+    # Cutting '!' first turns '!'-comment lines blank, so one pass drops
+    # both; the leading '\n' lets the first line be dropped like the rest.
+    cfg = _INLINE_BANG.sub('', '\n' + cfg)
+    return _DROPPED_LINE.sub('', cfg)[1:]
+
+
+# ─── NORMALIZE ────────────────────────────────────────────────────────────
+@lru_cache(maxsize=64)
+def _rewriter(master_prefix: str):
+    """(replacement function, pattern of addresses not yet on the prefix or None)."""
+    head    = master_prefix + '.'
+    replace = lambda m: head + m.group(1)
+    if not is_birthday_prefix(master_prefix):
+        # Rewritten addresses cannot match IP_PAT again; nothing to skip
+        return replace, None
+    own = re.escape(master_prefix[1:] + '.')
+    return replace, re.compile(r'2(?<=\b2)(?!' + own + r')\d{2}\.\d{2}\.\d+\.\d+\b')
+
+
+def is_birthday_prefix(prefix: str) -> bool:
+    """True for a 2MM.DD prefix, whose own addresses IP_PAT matches again."""
+    return _BIRTHDAY_PREFIX.fullmatch(prefix) is not None
+
 
 def normalize_ips(config_text: str, master_prefix: str) -> str:
     """
     Rewrite any 2MM.DD.LL.ZZZ into master_prefix.LL.ZZZ.
     """
-    pattern = re.compile(r'\b2\d{2}\.\d{2}\.(\d+\.\d+)\b')
-    return pattern.sub(lambda m: f"{master_prefix}.{m.group(1)}", config_text)
+    replace, foreign = _rewriter(master_prefix)
+    if foreign is not None and foreign.search(config_text) is None:
+        # Every match already carries master_prefix: rewriting is a no-op
+        return config_text
+    return IP_PAT.sub(replace, config_text)
+
+
+def clean_config(config_text: str, master_prefix: str) -> str:
+    """sanitize_config() then normalize_ips(): raw router config to parser input."""
+    return normalize_ips(sanitize_config(config_text), master_prefix)
@@ -0,0 +1,142 @@
+# backend/ospf.py
+"""
+OSPF convergence model.
+
+An interface runs OSPF when a `network ... area` statement covers its
+address (the most specific statement wins, as on IOS). Two routers form
+an adjacency when they share a subnet with OSPF enabled on both ends in
+the same area. Every router then runs Dijkstra over one shared,
+int-indexed graph to get its expected routing table: the cost to each
+subnet advertised by OSPF.
+
+Simplifications: all links cost LINK_COST (configs carry no bandwidth or
+`ip ospf cost`), multi-access subnets are a full mesh, and areas are only
+used to decide adjacencies; there is no ABR/backbone check.
+"""
+
+import heapq
+
+from backend.ipv4 import contains, net_to_str
+
+LINK_COST = 1
+
+# Cap on failing pairs / missing adjacencies listed in the report
+MAX_REPORTED = 50
+
+
+def ospf_interfaces(cfg) -> dict:
+    """{subnet: area} for the interfaces OSPF is enabled on."""
+    enabled = {}
+    for iface in cfg.interfaces:
+        if iface.net is None:
+            continue
+        best = None
+        for n in cfg.ospf_networks:
+            if contains((n.net, n.prefix), iface.ip_int) and (best is None or n.prefix > best.prefix):
+                best = n
+        if best is not None:
+            enabled[iface.net] = best.area
+    return enabled
+
+
+def build_graph(parsed: dict) -> dict:
+    """
+    From {router: RouterConfig} build the shared SPF graph: routers are
+    indexed 0..n-1, `adj[i]` lists (j, cost), `stubs[i]` the subnets
+    router i advertises, and `links` {(r1, r2): [subnet, ...]} by name.
+    """
+    names   = list(parsed)
+    index   = {r: i for i, r in enumerate(names)}
+    stubs   = [[] for _ in names]
+    members = {}
+    for r, cfg in parsed.items():
+        i = index[r]
+        for net, area in ospf_interfaces(cfg).items():
+            stubs[i].append(net)
+            members.setdefault((net, area), []).append(i)
+
+    adj   = [[] for _ in names]
+    links = {}
+    for (net, _), routers in members.items():
+        for a in range(len(routers)):
+            for b in range(a + 1, len(routers)):
+                i, j = routers[a], routers[b]
+                if i == j:
+                    continue
+                adj[i].append((j, LINK_COST))
+                adj[j].append((i, LINK_COST))
+                edge = tuple(sorted((names[i], names[j])))
+                links.setdefault(edge, []).append(net)
+
+    return {"names": names, "index": index, "adj": adj, "stubs": stubs, "links": links}
+
+
+def spf(graph: dict, src: int) -> list:
+    """Dijkstra from router `src`: cost to every router, None if unreachable."""
+    adj  = graph["adj"]
+    dist = [None] * len(adj)
+    dist[src] = 0
+    heap = [(0, src)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for v, c in adj[u]:
+            nd = d + c
+            if dist[v] is None or nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def routing_tables(graph: dict) -> dict:
+    """{router: {subnet: cost}} — each router's expected OSPF routes."""
+    stubs  = graph["stubs"]
+    tables = {}
+    for i, r in enumerate(graph["names"]):
+        table = {}
+        for j, d in enumerate(spf(graph, i)):
+            if d is None:
+                continue
+            cost = d + LINK_COST
+            for net in stubs[j]:
+                if net not in table or cost < table[net]:
+                    table[net] = cost
+        tables[r] = table
+    return tables
+
+
+def convergence_report(tables: dict, links: dict, master_tables: dict, master_links: dict) -> dict:
+    """
+    Compare a student's SPF results against the master's. Every route a
+    master router has must exist on the student's router of the same
+    name for the network to converge; longer paths are "suboptimal".
+    """
+    pairs = reached = suboptimal = 0
+    failing     = []
+    unreachable = {}
+    for r, mtable in master_tables.items():
+        stable = tables.get(r, {})
+        for net, mcost in sorted(mtable.items()):
+            pairs += 1
+            cost = stable.get(net)
+            if cost is None:
+                unreachable.setdefault(r, []).append(net_to_str(net))
+                failing.append(f"{r} → {net_to_str(net)}: unreachable")
+                continue
+            reached += 1
+            if cost > mcost:
+                suboptimal += 1
+
+    missing = [f"{a} – {b}" for a, b in master_links if (a, b) not in links]
+    return {
+        "adjacencies":          len(links),
+        "expected_adjacencies": len(master_links),
+        "missing_adjacencies":  missing[:MAX_REPORTED],
+        "pairs":                pairs,
+        "reachable":            reached,
+        "suboptimal":           suboptimal,
+        "failures":             failing[:MAX_REPORTED],
+        "unreachable":          unreachable,
+        "converges":            reached == pairs,
+    }
@@ -0,0 +1,123 @@
+# backend/parser/parser.py
+
+import re
+from collections import namedtuple
+
+from backend.ipv4 import ip_to_int, mask_to_prefix, wildcard_to_prefix, network, PREFIX_TO_MASK
+
+DOTTED_QUAD = re.compile(r'\d+\.\d+\.\d+\.\d+')
+
+# ip/mask are the raw tokens (format checks need them); ip_int/mask_int are
+# the packed 32-bit values, or None when an octet is out of range; net is the
+# (network_int, prefix_len) subnet, or None when ip or mask is unusable.
+Interface   = namedtuple('Interface',   'name ip mask ip_int mask_int net')
+# Only `ip route` lines with at least dest, mask and next hop; `last` is the
+# final token (next hop, or distance/name when more follow).
+StaticRoute = namedtuple('StaticRoute', 'dest mask next_hop last')
+OspfNetwork = namedtuple('OspfNetwork', 'net prefix area')
+
+
+class RouterConfig:
+    """Compact, pre-parsed view of one sanitized IOS config."""
+
+    __slots__ = ('hostname', 'interfaces', 'static_routes',
+                 'ospf_networks', 'has_static_routes', 'has_ospf')
+
+    def __init__(self, hostname=None, interfaces=(), static_routes=(),
+                 ospf_networks=(), has_static_routes=False, has_ospf=False):
+        self.hostname          = hostname
+        self.interfaces        = interfaces
+        self.static_routes     = static_routes
+        self.ospf_networks     = ospf_networks
+        self.has_static_routes = has_static_routes
+        self.has_ospf          = has_ospf
+
+    def __repr__(self):
+        return (f"RouterConfig(hostname={self.hostname!r}, "
+                f"{len(self.interfaces)} interfaces, "
+                f"{len(self.static_routes)} static routes, "
+                f"{len(self.ospf_networks)} OSPF networks)")
+
+
+def _ip_address(tokens: list):
+    """Find `ip address <ip> <mask>` anywhere in a token list."""
+    for i in range(len(tokens) - 3):
+        if (tokens[i].lower() == 'ip' and tokens[i + 1].lower() == 'address'
+                and DOTTED_QUAD.fullmatch(tokens[i + 2])
+                and DOTTED_QUAD.fullmatch(tokens[i + 3])):
+            return tokens[i + 2], tokens[i + 3]
+    return None
+
+
+def _interface(name: str, ip: str, mask: str) -> Interface:
+    ip_i   = ip_to_int(ip)
+    mask_i = ip_to_int(mask)
+    prefix = mask_to_prefix(mask_i) if mask_i is not None else None
+    net    = network(ip_i, prefix) if ip_i is not None and prefix is not None else None
+    return Interface(name, ip, mask, ip_i, mask_i, net)
+
+
+def parse_config(cfg: str) -> RouterConfig:
+    """
+    Tokenize a sanitized config in one linear scan.
+
+    An interface owns the first `ip address` seen before the next
+    `interface` line, matching the old per-block regex.
+    """
+    hostname      = None
+    interfaces    = []
+    static_routes = []
+    ospf_networks = []
+    has_static    = False
+    has_ospf      = False
+
+    iface_name = None   # current interface still waiting for its address
+
+    for line in cfg.splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        head = tokens[0].lower()
+
+        if head == 'interface' and len(tokens) >= 2:
+            iface_name = tokens[1]
+            continue
+
+        if iface_name is not None:
+            addr = _ip_address(tokens)
+            if addr:
+                ip, mask = addr
+                interfaces.append(_interface(iface_name, ip, mask))
+                iface_name = None
+
+        if head == 'ip' and len(tokens) >= 2 and tokens[1].lower() == 'route':
+            has_static = True
+            if len(tokens) >= 5:
+                static_routes.append(StaticRoute(tokens[2], tokens[3], tokens[4], tokens[-1]))
+        elif head == 'hostname':
+            if hostname is None and len(tokens) >= 2:
+                hostname = tokens[1]
+        elif head == 'router':
+            if len(tokens) >= 2 and tokens[1].lower() == 'ospf':
+                has_ospf = True
+        elif head == 'network':
+            if (len(tokens) >= 5 and tokens[3].lower() == 'area' and tokens[4][:1].isdigit()
+                    and DOTTED_QUAD.fullmatch(tokens[1]) and DOTTED_QUAD.fullmatch(tokens[2])):
+                ip_i = ip_to_int(tokens[1])
+                wc_i = ip_to_int(tokens[2])
+                if ip_i is None or wc_i is None:
+                    continue
+                prefix = wildcard_to_prefix(wc_i)
+                if prefix is None:
+                    prefix = 32 - wc_i.bit_count()
+                area   = int(re.match(r'\d+', tokens[4]).group())
+                ospf_networks.append(OspfNetwork(ip_i & PREFIX_TO_MASK[prefix], prefix, area))
+
+    return RouterConfig(
+        hostname          = hostname,
+        interfaces        = tuple(interfaces),
+        static_routes     = tuple(static_routes),
+        ospf_networks     = tuple(ospf_networks),
+        has_static_routes = has_static,
+        has_ospf          = has_ospf,
+    )
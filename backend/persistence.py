@@ -0,0 +1,206 @@
+# backend/persistence.py
+"""
+Database writes for graded submissions.
+
+A submission and all of its router results go in one transaction: the
+Submission row is flushed to get its id, then the RouterResult rows are
+bulk-inserted. save_cohort does the same for many students at once,
+committing every `chunk_size` submissions.
+
+Each distinct input also keeps its extracted facts, so rescore_cohort can
+apply a new rubric to a whole cohort without reading any ZIPs. The
+dashboard summary tables (backend.stats) are updated in the same
+transactions.
+"""
+
+import json
+from backend.config import db, Submission, RouterResult, GradingResult, SubmissionSignature, LshBucket, Rubric
+from backend.grader.rubric import DEFAULT_RUBRIC, make_rubric, score_facts
+from backend.similarity import index_rows
+from backend import stats
+
+COHORT_CHUNK = 500
+
+
+def _submission(payload: dict, summary: dict) -> Submission:
+    return Submission(
+        student_name    = payload["student_name"],
+        birthday_prefix = payload["birthday_prefix"],
+        master_zip      = payload["master_zip_name"],
+        student_zip     = payload["student_zip_name"],
+        final_score     = summary["final_score"],
+        result_key      = payload["result_key"],
+        rubric_version  = summary["rubric_version"]
+    )
+
+
+def _router_rows(submission_id: int, summary: dict) -> list:
+    return [
+        {
+            "submission_id": submission_id,
+            "router_name":   router,
+            "score":         int(data["score"]),
+            "feedback":      "\n".join(data["feedback"]),
+            "diff":          None       # built on demand by GET /submissions/<id>/report
+        }
+        for router, data in summary["per_router"].items()
+    ]
+
+
+def _write(items: list, cached: bool) -> list:
+    """Stage one chunk of (payload, summary) pairs; the caller commits."""
+    if not cached:
+        # Memoize for identical resubmissions (one row per distinct key)
+        results = {p["result_key"]: (p, s) for p, s in items}
+        for key, (payload, summary) in results.items():
+            db.session.merge(GradingResult(
+                cache_key      = key,
+                rubric_version = summary["rubric_version"],
+                facts          = json.dumps(payload["facts"]) if payload.get("facts") else None,
+                summary        = json.dumps(summary)
+            ))
+
+    subs = [_submission(p, s) for p, s in items]
+    db.session.add_all(subs)
+    db.session.flush()   # assigns ids without ending the transaction
+    stats.record_submissions(subs)
+
+    rows, sigs, buckets = [], [], []
+    for sub, (payload, summary) in zip(subs, items):
+        rows.extend(_router_rows(sub.id, summary))
+        if payload.get("signature"):
+            sig_row, bucket_rows = index_rows(sub.id, payload["master_zip_name"], payload["signature"])
+            sigs.append(sig_row)
+            buckets.extend(bucket_rows)
+    if rows:
+        db.session.bulk_insert_mappings(RouterResult, rows)
+    if sigs:
+        db.session.bulk_insert_mappings(SubmissionSignature, sigs)
+        db.session.bulk_insert_mappings(LshBucket, buckets)
+    return [sub.id for sub in subs]
+
+
+def _save_chunk(chunk: list, cached: bool) -> list:
+    try:
+        ids = _write(chunk, cached)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ids
+
+
+def save_submission(payload: dict, summary: dict, cached: bool = False) -> int:
+    """
+    Persist one graded summary and its router results in a single
+    transaction; returns the Submission id. Call inside an app context.
+    `cached` skips re-storing the memoized GradingResult, which keeps
+    payload["facts"] (grader.extract_facts) for later rescoring. A
+    payload["signature"] (similarity.config_signature) is indexed too,
+    with the master ZIP as the cohort.
+    """
+    return _save_chunk([(payload, summary)], cached)[0]
+
+
+def save_cohort(items, chunk_size: int = COHORT_CHUNK, cached: bool = False) -> list:
+    """
+    Persist an iterable of (payload, summary) pairs, e.g. a batch regrade,
+    in chunked bulk transactions. Returns the Submission ids in order.
+    """
+    ids   = []
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            ids.extend(_save_chunk(chunk, cached))
+            chunk = []
+    if chunk:
+        ids.extend(_save_chunk(chunk, cached))
+    return ids
+
+
+# ─── RUBRICS & RESCORING ──────────────────────────────────────────────────
+def rubric_for(version) -> dict:
+    """The rubric saved as `version`, DEFAULT_RUBRIC for its own version, else None."""
+    row = db.session.get(Rubric, version) if version is not None else None
+    if row is not None:
+        return json.loads(row.constants)
+    return DEFAULT_RUBRIC if version == DEFAULT_RUBRIC["version"] else None
+
+
+def active_rubric() -> dict:
+    """The latest saved rubric, or DEFAULT_RUBRIC when none has been saved."""
+    row = db.session.query(Rubric).order_by(Rubric.version.desc()).first()
+    return json.loads(row.constants) if row is not None else DEFAULT_RUBRIC
+
+
+def save_rubric(overrides: dict) -> dict:
+    """
+    Save DEFAULT_RUBRIC with `overrides` applied as the next version, which
+    becomes the active rubric. Raises ValueError for unknown constants.
+    """
+    latest = db.session.query(db.func.max(Rubric.version)).scalar()
+    rubric = make_rubric(overrides, max(latest or 0, DEFAULT_RUBRIC["version"]) + 1)
+    db.session.add(Rubric(version=rubric["version"], constants=json.dumps(rubric)))
+    db.session.commit()
+    return rubric
+
+
+def _rescore_chunk(subs: list, rubric: dict, summaries: dict) -> None:
+    sub_rows, router_rows = [], []
+    for sid, key in subs:
+        summary = summaries[key]
+        sub_rows.append({"id": sid, "final_score": summary["final_score"], "rubric_version": rubric["version"]})
+
+    ids = [sid for sid, _ in subs]
+    key_of = dict(subs)
+    for rid, sid, router in (db.session.query(RouterResult.id, RouterResult.submission_id, RouterResult.router_name)
+                             .filter(RouterResult.submission_id.in_(ids))):
+        data = summaries[key_of[sid]]["per_router"].get(router)
+        if data is not None:
+            router_rows.append({"id": rid, "score": int(data["score"]), "feedback": "\n".join(data["feedback"])})
+
+    try:
+        db.session.bulk_update_mappings(Submission, sub_rows)
+        if router_rows:
+            db.session.bulk_update_mappings(RouterResult, router_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rescore_cohort(cohort: str, rubric: dict = None, chunk_size: int = COHORT_CHUNK) -> dict:
+    """
+    Re-score every submission against master ZIP `cohort` under `rubric`
+    (default: the active one) from their stored facts, in chunked bulk
+    updates. Each distinct input is scored once however many students
+    share it. Submissions without stored facts are counted as skipped.
+    """
+    rubric = rubric or active_rubric()
+    subs   = (db.session.query(Submission.id, Submission.result_key)
+              .filter(Submission.master_zip == cohort)
+              .order_by(Submission.id)
+              .all())
+
+    keys  = {key for _, key in subs if key}
+    facts = dict(
+        db.session.query(GradingResult.cache_key, GradingResult.facts)
+        .filter(GradingResult.cache_key.in_(keys), GradingResult.facts.isnot(None))
+        .all()
+    ) if keys else {}
+    summaries = {key: score_facts(json.loads(f), rubric) for key, f in facts.items()}
+
+    todo = [(sid, key) for sid, key in subs if key in summaries]
+    for i in range(0, len(todo), chunk_size):
+        _rescore_chunk(todo[i:i + chunk_size], rubric, summaries)
+    if todo:
+        stats.rebuild(cohort)
+
+    return {
+        "cohort":         cohort,
+        "rubric_version": rubric["version"],
+        "rescored":       len(todo),
+        "skipped":        len(subs) - len(todo),
+        "distinct":       len(summaries),
+    }
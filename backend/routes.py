@@ -1,15 +1,145 @@
 import os
-from flask import request
-from werkzeug.utils import secure_filename
-from backend.config import db, Submission, RouterResult
-from backend.grader.grader import grade_all, format_summary
+import json
+import time
+import zipfile
+from flask import request, jsonify
+from backend.config import db, GradingResult, Submission, RouterResult, LatestSubmission
+from backend.grader.grader import extract_facts, format_summary, FACTS_VERSION
+from backend.grader.rubric import score_facts
+from backend.jobs import JobQueue, WorkerPool, QueueFull
+from backend.persistence import save_submission, active_rubric, rubric_for, save_rubric, rescore_cohort
+from backend.diff import router_diffs
+from backend.similarity import config_signature, find_similar, cohort_report, THRESHOLD
+from backend.analytics import cohort_analytics, summaries_from_db, TOP_MISSES
+from backend.storage import store_bytes, content_name, result_key
+from backend.stats import cohort_stats
+from backend.extractor.extractor import ZipLimitError
+from backend.metrics import (
+    REGISTRY, SUBMISSIONS_GRADED, GRADING_SECONDS, ZIP_BYTES,
+    EXTRACTION_FAILURES, DB_WRITE_SECONDS, router_bucket
+)
 
 UPLOAD_FOLDER = "uploads"
 
+# Keyset pagination: ?limit=N (capped) and the cursor from the last page's "next"
+PAGE_SIZE     = 50
+MAX_PAGE_SIZE = 500
+
+def _page(query, column, cursor_arg: str, descending: bool, row_fn) -> dict:
+    """
+    One keyset page of `query` ordered by `column`. The cursor is the last
+    row's `column` value, so every page is an index range scan however
+    deep into the history it is.
+    """
+    limit  = min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get(cursor_arg, type=column.type.python_type)
+    if cursor is not None:
+        query = query.filter(column < cursor if descending else column > cursor)
+    rows = query.order_by(column.desc() if descending else column).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row_fn(r) for r in rows],
+        "next":  getattr(rows[-1], column.key) if more else None,
+    }
+
+def _submission_row(sub) -> dict:
+    return {
+        "submission_id":  sub.id,
+        "student_name":   sub.student_name,
+        "cohort":         sub.master_zip,
+        "final_score":    sub.final_score,
+        "rubric_version": sub.rubric_version,
+        "created_at":     sub.created_at.isoformat() if sub.created_at else None,
+    }
+
+def grade_job(payload: dict) -> dict:
+    """
+    Runs in a grading worker process; the ZIPs arrive as in-memory bytes.
+    Returns the extracted facts and the student's similarity signature;
+    scoring happens in persist_job under the active rubric.
+    """
+    t0 = time.perf_counter()
+    try:
+        facts = extract_facts(
+            master_zip        = payload["master_zip"],
+            student_zip       = payload["student_zip"],
+            master_neigh_zip  = payload.get("master_neigh_zip") or payload["master_zip"],
+            student_neigh_zip = payload.get("student_neigh_zip") or payload["student_zip"],
+            birthday_prefix   = payload["birthday_prefix"],
+            master_prefix     = None,
+            master_name       = payload["master_filename"]
+        )
+    except Exception as e:
+        if isinstance(e, ZipLimitError):
+            EXTRACTION_FAILURES.inc(reason="limit")
+        elif isinstance(e, zipfile.BadZipFile):
+            EXTRACTION_FAILURES.inc(reason="bad_zip")
+        elif isinstance(e, ValueError):
+            EXTRACTION_FAILURES.inc(reason="no_configs")
+        SUBMISSIONS_GRADED.inc(assignment_type="unknown", status="error")
+        raise
+
+    kind = facts["assignment_type"]
+    SUBMISSIONS_GRADED.inc(assignment_type=kind, status="graded")
+    GRADING_SECONDS.observe(
+        time.perf_counter() - t0,
+        assignment_type = kind,
+        routers         = router_bucket(facts["num_routers"])
+    )
+    return {"facts": facts, "signature": config_signature(payload["student_zip"])}
+
 def init_routes(app):
     app.config.setdefault("UPLOAD_FOLDER", UPLOAD_FOLDER)
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+    workers = app.config.get("GRADING_WORKERS", 2)
+    queue = JobQueue(
+        app.config.get("GRADING_QUEUE_DB", "grading_queue.db"),
+        max_depth = app.config.get("GRADING_QUEUE_MAX", 200),
+        workers   = workers
+    )
+
+    def persist_submission(payload: dict, summary: dict, cached: bool = False) -> dict:
+        """Persist a graded summary; call inside an app context."""
+        t0 = time.perf_counter()
+        # 7-8) Submission, router results and memoized summary in one transaction
+        submission_id = save_submission(payload, summary, cached=cached)
+        DB_WRITE_SECONDS.observe(time.perf_counter() - t0)
+
+        # 9) Plain-text report alongside the JSON summary, plus near duplicates
+        return {
+            "submission_id": submission_id,
+            "summary":       summary,
+            "report":        format_summary(summary),
+            "similar":       find_similar(submission_id)
+        }
+
+    def persist_job(payload: dict, graded: dict) -> dict:
+        payload["facts"]     = graded["facts"]
+        payload["signature"] = graded["signature"]
+        with app.app_context():
+            summary = score_facts(graded["facts"], active_rubric())
+            return persist_submission(payload, summary)
+
+    pool = WorkerPool(queue, grade_job, persist_job, workers=workers, budget={
+        "cpu_seconds":  app.config.get("GRADING_CPU_SECONDS"),
+        "memory_mb":    app.config.get("GRADING_MEMORY_MB"),
+        "wall_seconds": app.config.get("GRADING_WALL_SECONDS"),
+    })
+    pool.start()
+    app.extensions["grading_queue"] = queue
+    app.extensions["grading_workers"] = pool
+
+    def queue_gauges():
+        stats = queue.stats()
+        return [
+            ("grader_queue_depth",   "Jobs waiting for a grading worker", stats["depth"]),
+            ("grader_queue_running", "Jobs currently being graded",       stats["running"]),
+        ]
+
+    REGISTRY.add_collector(queue_gauges)
+
     @app.route("/submit", methods=["POST"])
     def submit():
         # 1) Form data
@@ -24,63 +154,192 @@ def init_routes(app):
         mn_file = request.files.get("master_neigh_zip")
         sn_file = request.files.get("student_neigh_zip")
 
-        # 4) Save config zips
-        mfn = secure_filename(m.filename)
-        sfn = secure_filename(s.filename)
-        mpath = os.path.join(app.config["UPLOAD_FOLDER"], mfn)
-        spath = os.path.join(app.config["UPLOAD_FOLDER"], sfn)
-        m.save(mpath)
-        s.save(spath)
+        # 4) Read uploads into memory; grading works on these bytes directly.
+        #    Copies go to UPLOAD_FOLDER (content-addressed, written once, before
+        #    anything references them) only when PERSIST_UPLOADS is on.
+        folder  = app.config["UPLOAD_FOLDER"]
+        persist = app.config.get("PERSIST_UPLOADS", True)
+        blobs   = {"master_zip": m.read(), "student_zip": s.read()}
+        ZIP_BYTES.observe(len(blobs["master_zip"]), kind="master")
+        ZIP_BYTES.observe(len(blobs["student_zip"]), kind="student")
 
-        # 5) Save neighbor or fallback
+        def stored(key):
+            if persist:
+                return store_bytes(blobs[key], folder)
+            return content_name(blobs[key])
+
+        mdig, mfn = stored("master_zip")
+        sdig, sfn = stored("student_zip")
+
+        # 5) Neighbor zips or fallback
         if mn_file:
-            mnf = secure_filename(mn_file.filename)
-            mnpath = os.path.join(app.config["UPLOAD_FOLDER"], mnf)
-            mn_file.save(mnpath)
+            blobs["master_neigh_zip"] = mn_file.read()
+            ZIP_BYTES.observe(len(blobs["master_neigh_zip"]), kind="master_neigh")
+            mndig, _ = stored("master_neigh_zip")
         else:
-            mnf, mnpath = mfn, mpath
+            mndig = mdig
 
         if sn_file:
-            snf = secure_filename(sn_file.filename)
-            snpath = os.path.join(app.config["UPLOAD_FOLDER"], snf)
-            sn_file.save(snpath)
+            blobs["student_neigh_zip"] = sn_file.read()
+            ZIP_BYTES.observe(len(blobs["student_neigh_zip"]), kind="student_neigh")
+            sndig, _ = stored("student_neigh_zip")
         else:
-            snf, snpath = sfn, spath
-
-        # 6) Grade
-        summary = grade_all(
-            master_zip        = mpath,
-            student_zip       = spath,
-            master_neigh_zip  = mnpath,
-            student_neigh_zip = snpath,
-            birthday_prefix   = bp,
-            master_prefix     = None
-        )
-    if not summary.get("success", True):
-        return summary["error"], 400, {"Content-Type": "text/plain"}
-
-    # 7) Persist Submission
-    sub = Submission(
-        student_name    = name,
-        birthday_prefix = bp,
-        master_zip      = mfn,
-        student_zip     = sfn,
-        final_score     = summary["final_score"]
-    )
-    db.session.add(sub)
-    db.session.commit()
-
-    # 8) Persist per-router
-    for router, data in summary["per_router"].items():
-        rr = RouterResult(
-            submission_id = sub.id,
-            router_name   = router,
-            score         = int(data["score"]),
-            feedback      = "\n".join(data["feedback"]),
-            diff          = ""
-        )
-        db.session.add(rr)
-    db.session.commit()
+            sndig = sdig
+
+        payload = {
+            "student_name":      name,
+            "birthday_prefix":   bp,
+            "master_filename":   m.filename,
+            "master_zip_name":   mfn,
+            "student_zip_name":  sfn,
+            "result_key":        result_key(mdig, sdig, mndig, sndig, bp, FACTS_VERSION)
+        }
+
+        # 6) Identical submission already graded: score its stored facts.
+        #    A row without facts is a miss; regrading it stores them.
+        cached = db.session.get(GradingResult, payload["result_key"])
+        if cached is not None and cached.facts:
+            summary = score_facts(json.loads(cached.facts), active_rubric())
+            payload["signature"] = config_signature(blobs["student_zip"])
+            SUBMISSIONS_GRADED.inc(assignment_type=summary["assignment_type"], status="cached")
+            result = persist_submission(payload, summary, cached=True)
+            return jsonify({"status": "done", "cached": True, "result": result}), 200
+
+        # 7) Queue for grading; workers persist the results
+        try:
+            job_id = queue.enqueue(payload, blobs)
+        except QueueFull as e:
+            return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+
+        return jsonify({
+            "job_id":     job_id,
+            "status":     "queued",
+            "status_url": f"/jobs/{job_id}"
+        }), 202
+
+    @app.route("/jobs/stats", methods=["GET"])
+    def job_stats():
+        stats = queue.stats()
+        # Budget aborts in this process; grader_budget_exceeded_total covers all of them
+        stats["workers"] = pool.stats()
+        return jsonify(stats)
+
+    @app.route("/submissions", methods=["GET"])
+    def list_submissions():
+        """Newest first; ?cohort=<master ZIP> and/or ?student=<name>, paged by ?before=<id>."""
+        query   = Submission.query
+        cohort  = request.args.get("cohort")
+        student = request.args.get("student")
+        if cohort:
+            query = query.filter(Submission.master_zip == cohort)
+        if student:
+            query = query.filter(Submission.student_name == student)
+        return jsonify(_page(query, Submission.id, "before", True, _submission_row))
+
+    @app.route("/submissions/<int:submission_id>/routers", methods=["GET"])
+    def list_router_results(submission_id):
+        """A submission's router results in insertion order, paged by ?after=<id>."""
+        query = RouterResult.query.filter(RouterResult.submission_id == submission_id)
+        return jsonify(_page(query, RouterResult.id, "after", False, lambda rr: {
+            "id":          rr.id,
+            "router_name": rr.router_name,
+            "score":       rr.score,
+            "feedback":    rr.feedback.split("\n") if rr.feedback else [],
+        }))
+
+    @app.route("/cohorts/<cohort>/stats", methods=["GET"])
+    def cohort_statistics(cohort):
+        result = cohort_stats(cohort)
+        if result is None:
+            return jsonify({"error": "unknown cohort"}), 404
+        return jsonify(result)
+
+    @app.route("/cohorts/<cohort>/latest", methods=["GET"])
+    def latest_submissions(cohort):
+        """Each student's latest submission, by name, paged by ?after=<student name>."""
+        query = LatestSubmission.query.filter(LatestSubmission.cohort == cohort)
+        return jsonify(_page(query, LatestSubmission.student_name, "after", False, lambda row: {
+            "student_name":  row.student_name,
+            "submission_id": row.submission_id,
+            "final_score":   row.final_score,
+        }))
+
+    @app.route("/submissions/<int:submission_id>/report", methods=["GET"])
+    def submission_report(submission_id):
+        sub = db.session.get(Submission, submission_id)
+        if sub is None:
+            return jsonify({"error": "unknown submission"}), 404
+        cached  = db.session.get(GradingResult, sub.result_key) if sub.result_key else None
+        summary = json.loads(cached.summary) if cached else None
+        rubric  = rubric_for(sub.rubric_version)
+        if cached is not None and cached.facts and rubric is not None:
+            # Feedback as last scored, which may postdate the stored summary
+            summary = score_facts(json.loads(cached.facts), rubric)
+        rows    = {rr.router_name: rr for rr in RouterResult.query.filter_by(submission_id=sub.id)}
+
+        # Diffs are built on first request and kept on the RouterResult rows
+        todo = [r for r, rr in rows.items() if not rr.diff]
+        if todo:
+            folder = app.config["UPLOAD_FOLDER"]
+            m_path = os.path.join(folder, sub.master_zip)
+            s_path = os.path.join(folder, sub.student_zip)
+            if os.path.exists(m_path) and os.path.exists(s_path):
+                for r, lines in router_diffs(m_path, s_path, sub.birthday_prefix, todo).items():
+                    rows[r].diff = "\n".join(lines)
+                db.session.commit()
+
+        return jsonify({
+            "submission_id": sub.id,
+            "student_name":  sub.student_name,
+            "final_score":   sub.final_score,
+            "report":        format_summary(summary) if summary else None,
+            "diffs":         {r: rr.diff for r, rr in rows.items()}
+        })
+
+    @app.route("/submissions/<int:submission_id>/similar", methods=["GET"])
+    def similar_submissions(submission_id):
+        threshold = request.args.get("threshold", THRESHOLD, type=float)
+        return jsonify(find_similar(submission_id, threshold))
+
+    @app.route("/similarity/<cohort>", methods=["GET"])
+    def similarity_report(cohort):
+        threshold = request.args.get("threshold", THRESHOLD, type=float)
+        return jsonify(cohort_report(cohort, threshold))
+
+    @app.route("/analytics/<cohort>", methods=["GET"])
+    def analytics_report(cohort):
+        top = request.args.get("top", TOP_MISSES, type=int)
+        return jsonify(cohort_analytics(summaries_from_db(cohort), top))
+
+    @app.route("/rubrics", methods=["POST"])
+    def create_rubric():
+        overrides = request.get_json(silent=True)
+        if not isinstance(overrides, dict):
+            return jsonify({"error": "expected a JSON object of rubric constants"}), 400
+        try:
+            rubric = save_rubric(overrides)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(rubric), 201
+
+    @app.route("/rubrics/<int:version>", methods=["GET"])
+    def get_rubric(version):
+        rubric = rubric_for(version)
+        if rubric is None:
+            return jsonify({"error": "unknown rubric"}), 404
+        return jsonify(rubric)
+
+    @app.route("/cohorts/<cohort>/rescore", methods=["POST"])
+    def rescore(cohort):
+        version = (request.get_json(silent=True) or {}).get("version")
+        rubric  = active_rubric() if version is None else rubric_for(version)
+        if rubric is None:
+            return jsonify({"error": "unknown rubric"}), 404
+        return jsonify(rescore_cohort(cohort, rubric))
 
-    # 9) Return plain-text report
-    return format_summary(summary), 200, {"Content-Type": "text/plain"}
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "unknown job"}), 404
+        return jsonify(job)
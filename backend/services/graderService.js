@@ -1,10 +1,10 @@
 // backend/services/graderService.js
 
-const { spawn } = require("child_process");
-const path = require("path");
+const { request } = require("../grader/client");
 
 /**
- * Calls the Python grader CLI and returns the parsed JSON summary.
+ * Sends the grading job to the long-lived Python grader server
+ * and returns the parsed JSON summary.
  *
  * @param {string} masterZipPath
  * @param {string} studentZipPath
@@ -20,43 +20,24 @@ function gradeZip(
   studentNeighZipPath,
   birthdayPrefix
 ) {
-  return new Promise((resolve, reject) => {
-    const graderScript = path.join(__dirname, "..", "grader", "grader.py");
-    const py = spawn(
-      "python3", // or "python" if that’s your command
-      [
-        graderScript,
-        masterZipPath,
-        studentZipPath,
-        masterNeighZipPath,
-        studentNeighZipPath,
-        birthdayPrefix,
-      ],
-      { cwd: path.resolve(__dirname, "..") }
-    );
-
-    let out = "", err = "";
-
-    py.stdout.on("data", chunk => (out += chunk));
-    py.stderr.on("data", chunk => (err += chunk));
-
-    py.on("close", code => {
-      if (code !== 0) {
-        // Return a known shape for frontend
-        return resolve({
-          success: false,
-          error: err.trim() || `Python exited with code ${code}`,
-          final_score: 0,
-          per_router: {}
-        });
-      }
-      try {
-        resolve(JSON.parse(out));
-      } catch (e) {
-        reject(e); // JSON parsing failed
-      }
-    });
+  const failed = error => ({
+    // Return a known shape for frontend
+    success: false,
+    error,
+    final_score: 0,
+    per_router: {}
   });
+
+  return request({
+    master_zip: masterZipPath,
+    student_zip: studentZipPath,
+    master_neigh_zip: masterNeighZipPath,
+    student_neigh_zip: studentNeighZipPath,
+    birthday_prefix: birthdayPrefix,
+  }).then(
+    resp => (resp.success ? resp.result : failed(resp.error)),
+    err => failed(err.message)
+  );
 }
 
 module.exports = { gradeZip };
@@ -0,0 +1,166 @@
+# backend/similarity.py
+"""
+Near-duplicate detection across submissions.
+
+Each submission's configs are sanitized, normalized onto one common
+prefix (so birthday prefixes do not count as differences), split into
+k-token shingles and reduced to a MinHash signature. The signature is cut
+into LSH bands whose bucket keys are stored with the submission: finding
+candidates for one submission reads only its own buckets, and a cohort
+report is a single pass over the cohort's buckets. Candidates are then
+confirmed on the estimated Jaccard similarity of their signatures.
+"""
+
+import zlib
+import numpy as np
+
+from backend.config import db, Submission, SubmissionSignature, LshBucket
+from backend.extractor.extractor import load_configs_from_zip
+from backend.normalizer.normalizer import clean_config
+
+SHINGLE_TOKENS = 5
+NUM_PERM       = 128
+BANDS          = 32     # 4 rows per band: pairs above ~0.5 Jaccard usually collide
+THRESHOLD      = 0.8
+
+# Every submission is normalized onto this prefix before shingling
+COMMON_PREFIX  = "0.0"
+
+# Universal hashing h(x) = (a*x + b) mod p over 32-bit shingle hashes; the
+# products stay below 2**64, so uint64 arithmetic is exact.
+PRIME   = (1 << 32) - 5
+_rng    = np.random.default_rng(1)
+_A      = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+_B      = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+_CHUNK  = 4096
+
+
+# ─── SIGNATURES ───────────────────────────────────────────────────────────
+def shingles(configs: dict) -> set:
+    """32-bit hashes of every SHINGLE_TOKENS-token window, router by router."""
+    hashes = set()
+    for r in sorted(configs):
+        tokens = clean_config(configs[r], COMMON_PREFIX).split()
+        for i in range(max(len(tokens) - SHINGLE_TOKENS + 1, 1)):
+            hashes.add(zlib.crc32(" ".join(tokens[i:i + SHINGLE_TOKENS]).encode()))
+    return hashes
+
+
+def minhash(hashes: set):
+    """NUM_PERM-value uint32 signature, or None for an empty submission."""
+    if not hashes:
+        return None
+    hv  = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    sig = np.full(NUM_PERM, PRIME, dtype=np.uint64)
+    for i in range(0, len(hv), _CHUNK):
+        block = (_A * hv[None, i:i + _CHUNK] + _B) % PRIME
+        np.minimum(sig, block.min(axis=1), out=sig)
+    return sig.astype(np.uint32)
+
+
+def config_signature(student_zip):
+    """Signature bytes for a student ZIP (path, bytes or file object), or None."""
+    sig = minhash(shingles(load_configs_from_zip(student_zip)))
+    return None if sig is None else sig.tobytes()
+
+
+def band_keys(signature: bytes) -> list:
+    """One bucket key per LSH band; the band number keeps bands apart."""
+    sig  = np.frombuffer(signature, dtype=np.uint32)
+    rows = NUM_PERM // BANDS
+    return [f"{b}:{sig[b * rows:(b + 1) * rows].tobytes().hex()}" for b in range(BANDS)]
+
+
+def estimate(sig_a: bytes, sig_b: bytes) -> float:
+    """Estimated Jaccard similarity: the share of matching MinHash values."""
+    return float(np.mean(np.frombuffer(sig_a, dtype=np.uint32) == np.frombuffer(sig_b, dtype=np.uint32)))
+
+
+# ─── INDEX ────────────────────────────────────────────────────────────────
+def index_rows(submission_id: int, cohort: str, signature: bytes) -> tuple:
+    """(signature mapping, bucket mappings) for bulk_insert_mappings."""
+    sig_row = {"submission_id": submission_id, "cohort": cohort, "signature": signature}
+    buckets = [
+        {"submission_id": submission_id, "cohort": cohort, "bucket": key}
+        for key in band_keys(signature)
+    ]
+    return sig_row, buckets
+
+
+def _names(ids) -> dict:
+    rows = db.session.query(Submission.id, Submission.student_name).filter(Submission.id.in_(ids))
+    return dict(rows.all())
+
+
+def find_similar(submission_id: int, threshold: float = THRESHOLD) -> list:
+    """
+    Earlier or later submissions in the same cohort whose configs are near
+    duplicates of `submission_id`, most similar first.
+    """
+    own = db.session.get(SubmissionSignature, submission_id)
+    if own is None:
+        return []
+    candidates = [
+        sid for (sid,) in db.session.query(LshBucket.submission_id).filter(
+            LshBucket.cohort == own.cohort,
+            LshBucket.bucket.in_(band_keys(own.signature)),
+            LshBucket.submission_id != submission_id
+        ).distinct()
+    ]
+    if not candidates:
+        return []
+
+    matches = []
+    for other in db.session.query(SubmissionSignature).filter(SubmissionSignature.submission_id.in_(candidates)):
+        sim = estimate(own.signature, other.signature)
+        if sim >= threshold:
+            matches.append((other.submission_id, sim))
+    names = _names([sid for sid, _ in matches])
+    return [
+        {"submission_id": sid, "student_name": names.get(sid), "similarity": round(sim, 3)}
+        for sid, sim in sorted(matches, key=lambda m: -m[1])
+    ]
+
+
+def cohort_report(cohort: str, threshold: float = THRESHOLD) -> dict:
+    """All near-duplicate pairs in a cohort, from one pass over its buckets."""
+    sigs = dict(
+        db.session.query(SubmissionSignature.submission_id, SubmissionSignature.signature)
+        .filter(SubmissionSignature.cohort == cohort)
+        .all()
+    )
+
+    pairs   = set()
+    members = []
+    current = None
+    rows = (db.session.query(LshBucket.bucket, LshBucket.submission_id)
+            .filter(LshBucket.cohort == cohort)
+            .order_by(LshBucket.bucket))
+    for bucket, sid in rows:
+        if bucket != current:
+            current, members = bucket, []
+        for other in members:
+            pairs.add((min(sid, other), max(sid, other)))
+        members.append(sid)
+
+    matches = []
+    for a, b in pairs:
+        if a in sigs and b in sigs:
+            sim = estimate(sigs[a], sigs[b])
+            if sim >= threshold:
+                matches.append((a, b, sim))
+    names = _names({sid for a, b, _ in matches for sid in (a, b)})
+    return {
+        "cohort":      cohort,
+        "submissions": len(sigs),
+        "candidates":  len(pairs),
+        "threshold":   threshold,
+        "pairs": [
+            {
+                "a": {"submission_id": a, "student_name": names.get(a)},
+                "b": {"submission_id": b, "student_name": names.get(b)},
+                "similarity": round(sim, 3),
+            }
+            for a, b, sim in sorted(matches, key=lambda m: (-m[2], m[0], m[1]))
+        ],
+    }
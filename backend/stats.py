@@ -0,0 +1,166 @@
+# backend/stats.py
+"""
+Summary tables for dashboards.
+
+AssignmentStats (count, score sum, min/max, 10-point histogram) and
+LatestSubmission (each student's most recent submission) are kept per
+master ZIP. persistence folds every new Submission into them inside the
+same transaction that inserts it, so the tables never disagree with
+`submissions`. rebuild() recomputes a cohort from scratch, for backfills
+and after rescoring changes scores.
+
+Rows are read with SELECT ... FOR UPDATE before being changed. On SQLite
+the inserting transaction already holds the database write lock, which
+serializes concurrent writers the same way.
+"""
+
+import json
+from backend.config import db, Submission, AssignmentStats, LatestSubmission
+
+BUCKETS = 10
+
+
+def bucket_of(score: float) -> int:
+    """Histogram bucket: 0 for [0, 10), ..., 9 for [90, 100]."""
+    return min(max(int(score // 10), 0), BUCKETS - 1)
+
+
+def _bucket_labels() -> list:
+    return [f"{b * 10}-{b * 10 + 10}" for b in range(BUCKETS)]
+
+
+# ─── INCREMENTAL UPDATES ──────────────────────────────────────────────────
+def _fold_stats(cohort: str, scores: list) -> None:
+    stats = (db.session.query(AssignmentStats)
+             .filter_by(cohort=cohort).with_for_update().first())
+    if stats is None:
+        stats = AssignmentStats(cohort=cohort, count=0, score_sum=0.0, histogram=json.dumps([0] * BUCKETS))
+        db.session.add(stats)
+
+    hist = json.loads(stats.histogram)
+    for s in scores:
+        hist[bucket_of(s)] += 1
+    stats.count     = stats.count + len(scores)
+    stats.score_sum = stats.score_sum + sum(scores)
+    stats.min_score = min(scores) if stats.min_score is None else min(stats.min_score, *scores)
+    stats.max_score = max(scores) if stats.max_score is None else max(stats.max_score, *scores)
+    stats.histogram = json.dumps(hist)
+
+
+def _fold_latest(cohort: str, subs: list) -> None:
+    newest = {}
+    for sub in subs:
+        if sub.student_name not in newest or sub.id > newest[sub.student_name].id:
+            newest[sub.student_name] = sub
+
+    rows = {
+        row.student_name: row
+        for row in db.session.query(LatestSubmission)
+        .filter(LatestSubmission.cohort == cohort, LatestSubmission.student_name.in_(newest))
+        .with_for_update()
+    }
+    for name, sub in newest.items():
+        row = rows.get(name)
+        if row is None:
+            db.session.add(LatestSubmission(cohort=cohort, student_name=name,
+                                            submission_id=sub.id, final_score=sub.final_score))
+        elif sub.id > row.submission_id:
+            row.submission_id = sub.id
+            row.final_score   = sub.final_score
+
+
+def record_submissions(subs: list) -> None:
+    """
+    Fold flushed (id-bearing) Submission rows into the summary tables.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    by_cohort = {}
+    for sub in subs:
+        by_cohort.setdefault(sub.master_zip, []).append(sub)
+    for cohort, rows in by_cohort.items():
+        _fold_stats(cohort, [sub.final_score for sub in rows])
+        _fold_latest(cohort, rows)
+
+
+# ─── REBUILD ──────────────────────────────────────────────────────────────
+def rebuild(cohort: str) -> None:
+    """Recompute one cohort's summary rows from `submissions` and commit."""
+    try:
+        db.session.query(AssignmentStats).filter_by(cohort=cohort).delete(synchronize_session=False)
+        db.session.query(LatestSubmission).filter_by(cohort=cohort).delete(synchronize_session=False)
+
+        # Scores have one decimal, so grouping by score keeps this small
+        counts = (db.session.query(Submission.final_score, db.func.count())
+                  .filter(Submission.master_zip == cohort)
+                  .group_by(Submission.final_score)
+                  .all())
+        if counts:
+            hist = [0] * BUCKETS
+            for score, n in counts:
+                hist[bucket_of(score)] += n
+            db.session.add(AssignmentStats(
+                cohort    = cohort,
+                count     = sum(n for _, n in counts),
+                score_sum = sum(score * n for score, n in counts),
+                min_score = min(score for score, _ in counts),
+                max_score = max(score for score, _ in counts),
+                histogram = json.dumps(hist)
+            ))
+
+        newest = (db.session.query(db.func.max(Submission.id))
+                  .filter(Submission.master_zip == cohort)
+                  .group_by(Submission.student_name))
+        rows = (db.session.query(Submission.student_name, Submission.id, Submission.final_score)
+                .filter(Submission.id.in_(newest)))
+        db.session.bulk_insert_mappings(LatestSubmission, [
+            {"cohort": cohort, "student_name": name, "submission_id": sid, "final_score": score}
+            for name, sid, score in rows
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rebuild_all() -> int:
+    """rebuild() every cohort in `submissions`; returns how many there were."""
+    cohorts = [c for (c,) in db.session.query(Submission.master_zip).distinct()]
+    for cohort in cohorts:
+        rebuild(cohort)
+    return len(cohorts)
+
+
+# ─── READS ────────────────────────────────────────────────────────────────
+def cohort_stats(cohort: str):
+    """Dashboard statistics for one cohort, or None if it has no submissions."""
+    stats = db.session.get(AssignmentStats, cohort)
+    if stats is None:
+        return None
+    return {
+        "cohort":     cohort,
+        "count":      stats.count,
+        "mean":       round(stats.score_sum / stats.count, 2) if stats.count else None,
+        "min":        stats.min_score,
+        "max":        stats.max_score,
+        "histogram":  dict(zip(_bucket_labels(), json.loads(stats.histogram))),
+        "updated_at": stats.updated_at.isoformat() if stats.updated_at else None,
+    }
+
+
+def main(argv=None):
+    import argparse
+    from backend.grader.ingest import _db_app
+
+    p = argparse.ArgumentParser(description="Rebuild the dashboard summary tables ($DATABASE_URI)")
+    p.add_argument("--cohort", default=None, help="only this master ZIP (default: every cohort)")
+    args = p.parse_args(argv)
+    with _db_app().app_context():
+        if args.cohort:
+            rebuild(args.cohort)
+            print("rebuilt 1 cohort")
+        else:
+            print(f"rebuilt {rebuild_all()} cohort(s)")
+
+
+if __name__ == "__main__":
+    main()
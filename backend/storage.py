@@ -0,0 +1,63 @@
+# backend/storage.py
+
+import os
+import hashlib
+
+CHUNK_SIZE = 1 << 20
+
+
+def save_content_addressed(file_obj, folder: str, suffix: str = ".zip"):
+    """
+    Store an uploaded file under its SHA-256, writing the bytes only if that
+    content is not already on disk. Returns (digest, stored_filename).
+    """
+    h = hashlib.sha256()
+    chunks = []
+    for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b""):
+        h.update(chunk)
+        chunks.append(chunk)
+    digest = h.hexdigest()
+
+    name = digest + suffix
+    _write_once(b"".join(chunks), os.path.join(folder, name))
+    return digest, name
+
+
+def _write_once(data, path: str) -> None:
+    if os.path.exists(path):
+        return
+    tmp = f"{path}.{os.getpid()}.{id(data)}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def content_name(data, suffix: str = ".zip"):
+    """(digest, stored_filename) for in-memory bytes, without writing them."""
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, digest + suffix
+
+
+def store_bytes(data, folder: str, suffix: str = ".zip"):
+    """
+    Content-address an in-memory upload: write it to `folder` (once per
+    content) and return (digest, stored_filename). The write happens before
+    returning, so a row naming the file is never committed without it; a
+    failed write raises.
+    """
+    digest, name = content_name(data, suffix)
+    _write_once(data, os.path.join(folder, name))
+    return digest, name
+
+
+def result_key(master_digest: str, student_digest: str, master_neigh_digest: str,
+               student_neigh_digest: str, birthday_prefix: str, rubric_version) -> str:
+    """Key under which a grading result can be reused for identical inputs."""
+    parts = (master_digest, student_digest, master_neigh_digest,
+             student_neigh_digest, birthday_prefix, str(rubric_version))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
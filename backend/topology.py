@@ -1,42 +1,53 @@
 # backend/topology.py
 
-import re
-import ipaddress
+from backend.ipv4 import net_to_str
+from backend.parser.parser import RouterConfig, parse_config
 
-def parse_router_subnets(config_text: str):
-    """
-    Return a list of IPv4Network for every 'ip address' in each interface block.
-    """
-    nets = []
-    for m in re.finditer(
-        r'interface\s+\S+(.*?)(?=^interface|\Z)',
-        config_text, re.MULTILINE | re.DOTALL
-    ):
-        block = m.group(1)
-        mm = re.search(
-            r'ip\s+address\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)',
-            block, re.IGNORECASE
-        )
-        if not mm:
+def parse_router_subnets(config):
+    """
+    Return a list of (network_int, prefix_len) for every valid 'ip address'
+    in each interface block. Accepts raw config text or a parsed RouterConfig.
+    """
+    if not isinstance(config, RouterConfig):
+        config = parse_config(config)
+    return [iface.net for iface in config.interfaces if iface.net is not None]
+
+def index_subnets(router_nets: dict) -> dict:
+    """
+    Invert {router: [net,...]} into {net: [router,...]}, keeping router order
+    and listing each router once per subnet.
+    """
+    index = {}
+    for r, nets in router_nets.items():
+        for net in nets:
+            routers = index.setdefault(net, [])
+            if not routers or routers[-1] != r:
+                routers.append(r)
+    return index
+
+def build_links(router_nets: dict, index: dict = None) -> dict:
+    """
+    From {router: [net,...]} build {(r1,r2): [net,...]} with every subnet the
+    two routers share, in linear time over the subnet index.
+    """
+    if index is None:
+        index = index_subnets(router_nets)
+    links = {}
+    for net, routers in index.items():
+        if len(routers) < 2:
             continue
-        ip, mask = mm.groups()
-        try:
-            nets.append(ipaddress.IPv4Network(f"{ip}/{mask}", strict=False))
-        except ValueError:
-            pass
-    return nets
+        for i in range(len(routers)):
+            for j in range(i+1, len(routers)):
+                edge = tuple(sorted((routers[i], routers[j])))
+                links.setdefault(edge, []).append(net)
+    return {edge: sorted(nets) for edge, nets in sorted(links.items())}
 
-def build_edges(router_nets: dict):
-    """
-    From {router: [IPv4Network,...]} build {(r1,r2): 'A.B.C.D/p'} edges.
-    """
-    edges = {}
-    names = list(router_nets)
-    for i in range(len(names)):
-        for j in range(i+1, len(names)):
-            r1, r2 = names[i], names[j]
-            shared = set(router_nets[r1]) & set(router_nets[r2])
-            for net in shared:
-                edge = tuple(sorted((r1, r2)))
-                edges[edge] = str(net)
-    return edges
+def build_edges(router_nets: dict, index: dict = None):
+    """
+    From {router: [(net, prefix),...]} build {(r1,r2): 'A.B.C.D/p'} edges.
+    Routers joined by several subnets get them all, comma-separated.
+    """
+    return {
+        edge: ", ".join(net_to_str(net) for net in nets)
+        for edge, nets in build_links(router_nets, index).items()
+    }
@@ -0,0 +1,226 @@
+# benchmarks/bench.py
+"""
+Grader micro/macro benchmarks.
+
+    python -m benchmarks.bench --kind static --routers 30 --students 50 --out bench.json
+
+Generates a synthetic assignment (see benchmarks.synth), times each grading
+stage and writes a JSON report with throughput and p50/p95 latency per
+stage, so runs can be compared between releases.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.synth import generate, make_topology, render_assignment, birthday_prefix
+from backend.extractor.extractor import load_configs_from_zip
+from backend.normalizer.normalizer import sanitize_config, normalize_ips, clean_config, _sanitize_lines
+from backend.topology import parse_router_subnets, build_edges
+from backend.grader import grader
+from backend.grader.grader import grade_all, grade_batch, master_birthday_prefix
+
+
+def percentile(sorted_vals: list, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(samples: list) -> dict:
+    s = sorted(samples)
+    total = sum(s)
+    return {
+        "samples":          len(s),
+        "total_s":          round(total, 6),
+        "throughput_per_s": round(len(s) / total, 2) if total else None,
+        "p50_ms":           round(percentile(s, 0.50) * 1000, 4),
+        "p95_ms":           round(percentile(s, 0.95) * 1000, 4),
+        "max_ms":           round(s[-1] * 1000, 4) if s else 0.0,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - t0, out
+
+
+def _legacy_clean(txt: str, prefix: str) -> str:
+    """Config cleanup as it was before the whole-buffer rewrite, for comparison."""
+    pattern = re.compile(r'\b2\d{2}\.\d{2}\.(\d+\.\d+)\b')
+    return pattern.sub(lambda m: f"{prefix}.{m.group(1)}", _sanitize_lines(txt))
+
+
+def bench_cleanup(lines: int, repeat: int, seed: int = 0) -> dict:
+    """
+    Time legacy vs current sanitize+normalize on one large config of about
+    `lines` lines, with LF and CRLF line endings, and on text that is
+    already on the target prefix (the idempotent case).
+    """
+    import random
+
+    topo = make_topology(60, 4, seed)
+    src  = birthday_prefix(random.Random(seed))
+    configs, _ = render_assignment(topo, "static", src, static_routes=40, seed=seed)
+    chunk = "".join(configs.values())
+    text  = chunk * max(lines // chunk.count("\n"), 1)
+    cases = {
+        "lf":         (text, "10.0"),
+        "crlf":       (text.replace("\n", "\r\n"), "10.0"),
+        "idempotent": (text, src),
+    }
+
+    report = {"lines": text.count("\n")}
+    for name, (txt, prefix) in cases.items():
+        assert clean_config(txt, prefix) == _legacy_clean(txt, prefix)
+        legacy  = summarize([timed(_legacy_clean, txt, prefix)[0] for _ in range(repeat)])
+        current = summarize([timed(clean_config, txt, prefix)[0] for _ in range(repeat)])
+        report[name] = {
+            "legacy_p50_ms":  legacy["p50_ms"],
+            "current_p50_ms": current["p50_ms"],
+            "speedup":        round(legacy["p50_ms"] / current["p50_ms"], 2) if current["p50_ms"] else None,
+        }
+    return report
+
+
+def run(args) -> dict:
+    work = args.workdir or tempfile.mkdtemp(prefix="grader-bench-")
+    try:
+        gen = generate(
+            work,
+            kind          = args.kind,
+            routers       = args.routers,
+            ifaces        = args.ifaces,
+            static_routes = args.static_routes,
+            students      = args.students,
+            error_rate    = args.error_rate,
+            prefixes      = args.prefixes,
+            seed          = args.seed,
+        )
+        students = gen["students"]
+        stages   = {k: [] for k in (
+            "load_configs_from_zip", "sanitize_config", "normalize_ips",
+            "parse_router_subnets", "build_edges",
+            "grade_all_cold", "grade_all_warm",
+        )}
+
+        for _ in range(args.repeat):
+            for st in students:
+                dt, raw = timed(load_configs_from_zip, st["student_zip"])
+                stages["load_configs_from_zip"].append(dt)
+                nets = {}
+                for r, txt in raw.items():
+                    dt, clean = timed(sanitize_config, txt)
+                    stages["sanitize_config"].append(dt)
+                    dt, norm = timed(normalize_ips, clean, st["birthday_prefix"])
+                    stages["normalize_ips"].append(dt)
+                    dt, nets[r] = timed(parse_router_subnets, norm)
+                    stages["parse_router_subnets"].append(dt)
+                dt, _ = timed(build_edges, nets)
+                stages["build_edges"].append(dt)
+
+        for i, st in enumerate(students):
+            grade = lambda: grade_all(
+                gen["master_zip"], st["student_zip"],
+                gen["master_neigh_zip"], st["student_neigh_zip"],
+                st["birthday_prefix"], master_prefix=args.master_prefix,
+            )
+            if i < args.cold:
+                grader.MASTER_CACHE.clear()
+                dt, _ = timed(grade)
+                stages["grade_all_cold"].append(dt)
+            for _ in range(args.repeat):
+                dt, _ = timed(grade)
+                stages["grade_all_warm"].append(dt)
+
+        report = {name: summarize(samples) for name, samples in stages.items()}
+
+        if args.cleanup_lines:
+            report["config_cleanup"] = bench_cleanup(args.cleanup_lines, max(args.repeat, 5), args.seed)
+
+        if args.batch_workers != 0:
+            pairs = [(st["student_zip"], st["student_neigh_zip"]) for st in students]
+            t0 = time.perf_counter()
+            ok = sum(
+                rec["success"] for rec in grade_batch(
+                    gen["master_zip"], pairs,
+                    # One normalization prefix across the cohort, as `batch` defaults to
+                    birthday_prefix  = args.master_prefix or master_birthday_prefix(gen["master_zip"]),
+                    master_neigh_zip = gen["master_neigh_zip"],
+                    master_prefix    = args.master_prefix,
+                    workers          = args.batch_workers,
+                )
+            )
+            dt = time.perf_counter() - t0
+            report["grade_batch"] = {
+                "students":         len(pairs),
+                "succeeded":        ok,
+                "workers":          args.batch_workers or os.cpu_count(),
+                "total_s":          round(dt, 6),
+                "throughput_per_s": round(len(pairs) / dt, 2) if dt else None,
+            }
+
+        return {
+            "params": {
+                "kind": args.kind, "routers": args.routers, "ifaces": args.ifaces,
+                "static_routes": args.static_routes, "students": args.students,
+                "error_rate": args.error_rate, "repeat": args.repeat, "seed": args.seed,
+                "subnets": gen["num_subnets"],
+            },
+            "env": {
+                "python":   platform.python_version(),
+                "platform": platform.platform(),
+                "cpus":     os.cpu_count(),
+            },
+            "stages": report,
+        }
+    finally:
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def main(argv=None):
+    import argparse
+
+    p = argparse.ArgumentParser(description="Benchmark the router grader on synthetic submissions")
+    p.add_argument("--kind", choices=("static", "ospf"), default="static")
+    p.add_argument("--routers", type=int, default=20)
+    p.add_argument("--ifaces", type=int, default=3, help="interfaces per router")
+    p.add_argument("--static-routes", type=int, default=8, help="static routes per router")
+    p.add_argument("--students", type=int, default=30)
+    p.add_argument("--error-rate", type=float, default=0.1)
+    p.add_argument("--prefixes", nargs="*", default=None, help="birthday prefixes to cycle through")
+    p.add_argument("--master-prefix", default=None)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--cold", type=int, default=3, help="grade_all runs with an empty master cache")
+    p.add_argument("--batch-workers", type=int, default=None,
+                   help="grade_batch pool size (default: CPU count, 0 to skip)")
+    p.add_argument("--cleanup-lines", type=int, default=50000,
+                   help="size of the large config for the cleanup benchmark (0 to skip)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workdir", default=None, help="keep generated ZIPs here")
+    p.add_argument("--out", default=None, help="write the JSON report here instead of stdout")
+    args = p.parse_args(argv)
+
+    report = json.dumps(run(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# benchmarks/synth.py
+"""
+Synthetic static/OSPF assignments for benchmarking the grader.
+
+Every link and every stub LAN is its own /24 under the usual
+2MM.DD.<subnet>.<host> birthday scheme, so at most 256 subnets fit in one
+assignment. Students are copies of the master under their own birthday
+prefix, with errors injected at `error_rate` per router.
+"""
+
+import io
+import os
+import random
+import zipfile
+from collections import deque
+
+MASTER_PREFIX = "201.01"
+MASK_24       = "255.255.255.0"
+WILDCARD_24   = "0.0.0.255"
+
+
+def make_topology(routers: int, ifaces: int, seed: int = 0) -> dict:
+    """
+    Build a connected topology: a spanning tree plus random extra links,
+    then stub LANs until every router has `ifaces` interfaces.
+
+    Returns {"routers": [...], "subnets": [(subnet_id, [(router, host), ...])]}.
+    """
+    rng   = random.Random(seed)
+    names = [f"R{i+1}" for i in range(routers)]
+    used  = {r: 0 for r in names}
+    subnets = []
+
+    def add(members):
+        sid = len(subnets)
+        if sid > 255:
+            raise ValueError("synthetic topology needs more than 256 /24 subnets")
+        subnets.append((sid, [(r, h + 1) for h, r in enumerate(members)]))
+        for r in members:
+            used[r] += 1
+
+    # spanning tree keeps the network connected
+    for i in range(1, routers):
+        candidates = [r for r in names[:i] if used[r] < ifaces] or names[:i]
+        add([rng.choice(candidates), names[i]])
+
+    # extra router-to-router links while interfaces remain
+    free = [r for r in names if used[r] < ifaces - 1]
+    for _ in range(routers // 2):
+        if len(free) < 2:
+            break
+        a, b = rng.sample(free, 2)
+        add([a, b])
+        free = [r for r in names if used[r] < ifaces - 1]
+
+    # stub LANs fill the remaining interfaces
+    for r in names:
+        while used[r] < ifaces:
+            add([r])
+
+    return {"routers": names, "subnets": subnets}
+
+
+def _next_hops(topo: dict) -> dict:
+    """{router: {subnet_id: (next-hop router, link subnet_id)}} by BFS."""
+    links = {r: [] for r in topo["routers"]}
+    owners = {}
+    for sid, members in topo["subnets"]:
+        owners[sid] = [r for r, _ in members]
+        for r, _ in members:
+            for other, _ in members:
+                if other != r:
+                    links[r].append((other, sid))
+
+    table = {}
+    for src in topo["routers"]:
+        first = {src: None}
+        q = deque([src])
+        while q:
+            u = q.popleft()
+            for v, sid in links[u]:
+                if v not in first:
+                    first[v] = (v, sid) if u == src else first[u]
+                    q.append(v)
+        table[src] = {
+            sid: first[members[0]]
+            for sid, members in owners.items()
+            if src not in members and members[0] in first
+        }
+    return table
+
+
+def render_assignment(topo: dict, kind: str, prefix: str, static_routes: int = 8,
+                      error_rate: float = 0.0, seed: int = 0) -> tuple:
+    """
+    Render ({router.txt: config}, {router.txt: ospf neighbor output}) for
+    one submission. `error_rate` is the per-router chance of each error kind.
+    """
+    rng    = random.Random(seed)
+    hops   = _next_hops(topo)
+    addr   = {}
+    ifaces = {r: [] for r in topo["routers"]}
+    for sid, members in topo["subnets"]:
+        for r, host in members:
+            addr[(r, sid)] = f"{prefix}.{sid}.{host}"
+            ifaces[r].append(sid)
+
+    def err():
+        return rng.random() < error_rate
+
+    configs, neighbors = {}, {}
+    for r in topo["routers"]:
+        lines = [f"hostname {'Router' if err() else r}", "!"]
+        for k, sid in enumerate(ifaces[r]):
+            mask = "255.255.0.0" if err() else MASK_24
+            lines += [
+                f"interface GigabitEthernet0/{k}",
+                f" ip address {addr[(r, sid)]} {mask}",
+                " no shutdown",
+                "!",
+            ]
+
+        if kind == "ospf":
+            lines.append("router ospf 1")
+            for sid in ifaces[r]:
+                if err():
+                    continue
+                lines.append(f" network {prefix}.{sid}.0 {WILDCARD_24} area 0")
+            lines.append("!")
+        else:
+            dests = sorted(hops[r])[:static_routes]
+            for sid in dests:
+                if err():
+                    continue                                  # missing route
+                nh_router, link = hops[r][sid]
+                nh   = addr[(nh_router, link)]
+                mask = MASK_24
+                if err():
+                    nh = f"{prefix}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+                if err():
+                    mask = "255.255.0.0"
+                lines.append(f"ip route {prefix}.{sid}.0 {mask} {nh}")
+
+        lines.append("end")
+        configs[f"{r}.txt"] = "\n".join(lines) + "\n"
+
+        out = ["Neighbor ID     Pri   State           Dead Time   Address         Interface"]
+        for k, sid in enumerate(ifaces[r]):
+            members = dict(next(m for s, m in topo["subnets"] if s == sid))
+            for other, host in members.items():
+                if other != r and not err():
+                    out.append(f"{other[1:]}.{other[1:]}.{other[1:]}.{other[1:]}    1     FULL/DR         00:00:35    "
+                               f"{prefix}.{sid}.{host}    GigabitEthernet0/{k}")
+        neighbors[f"{r}.txt"] = "\n".join(out) + "\n"
+
+    return configs, neighbors
+
+
+def zip_bytes(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, text in files.items():
+            z.writestr(name, text)
+    return buf.getvalue()
+
+
+def birthday_prefix(rng: random.Random) -> str:
+    """A 2MM.DD prefix for a real month and day (201.01 to 212.31)."""
+    return f"2{rng.randrange(1, 13):02d}.{rng.randrange(1, 32):02d}"
+
+
+def generate(out_dir: str, kind: str = "static", routers: int = 10, ifaces: int = 3,
+             static_routes: int = 8, students: int = 20, error_rate: float = 0.1,
+             prefixes: list = None, seed: int = 0) -> dict:
+    """
+    Write master_<kind>.zip, master_<kind>_neigh.zip and one
+    studentNNN.zip / studentNNN_neigh.zip pair per student into `out_dir`.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng  = random.Random(seed)
+    topo = make_topology(routers, ifaces, seed)
+
+    m_cfgs, m_neigh = render_assignment(topo, kind, MASTER_PREFIX, static_routes, 0.0, seed)
+    master       = os.path.join(out_dir, f"master_{kind}.zip")
+    master_neigh = os.path.join(out_dir, f"master_{kind}_neigh.zip")
+    with open(master, "wb") as f:
+        f.write(zip_bytes(m_cfgs))
+    with open(master_neigh, "wb") as f:
+        f.write(zip_bytes(m_neigh))
+
+    student_dir = os.path.join(out_dir, "students")
+    os.makedirs(student_dir, exist_ok=True)
+    entries = []
+    for i in range(students):
+        bp = (prefixes[i % len(prefixes)] if prefixes else birthday_prefix(rng))
+        cfgs, neigh = render_assignment(topo, kind, bp, static_routes, error_rate, seed + i + 1)
+        path       = os.path.join(student_dir, f"student{i:03d}.zip")
+        neigh_path = os.path.join(student_dir, f"student{i:03d}_neigh.zip")
+        with open(path, "wb") as f:
+            f.write(zip_bytes(cfgs))
+        with open(neigh_path, "wb") as f:
+            f.write(zip_bytes(neigh))
+        entries.append({"student_zip": path, "student_neigh_zip": neigh_path, "birthday_prefix": bp})
+
+    return {
+        "kind":             kind,
+        "master_zip":       master,
+        "master_neigh_zip": master_neigh,
+        "student_dir":      student_dir,
+        "students":         entries,
+        "num_subnets":      len(topo["subnets"]),
+    }
@@ -1,7 +1,6 @@
 import argparse
-from backend.extractor.extractor import load_configs_from_zip
-from backend.normalizer.normalizer import normalize_ips
 from backend.grader.grader import grade_all
+from backend.diff import router_diffs
 
 if __name__ == '__main__':
     p = argparse.ArgumentParser(description='Grade ZIP-of-TXTs configs')
@@ -9,18 +8,24 @@ if __name__ == '__main__':
     p.add_argument('student_zip')
     p.add_argument('--birthday-prefix', required=True)
     p.add_argument('--master-prefix', default='10.0')
+    p.add_argument('--master-neigh-zip', default=None)
+    p.add_argument('--student-neigh-zip', default=None)
     args = p.parse_args()
 
-    score, details = grade_all(
+    summary = grade_all(
         args.master_zip, args.student_zip,
+        args.master_neigh_zip or args.master_zip,
+        args.student_neigh_zip or args.student_zip,
         args.birthday_prefix, args.master_prefix
     )
-    print(f"Final Score: {score:.1f}/100")
-    for router, d in details.items():
+    diffs = router_diffs(args.master_zip, args.student_zip, args.master_prefix or args.birthday_prefix)
+
+    print(f"Final Score: {summary['final_score']:.1f}/100")
+    for router, d in summary['per_router'].items():
         print(f"\n--- {router} ---")
         print(f"Score: {d['score']}")
         print("Feedback:")
         for f in d['feedback']:
             print(f"  - {f}")
         print("Diff:")
-        print("\n".join(d['diff']))
+        print("\n".join(diffs.get(router, [])))